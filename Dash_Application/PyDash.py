@@ -43,6 +43,8 @@ class wndw_Main(tk.Tk):
 
         #----misc core properties
         self.errors = []                                    #list for tracking any errors encountered
+        self.cfg_load_ms = None                             #dash config load time, in ms
+        self.cfg_load_src = None                            #where the dash config was loaded from - 'XML' or 'cache'
     
     def init_dash(self):
         """function defines and instances any variables required for normal operation"""
@@ -55,26 +57,44 @@ class wndw_Main(tk.Tk):
     def instance_cfg(self):
         """function builds menu pages and loads dash configuration"""
         menuPages_instMain(self)                #populate the constant menu pages
-        dashCFG_load(self)                      #populate the various classes with the dash_config.xml file
-        dashCFG_ErrChk(self)                    #and check for any errors
+        dashCFG_load(self)                      #populate the various classes with the dash config and check for any errors
 
     def start_dash(self):
         """function builds user dash pages and starts normal dash operation"""
         self.dash_ctl.dash_start_HW_ops()       #start any hardware functions
         self.dash_ctl.dash_buildPages()         #build the various dash pages
         self.dash_ctl.page_ele_CANref_init()    #set page element triggers for CAN data
+        self.dash_ctl.render_set_period(self.dash_settings.Refresh)     #refresh at the configured rate
         self.dash_ctl.goto_user_FirstPage()     #go to first user page
         self.display_refresh_loop()             #enter main refresh loop
     
+    def stop_dash(self):
+        """function stops normal dash operation when the app exits"""
+        self.dash_ctl.dash_stop_HW_ops()        #stop any hardware functions
+    
     def display_refresh_loop(self):
         """function updates the current displayed page, if needed. Note that not all pages will have this
         functionality, primarily is used in menu windows. Dash pages should function based on event triggers
-        and not need this processing."""
+        and not need this processing. Any CAN values RX'd since the last refresh are also applied here, which
+        is what fires those event triggers on the Tk thread. The triggers only mark the page elements dirty,
+        and each dirty element is redrawn once per refresh with its latest value."""
+        t_start = time.perf_counter()                                           #frame start time
+        ctl_ref = self.dash_ctl
+        num_eles = 0                                                            #elements redrawn this frame
+
+        CANref = getattr(self, 'dash_CAN', None)                                #CAN is only instanced if a config was found
+        if CANref is not None:
+            CANref.CAN_ingest_drain()                                           #apply queued CAN values on the Tk thread
+            num_eles = ctl_ref.render_frame()                                   #redraw the changed elements
+            CANref.CAN_lat_render_done()                                        #and finish any tracked latencies
+            CANref.CAN_tmo_tick()                                               #then check for timed out channels
 
-        if callable(getattr(self.dash_ctl.active_page_ref, 'upd_page',None)):   #if current page has an update routine
-            self.dash_ctl.active_page_ref.upd_page()                            #then call it
+        if callable(getattr(ctl_ref.active_page_ref, 'upd_page',None)):         #if current page has an update routine
+            ctl_ref.active_page_ref.upd_page()                                  #then call it
 
-        self.after(sys_refresh_rate, self.display_refresh_loop) #continue to update every interval
+        frame_ms = (time.perf_counter() - t_start)*1000
+        ctl_ref.render_stats.add(frame_ms*1000, num_eles, ctl_ref.render_period_ms*1000)
+        self.after(max(1, int(ctl_ref.render_period_ms - frame_ms)), self.display_refresh_loop)  #continue to update every interval
     
     def upd_errors(self, err_msgs):
         """function updates the global error tracking dict with the passed values"""
@@ -84,10 +104,10 @@ class wndw_Main(tk.Tk):
     def clear_errs(self):
         """function clears any 'clearable' errors in the error tracking dict. Note that any
         critical system-level errors are non-clearable"""
-        for k, v in self.errors.items():            #loop through all errors
-            if v.clr == True: self.errors.pop(k)    #if its clearable, then remove from dict
+        self.errors[:] = [e for e in self.errors if e.clr == False]    #keep only the non-clearable errors
 
 #-----------------------------main loop
 if __name__ == "__main__":
     app = wndw_Main()
-    app.mainloop()
\ No newline at end of file
+    try: app.mainloop()
+    finally: app.stop_dash()                #always write out the datalog and stop the CAN RX, however the loop ended
\ No newline at end of file
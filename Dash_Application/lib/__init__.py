@@ -1,8 +1,12 @@
 #import values from defines file using other namespace
 #remdinder to use the relative "." here otherwise it's not "part of the package"
 from .sys import *
+from .perf import *
 from .dash_config import *
 from .com_defs import *
 from .menu_windows import *
 from .can import *
+from .datalog import *
+from .can_proc import *
+from .replay import *
 from .dash_control import *
\ No newline at end of file
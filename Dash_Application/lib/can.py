@@ -3,10 +3,315 @@ File:       can.py
 Function:   This file contains any CAN bus specific classes and methods
 """
 from .sys import *
-from .com_defs import create_err_msg, str2dec
+from .com_defs import create_err_msg, str2dec, str2bool
 from .com_defs import err_message
+from .perf import perf_lat_track
+import heapq
+import threading
+import ast
+import math
+from array import array
+from bisect import bisect_left, insort
+
+#----------------------------------methods----------------------------------
+def CAN_filter_merge(PIDs, id_mask, max_filters):
+    """function builds the smallest list of acceptance filters (ID and mask pairs) that covers all of the
+    passed PIDs. Each PID starts as an exact match filter. While there are more filters than allowed,
+    the two neighbouring filters (in ID order) whose merge lets through the fewest extra IDs are merged.
+    A merged mask only compares the bits where both filters agree.
+
+    :param PIDs: PIDs that must pass the filters
+    :type PIDs: iterable of `int`
+    :param id_mask: mask of all ID bits - IE `sys_SFF_mask` or `sys_EFF_mask`
+    :type id_mask: `int`
+    :param max_filters: max number of filters to return
+    :type max_filters: `int` - at least 1
+    :returns: filters, in format [(can_id, can_mask),...]
+    :rtype: `list` of `tuple`
+    """
+    num_bits = id_mask.bit_length()
+    def num_pass(mask): return 1 << (num_bits - bin(mask).count('1'))  #number of IDs a mask lets through
+
+    filters = [(PID, id_mask, 1) for PID in sorted(set(PIDs))]  #temp list of filters, in format (can_id, can_mask, wanted PIDs covered)
+    while len(filters) > max(max_filters, 1):
+        best = None                                             #best merge, in format (extra IDs, index, merged mask)
+        for i in range(len(filters)-1):                         #check each neighbouring pair
+            id_a, mask_a, cnt_a = filters[i]; id_b, mask_b, cnt_b = filters[i+1]
+            mask = mask_a & mask_b & ~(id_a ^ id_b) & id_mask
+            extra = num_pass(mask) - cnt_a - cnt_b              #unwanted IDs let through by the merged filter
+            if best is None or extra < best[0]: best = (extra, i, mask)
+        extra, i, mask = best
+        merged = (filters[i][0] & mask, mask, filters[i][2] + filters[i+1][2])
+        filters[i:i+2] = [merged]
+    return [(can_id, can_mask) for can_id, can_mask, cnt in filters]
+
+#----------------------------------derived channel expressions----------------------------------
+CAN_expr_funcs = {'abs':abs, 'min':min, 'max':max, 'round':round,       #functions allowed in derived channel expressions
+                  'sqrt':math.sqrt, 'exp':math.exp, 'log':math.log, 'log10':math.log10,
+                  'floor':math.floor, 'ceil':math.ceil}
+CAN_expr_nodes = (ast.Expression, ast.Name, ast.Load, ast.Constant, ast.Call, ast.IfExp,    #syntax allowed in derived channel expressions
+                  ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+                  ast.UnaryOp, ast.UAdd, ast.USub, ast.Not,
+                  ast.BoolOp, ast.And, ast.Or,
+                  ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+def CAN_expr_compile(expr):
+    """function compiles a derived channel expression into a python function, once, so evaluating it is
+    a plain function call. The expression is parsed and checked against the allowed syntax first - only
+    numbers, channel names, arithmetic, comparisons, and/or/not, "x if cond else y", and calls to the
+    `CAN_expr_funcs` functions. There is no attribute, subscript, or builtin access.
+
+    Any other name is an input channel. The function takes the input channel values as arguments, in
+    the order of the returned input names.
+
+    :param expr: expression, IE "WBO2*14.7" or "OILP - RPM/100"
+    :type expr: `string`
+    :returns: tuple of the compiled function and the input channel names
+    :rtype: (function, `list` of `string`)
+    :raises ValueError: if the expression is not valid or uses syntax that is not allowed
+    """
+    try: tree = ast.parse(str(expr).strip(), mode='eval')
+    except SyntaxError: raise ValueError('invalid expression syntax')
+
+    inputs = []                                         #input channel names, in first use order
+    for node in ast.walk(tree):
+        if not isinstance(node, CAN_expr_nodes):
+            raise ValueError(type(node).__name__+' not allowed in expression')
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in CAN_expr_funcs or node.keywords:
+                raise ValueError('only '+', '.join(CAN_expr_funcs)+' functions allowed in expression')
+        elif isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float, bool): raise ValueError('only numbers allowed in expression')
+        elif isinstance(node, ast.Name) and node.id not in CAN_expr_funcs and node.id not in inputs:
+            inputs.append(node.id)
+
+    args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=n) for n in inputs], vararg=None,   #wrap as "lambda inputs: expr"
+                         kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+    func_tree = ast.fix_missing_locations(ast.Expression(body=ast.Lambda(args=args, body=tree.body)))
+    func = eval(compile(func_tree, '<derived>', 'eval'), {'__builtins__':{}, **CAN_expr_funcs})
+    return func, inputs
+
+class CAN_signal():
+    __slots__ = ('byte_lo', 'byte_hi', 'byteorder', 'shift', 'mask', 'sign_bit', 'sign_sub')
+
+    def __init__(self, start_bit, bit_len, endian='LITTLE', signed=False):
+        """Construct a compiled extractor for an integer value packed into a CAN data frame. All
+        of the byte/bit positions are worked out here once, so extracting a value is a single
+        int.from_bytes() of the covered bytes followed by a shift and a mask.
+
+        Bits are numbered from the LSB of the first data frame, IE bit 0 is byte 0 bit 0 and
+        bit 8 is byte 1 bit 0. The start bit is always the LSB of the value. For little endian
+        (Intel) values the remaining bits continue into the following bytes, for big endian
+        (Motorola) values they continue into the preceding bytes.
+
+        :param start_bit: bit position of the LSB of the value
+        :type start_bit: `int` from 0-63
+        :param bit_len: number of bits in the value
+        :type bit_len: `int` from 1-64
+        :param endian: byte order of the value
+        :type endian: `string` - 'LITTLE' (or 'INTEL') or 'BIG' (or 'MOTOROLA')
+        :param signed: value is a two's complement signed integer
+        :type signed: `bool`
+        """
+        if not (0 <= start_bit < 64) or not (0 < bit_len <= 64):
+            raise ValueError('start bit or bit length out of range')
+        num_bytes = (start_bit%8 + bit_len + 7)//8                  #number of bytes the value covers
+        if endian in ('LITTLE', 'INTEL'):
+            self.byteorder = 'little'
+            self.byte_lo = start_bit//8                                 #LSB byte is the first byte
+        elif endian in ('BIG', 'MOTOROLA'):
+            self.byteorder = 'big'
+            self.byte_lo = start_bit//8 - num_bytes + 1                 #LSB byte is the last byte
+        else: raise ValueError('unknown endian '+str(endian))
+        self.byte_hi = self.byte_lo + num_bytes                     #slice end of the covered bytes
+        if self.byte_lo < 0 or self.byte_hi > 8:
+            raise ValueError('value does not fit in a CAN data frame')
+
+        self.shift = start_bit%8                                    #shift from the covered bytes to the value LSB
+        self.mask = (1 << bit_len) - 1                              #mask of the value bits
+        if signed == True:
+            self.sign_bit = 1 << (bit_len - 1)                          #sign bit of the value
+            self.sign_sub = 1 << bit_len                                #subtracted to convert to a negative value
+        else:
+            self.sign_bit = 0                                           #no sign bit - never converted
+            self.sign_sub = 0
+
+    def extract(self, data):
+        """function extracts the raw integer value from the passed CAN data frames
+
+        :param data: RX'd CAN data frames
+        :type data: `bytearray` or `bytes`
+        :returns: raw (unscaled) value
+        :rtype: `int`
+        """
+        val = (int.from_bytes(data[self.byte_lo:self.byte_hi], self.byteorder) >> self.shift) & self.mask
+        if val & self.sign_bit: val -= self.sign_sub    #convert to negative if sign bit set
+        return val
+
+class CAN_signal_frames(CAN_signal):
+    __slots__ = ('frm_shifts', 'frm_len')
+
+    def __init__(self, frames):
+        """Construct a compiled extractor from the legacy whole-byte "frames" definition, where the
+        listed (0 index) frames go from LSB to MSB. Frames listed in ascending or descending
+        order are converted to a little or big endian `CAN_signal` so they use the same fast path.
+        Any other order falls back to a precomputed list of byte shifts, and needs a data length that
+        covers the highest listed frame.
+
+        :param frames: 0 index frames of the value, from LSB to MSB
+        :type frames: `list` of `int`
+        """
+        num_frms = len(frames)
+        if num_frms == 0: raise ValueError('no frames defined')
+        if num_frms == 1 or frames == list(range(frames[0], frames[0]+num_frms)):
+            super().__init__(frames[0]*8, num_frms*8, 'LITTLE')     #ascending frames are little endian
+            self.frm_shifts = None
+            self.frm_len = 0
+        elif frames == list(range(frames[0], frames[0]-num_frms, -1)):
+            super().__init__(frames[0]*8, num_frms*8, 'BIG')        #descending frames are big endian
+            self.frm_shifts = None
+            self.frm_len = 0
+        else:
+            if min(frames) < 0 or max(frames) > 7: raise ValueError('frame out of range')
+            self.frm_shifts = tuple((frm, 8*i) for i, frm in enumerate(frames))     #(frame index, shift) from LSB to MSB
+            self.frm_len = max(frames) + 1                                          #data length needed for all the frames
+
+    def extract(self, data):
+        """function extracts the raw integer value from the passed CAN data frames
+
+        :param data: RX'd CAN data frames
+        :type data: `bytearray` or `bytes`
+        :returns: raw (unscaled) value - None if the data is too short for the listed frames
+        :rtype: `int` or None
+        """
+        if self.frm_shifts is None: return CAN_signal.extract(self, data)
+        if len(data) < self.frm_len: return None        #short frame (DLC), nothing to extract
+        val = 0
+        for frm, shft in self.frm_shifts: val |= data[frm] << shft
+        return val
+
+class CAN_chfilt_EMA():
+    __slots__ = ('alpha', 'val')
+
+    def __init__(self, N):
+        """Construct an exponential moving average channel filter. The smoothing factor is set from a
+        window length like a moving average, alpha = 2/(N+1).
+
+        :param N: equivalent window length, in samples
+        :type N: `int` >= 1
+        """
+        self.alpha = 2/(N+1)            #smoothing factor
+        self.val = None                 #current filtered value, None until the first sample
+
+    def update(self, val):
+        """function adds a sample and returns the filtered value"""
+        if self.val is None: self.val = val
+        else: self.val += self.alpha*(val - self.val)
+        return self.val
+
+class CAN_chfilt_avg():
+    __slots__ = ('buf', 'indx', 'cnt', 'sum')
+
+    def __init__(self, N):
+        """Construct a moving average channel filter over the last N samples, with a running sum so an
+        update is O(1). The sum is rebuilt from the window once per wrap so float error can't build up.
+
+        :param N: window length, in samples
+        :type N: `int` >= 1
+        """
+        self.buf = array('d', bytes(8*N))   #sample window ring
+        self.indx = 0                       #next ring slot to write
+        self.cnt = 0                        #samples in the window, until full
+        self.sum = 0.0                      #running sum of the window
+
+    def update(self, val):
+        """function adds a sample and returns the filtered value"""
+        buf = self.buf; i = self.indx
+        self.sum += val - buf[i]
+        buf[i] = val
+        i += 1
+        if i == len(buf):
+            i = 0
+            self.sum = sum(buf)             #rebuild the running sum once per wrap
+        self.indx = i
+        if self.cnt < len(buf): self.cnt += 1
+        return self.sum/self.cnt
+
+class CAN_chfilt_median():
+    __slots__ = ('buf', 'srt', 'indx')
+
+    def __init__(self, N):
+        """Construct a median-of-N channel filter. Keeps the sample window as a ring (for the oldest
+        sample) and as a sorted array, so an update is two O(log N) bisects and the median is an index.
+
+        :param N: window length, in samples
+        :type N: `int` >= 1
+        """
+        self.buf = array('d', bytes(8*N))   #sample window ring
+        self.srt = array('d')               #sample window, sorted - fills up to N samples
+        self.indx = 0                       #next ring slot to write
+
+    def update(self, val):
+        """function adds a sample and returns the filtered value"""
+        buf = self.buf; srt = self.srt; i = self.indx
+        if len(srt) == len(buf): del srt[bisect_left(srt, buf[i])]  #window full, drop the oldest sample
+        insort(srt, val)
+        buf[i] = val
+        self.indx = (i + 1) % len(buf)
+        return srt[len(srt)//2]
+
+class CAN_chfilt_rate():
+    __slots__ = ('rate', 'val', 't_last')
+
+    def __init__(self, rate):
+        """Construct a rate limiter channel filter. The filtered value follows the samples but moves at
+        most `rate` units per second, which hides single sample spikes.
+
+        :param rate: max change of the value, in units per second
+        :type rate: `float` > 0
+        """
+        self.rate = rate                #max change per second
+        self.val = None                 #current filtered value, None until the first sample
+        self.t_last = 0                 #time of the last sample - monotonic clock, in seconds
+
+    def update(self, val):
+        """function adds a sample and returns the filtered value"""
+        t_now = time.monotonic()
+        if self.val is None: self.val = val
+        else:
+            step = self.rate*(t_now - self.t_last)      #max change since the last sample
+            if val > self.val + step: self.val += step
+            elif val < self.val - step: self.val -= step
+            else: self.val = val
+        self.t_last = t_now
+        return self.val
+
+def CAN_chfilt_build(filt_type, N, rate):
+    """function builds a channel filter from its config
+
+    :param filt_type: filter type - 'EMA', 'AVG' (moving average), 'MEDIAN', or 'RATE' (rate limiter)
+    :type filt_type: `string`
+    :param N: window length for EMA, AVG, and MEDIAN filters
+    :type N: `int`
+    :param rate: max change per second for RATE filters
+    :type rate: `float`
+    :returns: channel filter instance
+    :raises ValueError: if the filter type is unknown or its setting is missing or out of range
+    """
+    if filt_type == 'RATE':
+        if rate is None or rate <= 0: raise ValueError('rate must be greater than 0')
+        return CAN_chfilt_rate(rate)
+    filt_types = {'EMA':CAN_chfilt_EMA, 'AVG':CAN_chfilt_avg, 'MEDIAN':CAN_chfilt_median}
+    if filt_type not in filt_types: raise ValueError('unknown filter '+str(filt_type))
+    if N is None or N != int(N) or N < 1: raise ValueError('window must be a whole number of samples')
+    return filt_types[filt_type](int(N))
 
 class CANch():
+    is_derived = False                  #channel is computed from other channels, see `CANch_derived`
+    fields_initCFG = ('Name', 'PID', 'ext_PID', 'DLC', 'RTR', 'RTR_freq', 'timeout', 'calc_start_bit',   #attributes set by `set_cfg`, used for the compiled config cache
+                      'calc_bit_len', 'calc_endian', 'calc_signed', 'calc_frames', 'calc_Scalar', 'calc_Offset',
+                      'log_en', 'filt_type', 'filt_N', 'filt_rate')
+
     def __init__(self, CANbus_master):
         """Construct a CANch data instace. Class includes function for converting RX'd 
         data into meaningful decimal values. Additionally includes tk.DoubleVar() reference 
@@ -28,18 +333,35 @@ class CANch():
 
         #--values and conversion
         self.calc_frames = []           #the frames in the RX'd word to use when calulating the value
+        self.calc_start_bit = None      #start bit (LSB of the value) in the RX'd word - used instead of frames if defined
+        self.calc_bit_len = None        #number of bits in the value - used with start bit
+        self.calc_endian = 'LITTLE'     #byte order of the value - used with start bit
+        self.calc_signed = False        #value is a signed (two's complement) integer - used with start bit
+        self.calc_sig = None            #compiled signal extractor, built from either the frames or start bit definition
         self.calc_Scalar = None         #the final value scalar when converting frames to decimal
         self.calc_Offset = None         #the decimal offset of the caluclated value
+        self.filt_type = None           #smoothing filter type - None for no filter, see `CAN_chfilt_build`
+        self.filt_N = None              #smoothing filter window length, in samples
+        self.filt_rate = None           #rate limiter max change, in units per second
+        self.calc_filt = None           #compiled smoothing filter, built from the filter definition
 
         #--error handling
-        self.last_RX = None             #time of the last RX'd data frame
-        self.err = False                #flag that channel has an error
+        self.last_RX = None             #time of the last RX'd data frame - monotonic clock, in seconds
+        self.timeout = None             #time with no RX'd data before the channel is timed out, in seconds
+        self.err = False                #flag that channel has an error (timed out)
+        self.err_msg = None             #timeout error entry in the master error list, None if not reported
 
         #--misc
         self.log_en = False             #datalogging this channel is enabled
-        self.RTR_task = None            #reference to the RTR scheduled task
+        self.ch_id = None               #channel id - index in the CAN master channel table, used in datalogs
+        self.RTR_backoff = 1            #current RTR period multiplier set by the RTR scheduler, 1 when not backed off
+        self.cnt_RX = 0                 #total RX'd messages for this channel
+        self.lat = None                 #latency tracker, only assigned while latency tracking is enabled
         self.val_rawCAN = []            #raw RX'd CAN frame data
         self.val_dec = tk.DoubleVar()   #raw CAN frame converted to decimal
+        self.val_last = 0.0             #last value applied to the tk variable - used for derived channels without a Tk call
+        self.ele_refs = []              #dash page elements linked to this channel, in format [element class instance,...]
+        self.derived_deps = []          #derived channels that use this channel as an input, in format [CANch_derived instance,...]
     
     def set_cfg(self, **kwargs):
         """ function sets class attributes based on the passed KWARGs.
@@ -52,26 +374,70 @@ class CANch():
         kwargs = {k.upper(): v for k, v in kwargs.items()}  #convert kwarg names to uppercase. Allows for use with XML and editor attributes
         self.Name = kwargs.get('NAME', None)
         self.PID = str2dec(kwargs.get('PID', None),16)
-        self.ext_PID = kwargs.get('EXT', False)
+        self.ext_PID = str2bool(kwargs.get('EXT', None) or False)
         self.DLC = str2dec(kwargs.get('DLC', 1))
-        self.RTR = kwargs.get('REM_REQ', False)
+        self.RTR = str2bool(kwargs.get('REM_REQ', None) or False)
         if self.RTR == True:                            #if RTR enabled
-            self.RTR_freq = kwargs.get('REQ_FREQ', sys_RTR_freq_dflt)    #get RTR frequency
+            self.RTR_freq = str2dec(kwargs.get('REQ_FREQ', sys_RTR_freq_dflt))  #get RTR frequency
         else: self.RTR_freq = None                      #if not enabled then set to none
+        self.timeout = str2dec(kwargs.get('TIMEOUT', None))
+        if self.timeout is None:                        #if no timeout defined, default based on RTR
+            if self.RTR == True: self.timeout = 2*self.RTR_freq     #missed if no response for 2 RTR cycles
+            else: self.timeout = sys_RTR_freq_dflt                  #broadcast channel, use the default
         
-        self.calc_frames = kwargs.get('FRAMES', [1])
+        self.calc_start_bit = str2dec(kwargs.get('START_BIT', None))
+        self.calc_bit_len = str2dec(kwargs.get('BIT_LEN', None))
+        self.calc_endian = str(kwargs.get('ENDIAN', None) or 'LITTLE').upper()
+        self.calc_signed = str2bool(kwargs.get('SIGNED', None) or False)
+        self.calc_frames = kwargs.get('FRAMES', None)
+        if self.calc_start_bit is None and self.calc_frames is None:
+            self.calc_frames = '1'                      #if no value definition, default to the first frame
         self.calc_Scalar = str2dec(kwargs.get('SCALAR', 1))
         self.calc_Offset = str2dec(kwargs.get('OFFSET', 0))
+        self.log_en = str2bool(kwargs.get('LOG_EN', None) or False)
+        self.filt_type = kwargs.get('FILTER', None)
+        if self.filt_type is not None: self.filt_type = self.filt_type.strip().upper() or None
+        self.filt_N = str2dec(kwargs.get('FILT_N', None))
+        self.filt_rate = str2dec(kwargs.get('FILT_RATE', None))
         self.convert_calc_frames_cfg()                  #convert the read frames value to a usable format
+        self.compile_calc()                             #build the signal extractor from the value definition
+
+    def load_cfg(self, cfg_vals):
+        """function sets the class attributes from already converted config values, like from the compiled
+        config cache, and builds the signal extractor
+
+        :param cfg_vals: converted config values
+        :type cfg_vals: `dict` {attribute name:value} - see `fields_initCFG`
+        """
+        for k in self.fields_initCFG: setattr(self, k, cfg_vals.get(k))
+        self.compile_calc()
 
     def convert_calc_frames_cfg(self):
         """function converts from the user-friendly config value that is a string of 1
         index frames to the actual 0 index list that is useful for processing a CAN message"""
+        tmp_frames = None
         if self.calc_frames is not None:
             try: tmp_frames = list(literal_eval(self.calc_frames))  #convert to list
             except: tmp_frames = [literal_eval(self.calc_frames)]   #different conversion if only 1 value
             tmp_frames = [v-1 for v in tmp_frames]                  #decrement each item to conver to 0-based index
         self.calc_frames = tmp_frames                               #set to converted result
+
+    def compile_calc(self):
+        """function builds the signal extractor used when converting a RX'd CAN frame to a decimal
+        value. If a start bit is defined it is used, otherwise the value is built from the frames
+        definition. If the definition is not valid then no extractor is set and the error is
+        reported by the config error check. The smoothing filter, if defined, is also built here."""
+        self.calc_sig = None
+        try:
+            if self.calc_start_bit is not None:             #bit level definition
+                self.calc_sig = CAN_signal(self.calc_start_bit, self.calc_bit_len, self.calc_endian, self.calc_signed)
+            elif self.calc_frames:                          #legacy frames definition
+                self.calc_sig = CAN_signal_frames(self.calc_frames)
+        except (ValueError, TypeError): pass
+        self.calc_filt = None
+        if self.filt_type is not None:
+            try: self.calc_filt = CAN_chfilt_build(self.filt_type, self.filt_N, self.filt_rate)
+            except (ValueError, TypeError): pass
     
     def dashCFG_checkErrs(self):
         """function checks the required class attributes to see if they are set and if the set value is
@@ -85,48 +451,543 @@ class CANch():
         """
         tmp_err_list = []   #temp list for compiling errors
         for attr, val in self.__dict__.items():
-            if attr == 'CANbus_ref' or attr =='last_RX' or attr =='RTR_task':
+            if attr == 'CANbus_ref' or attr =='last_RX' or attr == 'ch_id' or attr == 'lat' or attr == 'err_msg':
                 continue    #skip, these are not config values
+            if attr == 'calc_frames' or attr == 'calc_start_bit' or attr == 'calc_bit_len':
+                continue    #skip, only one of the value definitions is required - checked with the signal extractor
+            if attr == 'calc_sig' and val is None:
+                tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'frames or start bit/length definition invalid'))
+                continue
+            if attr == 'filt_type' or attr == 'filt_N' or attr == 'filt_rate' or attr == 'calc_filt':
+                if attr == 'calc_filt' and val is None and self.filt_type is not None:
+                    tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'filter definition invalid'))
+                continue    #skip, the filter is optional
             if (attr != 'RTR') and (attr != 'RTR_freq') and ((val is None) or val == ''):
                 tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,attr+' undefined'))
-            elif attr == 'RTR' and (self.RTR_freq == True) and ((val is None) or val == ''):
+            elif attr == 'RTR_freq' and (self.RTR == True) and ((val is None) or val == '' or val <= 0):
                 tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'RTR is en but no freq defined'))
             elif attr == 'calc_Scalar' and (self.calc_Scalar == 0):
                 tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'Scalar is 0 - will not be a valid value'))
+            elif attr == 'timeout' and (self.timeout <= 0):
+                tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'timeout must be greater than 0'))
         return tmp_err_list #return error list
     
-    def upd_calc_dec(self):
-        """function calcualtes the current decimal value based on the
-        current rawCAN data frame"""
-        tmpval = 0
-        msb_indx = 0        #temp most-sig byte index for decimal conversion
-        for frm_indx in self.calc_frames:                       #loop through the defined frames to calcualte
-            tmpval += self.val_rawCAN[frm_indx]*(256**msb_indx)  #convert the frame to decimal from LSB to MSB
-            msb_indx += 1   #increment index
+    def calc_dec(self):
+        """function calcualtes the current decimal value based on the current rawCAN
+        data frame, and runs it through the smoothing filter if defined. Does not touch any
+        tk variables so it is safe to call from the CAN RX listener thread. The filter state
+        is updated, so only call once per RX'd frame.
+
+        :returns: converted decimal value - limited to 5 sigdigs. None if the frame was too short to decode
+        :rtype: `float` or None
+        """
+        tmpval = self.calc_sig.extract(self.val_rawCAN)    #extract raw integer value from the frame
+        if tmpval is None: return None
         tmpval *= self.calc_Scalar  #scale raw decimal result
         tmpval += self.calc_Offset  #apply final offset
-        self.val_dec.set(round(tmpval,5))    #update doublevar - limit to 5 sigdigs
-        
-    def CANch_RTR_init(self):
-        """function initializes the RTR periodic send task for this data
-        channel."""        
-        msg = self.CANbus_ref.Message(  arbitration_id=self.PID,    #PID to request data from
-                                        data=None,                  #RTR data field is empty
-                                        is_extended_id=self.ext_PID,#CAN frame config - PID is extended ID
-                                        is_remote_frame=True,       #is a RTR
-                                        dlc=self.DLC                #number requested bytes
-                                     )
-        self.RTR_task = self.CANbus_ref.send_periodic(msg, self.RTR_freq)
-    
-    def CANch_RTR_start(self):
-        """function starts the channel's RTR task"""
-        if isinstance(self.RTR_task,can.CyclicSendTaskABC): #if RTR task is defined
-            self.RTR_task.start()                           #then start RTR task
-    
-    def CANch_RTR_stop(self):
-        """function stops the channel's RTR task"""
-        if isinstance(self.RTR_task,can.CyclicSendTaskABC): #if RTR task is defined
-            self.RTR_task.stop()                            #then stop RTR task
+        if self.calc_filt is not None: tmpval = self.calc_filt.update(tmpval)  #smooth
+        return round(tmpval,5)      #limit to 5 sigdigs
+
+    def upd_calc_dec(self):
+        """function calcualtes the current decimal value based on the
+        current rawCAN data frame and updates the tk variable. Only call from the Tk thread."""
+        val = self.calc_dec()
+        if val is not None: self.val_dec.set(val)   #update doublevar, unless the frame was too short
+
+class CANch_derived(CANch):
+    is_derived = True
+    fields_initCFG = ('Name', 'expr')
+
+    def __init__(self, CANbus_master):
+        """Construct a derived CAN channel, computed from other CAN channel values with an expression
+        instead of RX'd from the bus (IE AFR from lambda). It has the same tk variable and element links
+        as a CAN channel, but no PID, RTR, or timeout of its own - it is timed out with its inputs.
+
+        :param CANbus_master: reference back to the main CANbus instance
+        :type CANbus_master: `can` library
+        """
+        super().__init__(CANbus_master)
+        self.expr = None                #expression, as defined in the config
+        self.expr_func = None           #compiled expression, called with the input channel values in `expr_inputs` order
+        self.expr_inputs = []           #names of the input channels
+        self.expr_err = None            #expression or input error message, None if OK
+        self.input_chs = []             #input channels, resolved from `expr_inputs` by the CAN core
+        self.cnt_err = 0                #evaluations that failed, IE divide by zero
+
+    def set_cfg(self, **kwargs):
+        """function sets class attributes based on the passed KWARGs, and compiles the expression
+
+        :param kwargs: dict of class inputs
+        :type kwargs: any type that can be typecast to string
+        """
+        kwargs = {k.upper(): v for k, v in kwargs.items()}  #convert kwarg names to uppercase. Allows for use with XML and editor attributes
+        self.Name = kwargs.get('NAME', None)
+        self.expr = kwargs.get('EXPR', None)
+        self.expr_func = None
+        self.expr_inputs = []
+        self.expr_err = None
+        if self.expr is None or self.expr == '': return     #reported by the config error check
+        try: self.expr_func, self.expr_inputs = CAN_expr_compile(self.expr)
+        except ValueError as e: self.expr_err = str(e)
+
+    def load_cfg(self, cfg_vals):
+        """function sets the class attributes from config values, see `CANch.load_cfg`, and compiles the expression"""
+        self.set_cfg(NAME=cfg_vals.get('Name'), EXPR=cfg_vals.get('expr'))
+
+    def dashCFG_checkErrs(self):
+        """function checks the derived channel config, see `CANch.dashCFG_checkErrs`
+
+        :returns: dict of attributes with errors
+        :rtype: `dictionary` {attribute_name:"error message"}
+        """
+        tmp_err_list = []   #temp list for compiling errors
+        if self.Name is None or self.Name == '':
+            tmp_err_list.append(create_err_msg('CAN','chCFG-derived','Name undefined'))
+        elif self.expr is None or self.expr == '':
+            tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'expression undefined'))
+        elif self.expr_err is not None:
+            tmp_err_list.append(create_err_msg('CAN','chCFG-'+self.Name,'expression error - '+self.expr_err))
+        return tmp_err_list
+
+    def calc_expr(self):
+        """function calculates the current value from the input channel values
+
+        :returns: calculated value - limited to 5 sigdigs
+        :rtype: `float`
+        :raises ArithmeticError, ValueError: if the expression can't be evaluated for these inputs
+        """
+        return round(self.expr_func(*[ch.val_last for ch in self.input_chs]), 5)
+
+class CAN_ringbuf():
+    def __init__(self, size):
+        """Construct a bounded ring buffer used to pass items from a single producer thread
+        (IE the CAN notifier) to a single consumer thread (IE the Tk main loop). The slots
+        are preallocated and no lock is used: only the producer moves the write index and only
+        the consumer moves the read index. If the buffer is full, new items are dropped and
+        counted rather than blocking the producer.
+
+        :param size: number of slots in the buffer - rounded up to a power of 2
+        :type size: `int`
+        """
+        sz = 1
+        while sz < size: sz *= 2        #round up to power of 2 so the slot index is a mask
+        self.size = sz                  #number of slots
+        self.mask = sz - 1              #slot index mask
+        self.buf = [None]*sz            #preallocated slots
+
+        #--indexes - these only ever increase, the slot is (index & mask)
+        self.wr_indx = 0                #total items written - only updated by the producer
+        self.rd_indx = 0                #total items read - only updated by the consumer
+
+        #--counters
+        self.cnt_drop = 0               #total items dropped because the buffer was full
+        self.depth_max = 0              #max depth seen by the consumer since the last reset
+
+    def push(self, item):
+        """function adds an item to the buffer. Producer thread only.
+
+        :param item: item to add
+        :type item: any
+        :returns: item was added - False if the buffer was full and the item was dropped
+        :rtype: `bool`
+        """
+        wr = self.wr_indx
+        if wr - self.rd_indx >= self.size:  #if buffer is full
+            self.cnt_drop += 1                  #count the dropped item
+            return False
+        self.buf[wr & self.mask] = item     #write slot first
+        self.wr_indx = wr + 1               #then publish it to the consumer
+        return True
+
+    def pop_all(self):
+        """function removes and returns all items currently in the buffer. Consumer thread only.
+
+        :returns: list of items in the order they were added
+        :rtype: `list`
+        """
+        rd = self.rd_indx
+        wr = self.wr_indx                   #snapshot, anything added after this is left for next time
+        depth = wr - rd
+        if depth > self.depth_max: self.depth_max = depth
+        buf = self.buf; mask = self.mask
+        items = [buf[i & mask] for i in range(rd, wr)]
+        self.rd_indx = wr                   #release the slots back to the producer
+        return items
+
+    def depth(self):
+        """function returns the number of items currently waiting in the buffer"""
+        return self.wr_indx - self.rd_indx
+
+    def reset_stats(self):
+        """function resets the buffer counters"""
+        self.cnt_drop = 0
+        self.depth_max = 0
+
+class CAN_PIDstats():
+    __slots__ = ('PID', 'is_ext', 'seq', 'cnt', 'dlc', 'ts_last', 't_last', 'data', 'byte_chg',
+                 'rate_bins', 'rate_bin', 'hist', 'hist_dlc', 'hist_indx', 'snap_last')
+
+    def __init__(self, PID, is_ext):
+        """Construct the RX statistics record for one PID, used by the CAN sniffer. All storage is
+        preallocated so updating from the RX listener does not allocate. The record is written only
+        by the RX listener thread and read by the Tk thread with `snapshot`, which uses the sequence
+        counter to make sure it never returns a half updated record.
+
+        :param PID: CAN PID
+        :type PID: `int`
+        :param is_ext: PID is an extended ID
+        :type is_ext: `bool`
+        """
+        self.PID = PID                  #CAN PID
+        self.is_ext = is_ext            #PID is an extended ID
+        self.seq = 0                    #sequence counter - odd while an update is in progress
+        self.cnt = 0                    #total RX'd messages
+        self.dlc = 0                    #last RX'd data length
+        self.ts_last = 0                #last RX'd message timestamp
+        self.t_last = 0                 #last RX time - monotonic clock, in seconds
+        self.data = bytearray()         #last RX'd data frames
+        self.byte_chg = [0]*8           #number of times each data frame changed value
+        self.rate_bins = [0]*sys_PIDrate_bins   #RX'd messages per rate bin, for the sliding window rate
+        self.rate_bin = 0               #current rate bin number (not wrapped)
+        self.hist = bytearray(8*sys_PIDhist_sz) #ring buffer of recent data frames, 8 bytes per message
+        self.hist_dlc = bytearray(sys_PIDhist_sz)   #ring buffer of recent data lengths
+        self.hist_indx = 0              #total messages written to the history ring
+        self.snap_last = None           #last consistent copy made by `snapshot`, used if the RX listener keeps updating
+
+    def update(self, data, ts, t_now):
+        """function updates the record with a RX'd message. RX listener thread only.
+
+        :param data: RX'd data frames
+        :type data: `bytearray`
+        :param ts: RX'd message timestamp
+        :type ts: `float`
+        :param t_now: RX time - monotonic clock, in seconds
+        :type t_now: `float`
+        """
+        self.seq += 1                   #odd - update in progress
+        if len(data) > 8: data = data[:8]   #stats are for classic CAN frames only
+        dlc = len(data)                 #data actually RX'd - remote frames have a DLC but no data
+        last = self.data
+        if last != data:                #only check each frame if something changed
+            chg = self.byte_chg
+            for i in range(min(len(last), dlc)):
+                if last[i] != data[i]: chg[i] += 1
+            last[:] = data              #copied in place, only resized if the length changed
+        self.dlc = dlc
+        self.cnt += 1
+        self.ts_last = ts
+        self.t_last = t_now
+
+        #--sliding window rate
+        rate_bin = int(t_now/sys_PIDrate_bin_s)
+        bins = self.rate_bins
+        if rate_bin != self.rate_bin:   #new bin, clear any bins skipped since the last message
+            for b in range(max(self.rate_bin+1, rate_bin-len(bins)+1), rate_bin+1): bins[b % len(bins)] = 0
+            self.rate_bin = rate_bin
+        bins[rate_bin % len(bins)] += 1
+
+        #--history ring
+        indx = self.hist_indx % sys_PIDhist_sz
+        self.hist[indx*8:indx*8+dlc] = data
+        self.hist_dlc[indx] = dlc
+        self.hist_indx += 1
+        self.seq += 1                   #even - update complete
+
+    def snapshot(self, t_now, inc_hist=True):
+        """function gets a consistent copy of the record. Tk thread only. A copy that overlaps an update
+        is retried after yielding to the RX listener, and after `sys_PIDsnap_tries` attempts the last
+        consistent copy is used instead.
+
+        :param t_now: current time - monotonic clock, in seconds
+        :type t_now: `float`
+        :param inc_hist: (optional) include the history ring - Default true
+        :type inc_hist: `bool`
+        :returns: dict of the record values - data frames are `bytes`, newest first for the history
+        :rtype: `dictionary` {stat_name:value}
+        """
+        tries = 0
+        while True:
+            seq = self.seq
+            if not seq & 1:             #no update in progress, so copy the record
+                cnt = self.cnt; dlc = self.dlc; ts_last = self.ts_last; t_last = self.t_last
+                data = bytes(self.data); byte_chg = self.byte_chg[:len(data)]
+                rate_bin = self.rate_bin; bins = list(self.rate_bins)
+                if inc_hist == True: hist = bytes(self.hist); hist_dlc = bytes(self.hist_dlc); hist_indx = self.hist_indx
+                else: hist = hist_dlc = None; hist_indx = 0
+                if seq == self.seq:     #no update while copying, so the copy is consistent
+                    self.snap_last = (cnt, dlc, ts_last, t_last, data, byte_chg, rate_bin, bins, hist, hist_dlc, hist_indx)
+                    break
+            tries += 1
+            if tries >= sys_PIDsnap_tries and self.snap_last is not None:  #RX listener keeps updating, use the last copy
+                cnt, dlc, ts_last, t_last, data, byte_chg, rate_bin, bins, hist, hist_dlc, hist_indx = self.snap_last
+                if hist is None or inc_hist == False: hist_indx = 0
+                break
+            time.sleep(0)               #yield so the RX listener can finish its update
+
+        #--rate over the complete bins in the window, ending at the current bin
+        bin_now = int(t_now/sys_PIDrate_bin_s)
+        cnt_win = 0
+        for b in range(bin_now-len(bins), bin_now):     #exclude the current (partial) bin
+            if rate_bin-len(bins) < b <= rate_bin: cnt_win += bins[b % len(bins)]
+        rate = cnt_win/(len(bins)*sys_PIDrate_bin_s)
+
+        hist_lst = []                   #recent data frames, newest first
+        for i in range(hist_indx-1, max(hist_indx-sys_PIDhist_sz, 0)-1, -1):
+            indx = i % sys_PIDhist_sz
+            hist_lst.append(hist[indx*8:indx*8+hist_dlc[indx]])
+
+        return {'PID':self.PID, 'is_ext':self.is_ext, 'cnt':cnt, 'rate':rate, 'dlc':dlc,
+                'ts_last':ts_last, 'age':t_now - t_last, 'data':data, 'byte_chg':byte_chg, 'hist':hist_lst}
+
+class CAN_timer_wheel():
+    def __init__(self, tick_s, num_slots):
+        """Construct a hashed timer wheel. Items are placed in the slot for their deadline tick
+        (tick modulo number of slots) and each advance only visits the slots of the ticks that have
+        passed, so the cost per tick depends on the items due, not the total items scheduled.
+        Deadlines further out than one turn of the wheel are kept in their slot until their tick comes up.
+
+        :param tick_s: wheel tick resolution, in seconds
+        :type tick_s: `float`
+        :param num_slots: number of slots in the wheel
+        :type num_slots: `int`
+        """
+        self.tick_s = tick_s                        #tick resolution
+        self.slots = [[] for _ in range(num_slots)] #scheduled items per slot, in format [(deadline tick, item),...]
+        self.t_start = None                         #wheel start time - None until started
+        self.tick_indx = 0                          #last tick processed
+
+    def start(self, t_now):
+        """function clears and starts the wheel
+
+        :param t_now: current time, in seconds
+        :type t_now: `float`
+        """
+        for slot in self.slots: slot.clear()
+        self.t_start = t_now
+        self.tick_indx = 0
+
+    def schedule(self, item, deadline):
+        """function schedules an item to be returned by `advance` once the deadline has passed
+
+        :param item: item to schedule
+        :type item: any
+        :param deadline: deadline time, in seconds
+        :type deadline: `float`
+        """
+        tick = int((deadline - self.t_start)/self.tick_s) + 1   #first tick at or after the deadline
+        if tick <= self.tick_indx: tick = self.tick_indx + 1    #already passed, so due on the next tick
+        self.slots[tick % len(self.slots)].append((tick, item))
+
+    def advance(self, t_now):
+        """function advances the wheel to the current time and removes the items that are due
+
+        :param t_now: current time, in seconds
+        :type t_now: `float`
+        :returns: items with a passed deadline
+        :rtype: `list`
+        """
+        tick_now = int((t_now - self.t_start)/self.tick_s)
+        num_slots = len(self.slots)
+        due = []
+        for tick in range(self.tick_indx+1, min(tick_now, self.tick_indx+num_slots)+1): #each slot visited at most once
+            slot = self.slots[tick % num_slots]
+            if not slot: continue
+            keep = []                               #items in the slot that are due on a later turn
+            for item_tick, item in slot:
+                if item_tick <= tick_now: due.append(item)
+                else: keep.append((item_tick, item))
+            self.slots[tick % num_slots] = keep
+        if tick_now > self.tick_indx: self.tick_indx = tick_now
+        return due
+
+class CAN_RTR_entry():
+    __slots__ = ('PID', 'ext_PID', 'msg', 'period', 'chs', 'active', 't_due', 't_last', 'cnt_req')
+
+    def __init__(self, ch):
+        """Construct an RTR scheduler entry. One entry is made per requested PID, since a single
+        response updates every channel packed in that PID.
+
+        :param ch: first CAN channel requested on the PID
+        :type ch: `CANch` instance
+        """
+        self.PID = ch.PID               #PID to request data from
+        self.ext_PID = ch.ext_PID       #PID is extended ID
+        self.msg = can.Message(arbitration_id=ch.PID,       #prebuilt request message
+                               is_extended_id=ch.ext_PID,   #CAN frame config - PID is extended ID
+                               is_remote_frame=True,        #is a RTR
+                               dlc=ch.DLC)                  #number requested bytes
+        self.period = ch.RTR_freq       #base request period in seconds - fastest of the entry channels
+        self.chs = [ch]                 #CAN channels on this PID
+        self.active = True              #entry channels are visible or logged - requested at the base period
+        self.t_due = 0                  #next request time
+        self.t_last = 0                 #last request time
+        self.cnt_req = 0                #total requests sent
+
+class CAN_RTR_scheduler():
+    def __init__(self, CANbus, budget_pct):
+        """Construct the central RTR scheduler. All RTR requests are sent from one thread, ordered by
+        a heap of due times. Entries with the same period are phase staggered across the period so
+        requests are spread out rather than sent in bursts, and the total request load is limited to a
+        share of the bus with a token bucket. Entries with no visible or logged channels are requested
+        at a slower rate (see `sys_RTR_backoff`).
+
+        :param CANbus: CAN bus interface to send the requests on
+        :type CANbus: `can.BusABC`
+        :param budget_pct: max share of the bus used by RTR requests, in percent
+        :type budget_pct: `float`
+        """
+        self.CANbus = CANbus            #CAN bus interface
+        self.entries = []               #scheduler entries, one per requested PID
+        self.heap = []                  #due times, in format [(t_due, entry index),...]
+
+        #--bus budget, as a token bucket of bus bits
+        self.budget_bps = int(sys_CAN_baud)*budget_pct/100      #bus bits per second available for requests
+        self.tokens = sys_RTR_burst_frms*sys_RTR_frm_bits_EFF   #current bits available
+        self.tokens_max = self.tokens                           #bucket size - max burst
+        self.t_tokens = 0                                       #last token refill time
+
+        #--thread
+        self.thread = None              #scheduler thread
+        self.running = False            #scheduler thread should keep running
+        self.wake = threading.Event()   #set to wake the thread early - on stop or when rates change
+        self.resched = False            #entry rates changed, due times need updating
+
+        #--counters
+        self.cnt_defer = 0              #requests delayed by the bus budget
+        self.cnt_err = 0                #request send errors
+        self.t_stats = 0                #time of the last rate snapshot
+        self.stats_snap = {}            #counts at the last rate snapshot, in format {ch_name:(requests, responses)}
+        self.stats_rates = {}           #rates over the last snapshot window, in format {ch_name:(req/s, resp/s)}
+
+    def add_chs(self, CANchs):
+        """function builds the scheduler entries from the RTR channels and staggers the entry phases
+
+        :param CANchs: CAN channels to schedule - non RTR channels are ignored
+        :type CANchs: iterable of `CANch` instances
+        """
+        entry_indx = {}                                 #temp dict of entries by PID, in format {(PID, ext):entry}
+        for ch in CANchs:
+            if ch.RTR != True: continue
+            key = (ch.PID, ch.ext_PID)
+            if key in entry_indx:                       #PID already requested, share the entry
+                entry = entry_indx[key]
+                entry.chs.append(ch)
+                if ch.RTR_freq < entry.period: entry.period = ch.RTR_freq
+                if ch.DLC > entry.msg.dlc: entry.msg.dlc = ch.DLC
+            else:
+                entry_indx[key] = CAN_RTR_entry(ch)
+        self.entries = list(entry_indx.values())
+
+        groups = {}                                     #temp dict of entries by period, in format {period:[entry,...]}
+        for e in self.entries: groups.setdefault(e.period, []).append(e)
+        t_now = time.monotonic()
+        for period, grp in groups.items():              #spread each group evenly across its period
+            for k, e in enumerate(grp):
+                e.t_due = t_now + period*k/len(grp)
+                e.t_last = e.t_due - period
+        self.heap = [(e.t_due, i) for i, e in enumerate(self.entries)]
+        heapq.heapify(self.heap)
+
+    def start(self):
+        """function starts the scheduler thread"""
+        if self.running == True or not self.entries: return
+        self.running = True
+        self.t_tokens = time.monotonic()
+        self.t_stats = self.t_tokens
+        self.thread = threading.Thread(target=self.sched_loop, name='PyDash_RTR', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """function stops the scheduler thread"""
+        self.running = False
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def upd_active(self, active_chs):
+        """function updates which entries are requested at the base rate. Entries with no active channels
+        are backed off, and the channel backoff is updated so the channel timeouts scale with it.
+
+        :param active_chs: CAN channels that are visible or logged
+        :type active_chs: `set` of `CANch` instances
+        """
+        for e in self.entries:
+            e.active = any(ch in active_chs for ch in e.chs)
+            for ch in e.chs:
+                if e.active == True: ch.RTR_backoff = 1
+                else: ch.RTR_backoff = sys_RTR_backoff
+        self.resched = True
+        self.wake.set()
+
+    def entry_period(self, e):
+        """function gets the current request period of an entry"""
+        if e.active == True: return e.period
+        return e.period*sys_RTR_backoff
+
+    def sched_loop(self):
+        """scheduler thread function. Sends each entry request when due, if the bus budget allows."""
+        heap = self.heap
+        frm_bits = {False:sys_RTR_frm_bits_SFF, True:sys_RTR_frm_bits_EFF}
+        while self.running == True:
+            if self.resched == True:                    #rates changed - pull in entries that are now due sooner
+                self.resched = False
+                for i, (t_due, indx) in enumerate(heap):
+                    e = self.entries[indx]
+                    t_new = e.t_last + self.entry_period(e)     #due time at the new rate
+                    if t_new < t_due: heap[i] = (t_new, indx)
+                heapq.heapify(heap)
+
+            t_now = time.monotonic()
+            t_due, indx = heap[0]
+            if t_due > t_now:                           #nothing due, wait for the next request or a wake-up
+                self.wake.wait(t_due - t_now)
+                self.wake.clear()
+                continue
+
+            e = self.entries[indx]
+            self.tokens = min(self.tokens_max, self.tokens + (t_now - self.t_tokens)*self.budget_bps)   #refill tokens
+            self.t_tokens = t_now
+            bits = frm_bits[bool(e.ext_PID)]
+            if self.tokens < bits:                      #over budget, delay until enough tokens
+                self.cnt_defer += 1
+                heapq.heapreplace(heap, (t_now + (bits - self.tokens)/self.budget_bps, indx))
+                continue
+
+            try:
+                self.CANbus.send(e.msg)
+                e.cnt_req += 1
+            except can.CanError: self.cnt_err += 1
+            self.tokens -= bits
+            e.t_last = t_now
+            t_next = t_due + self.entry_period(e)       #keep the staggered phase
+            if t_next < t_now: t_next = t_now + self.entry_period(e)  #unless too far behind
+            e.t_due = t_next
+            heapq.heapreplace(heap, (t_next, indx))
+
+    def get_stats(self):
+        """function gets the achieved request and response rates of each RTR channel. Rates are
+        averaged over at least `sys_RTR_stats_s`.
+
+        :returns: dict of rates and current request period by channel
+        :rtype: `dictionary` {ch_name:{'req_hz':value, 'resp_hz':value, 'period':value}}
+        """
+        t_now = time.monotonic()
+        dt = t_now - self.t_stats
+        if dt >= sys_RTR_stats_s:                       #update the rates, then take a new snapshot
+            for e in self.entries:
+                for ch in e.chs:
+                    req_prev, resp_prev = self.stats_snap.get(ch.Name, (0, 0))
+                    self.stats_rates[ch.Name] = ((e.cnt_req - req_prev)/dt, (ch.cnt_RX - resp_prev)/dt)
+                    self.stats_snap[ch.Name] = (e.cnt_req, ch.cnt_RX)
+            self.t_stats = t_now
+
+        rval = {}
+        for e in self.entries:
+            for ch in e.chs:
+                req_hz, resp_hz = self.stats_rates.get(ch.Name, (0, 0))
+                rval[ch.Name] = {'req_hz':req_hz, 'resp_hz':resp_hz, 'period':self.entry_period(e)}
+        return rval
 
 class CAN_core():
     def __init__(self, master):
@@ -143,12 +1004,33 @@ class CAN_core():
         self.CANcom_OK = False      #current CAN com status
         self.PID = None             #CAN PID of this device
         self.RX_filter_en = False   #filter RX inputs to only the defined channels
+        self.RTR_budget = sys_RTR_bus_budget    #max share of the bus used by RTR requests, in percent
         self.CANchs = {}            #dictonary of CAN data channel definitions, in format {ch_name:CAN_ch instance}
+        self.CANchs_PIDindx = {}    #dispatch index of CAN data channels by PID, in format {PID:[CAN_ch instance,...]}
+        self.CANchs_derived = []    #derived channels in evaluation order (inputs before the channels that use them)
 
         #--data handling
         self.RX_filter = []         #iterable of dictionaries for the message RX filter
-        self.RX_allData = {152:[0,1,2,4,5,6]}        #dictionary of all RX'd can data, in format {PID:[data,frames,rx,....,n=8]}
+        self.RX_PIDtbl = ({}, [])   #RX stats of all RX'd PIDs, in format ({PID:CAN_PIDstats}, [CAN_PIDstats,...]) - list is in first RX'd order
         self.CAN_notifier = None    #instance of the CAN notifier for RX'd messages
+        self.RX_filehandler = None  #Tk file handler for RX'd messages, in format (tk ref, file descriptor) - instead of the notifier
+        self.RX_listener = None     #listener function called by the Tk file handler
+        self.RX_proc = None         #multi-process ingest instance - instead of the notifier, see `can_proc.py`
+        self.datalogger = None      #instance of the datalogger, when logging is active
+        self.RX_ingest = CAN_ringbuf(sys_CAN_ingest_sz) #decoded values from the RX listener, in format (CAN_ch instance, value, CAN timestamp, RX time)
+        self.lat_track_en = False   #track CAN to display latency per channel - see `CAN_lat_track_set`
+        self.lat_pend = []          #values applied since the last frame render, in format (latency tracker, CAN timestamp, RX time, apply time)
+
+        #--RTR requests
+        self.RTR_sched = None       #RTR scheduler instance, once RTR is initialized
+        self.RTR_visible = set()    #CAN channels on the displayed page, used to set the RTR rates
+
+        #--channel timeouts
+        self.tmo_wheel = CAN_timer_wheel(sys_CAN_tmo_tick_s, sys_CAN_tmo_slots)   #timer wheel of channel timeout deadlines
+
+        #--ingest counters
+        self.ingest_drain_ms = 0    #time of the last ingest drain, in ms
+        self.ingest_drain_max_ms = 0    #max ingest drain time since the last reset, in ms
 
     def set_cfg(self, **kwargs):
         """ function sets class attributes based on the passed KWARGs.
@@ -162,7 +1044,8 @@ class CAN_core():
 
         self.PID = kwargs.get('BASE_PID', sys_default_PID)  #get PID
         self.PID = str2dec(self.PID, 16)                    #convert to dec
-        self.RX_filter_en = kwargs.get('RX_FILTER', False)
+        self.RX_filter_en = str2bool(kwargs.get('RX_FILTER', None) or False)
+        self.RTR_budget = str2dec(kwargs.get('RTR_BUDGET', sys_RTR_bus_budget))
     
     def CAN_add_channels(self, CANchs):
         """function adds the passed CAN channels to the class dictionary
@@ -173,6 +1056,71 @@ class CAN_core():
         """
         for k,v in CANchs.items():      #cycle through passed channels
             self.CANchs.update({k:v})   #update the class dict
+            if self.tmo_wheel.t_start is not None and v.is_derived == False:
+                self.CAN_tmo_sched(v, time.monotonic())     #if already tracking timeouts, start tracking
+        self.CAN_upd_PIDindx()          #rebuild the PID dispatch index
+        self.CAN_upd_derived()          #and the derived channel inputs
+
+    def CAN_rem_channels(self, ch_names):
+        """function removes the passed CAN channels from the class dictionary
+        that stores all the required CAN channels that get remote data
+
+        :param ch_names: names of the can channels to remove
+        :type ch_names: iterable of `string` channel names
+        """
+        for k in ch_names:              #cycle through passed channel names
+            self.CANchs.pop(k, None)    #remove from the class dict, if defined
+        self.CAN_upd_PIDindx()          #rebuild the PID dispatch index
+        self.CAN_upd_derived()          #and the derived channel inputs
+
+    def CAN_upd_PIDindx(self):
+        """function rebuilds the PID dispatch index used when processing RX'd messages. Several
+        channels can share one PID (IE packed ECU broadcast frames) so each PID maps to a list
+        of channels. The new index is built separately and then swapped in, so the RX listener
+        never sees a partially built index."""
+        tmp_indx = {}                                       #temp dict for the new index
+        for i, v in enumerate(self.CANchs.values()):        #cycle through all CAN channels
+            v.ch_id = i                                         #update channel id to its table index
+            if v.is_derived == True: continue                   #derived channels are not RX'd
+            tmp_indx.setdefault(v.PID, []).append(v)            #and add to the list for its PID
+        self.CANchs_PIDindx = tmp_indx                      #swap in the new index
+
+    def CAN_upd_derived(self):
+        """function resolves the derived channel inputs and rebuilds the evaluation order. Each channel
+        lists the derived channels that use it, so only derived channels with a changed input are
+        evaluated. The order is topological (inputs before the derived channels that use them), so a
+        derived channel using another derived channel sees its new value in the same drain. Derived
+        channels with an unknown input or in a dependency loop get an error and are not evaluated."""
+        for v in self.CANchs.values(): v.derived_deps = []
+        derived = [v for v in self.CANchs.values() if v.is_derived == True]
+        for d in derived:
+            d.input_chs = []
+            if d.expr_func is None: continue                    #expression didn't compile - error already set
+            d.expr_err = None
+            missing = [n for n in d.expr_inputs if n not in self.CANchs]
+            if missing:
+                d.expr_err = 'unknown channel '+', '.join(missing)
+                continue
+            d.input_chs = [self.CANchs[n] for n in d.expr_inputs]
+            for ch in d.input_chs: ch.derived_deps.append(d)
+
+        num_in = {d:sum(1 for ch in d.input_chs if ch.is_derived == True) for d in derived}    #derived inputs not yet ordered
+        order = [d for d in derived if num_in[d] == 0 and d.input_chs]
+        for d in order:                                     #order grows as derived inputs are ordered
+            for dd in d.derived_deps:
+                num_in[dd] -= 1
+                if num_in[dd] == 0: order.append(dd)
+        for d in derived:
+            if d.input_chs and num_in[d] > 0: d.expr_err = 'dependency loop or unresolved derived input'
+        self.CANchs_derived = order
+
+    def CAN_get_ch_table(self):
+        """function gets the channel table, used to identify channels in datalogs
+
+        :returns: list of channel info, in channel id order
+        :rtype: `list` of (ch_id, name, PID, ext, log_en) tuples
+        """
+        return [(v.ch_id, v.Name, v.PID, v.ext_PID, v.log_en) for v in self.CANchs.values() if v.is_derived == False]
 
     def chk_exist_CANch(self, ch_name):
         """function checks if CAN data channel is currently defined
@@ -202,6 +1150,8 @@ class CAN_core():
             tmp_err_list.append(create_err_msg('CAN','CFG','No base PID is defined and is required'))
         if self.RX_filter_en is None or self.RX_filter_en == '':
             tmp_err_list.append(create_err_msg('CAN','CFG','CAN RX msg filter enable undefined'))
+        if self.RTR_budget is None or not (0 < self.RTR_budget <= 100):
+            tmp_err_list.append(create_err_msg('CAN','CFG','RTR bus budget must be 0-100 percent'))
 
         for v in self.CANchs.values():                          #cycle through all CAN channels
             ch_err = v.dashCFG_checkErrs()                      #and check for channel errors
@@ -212,6 +1162,9 @@ class CAN_core():
     
     def CAN_init(self):
         """function sets up CANbus hardware interface and instances hardware control"""
+        if sys_replay_log is not None:                              #in replay mode, use a virtual bus instead of the hardware
+            self.CAN_init_virtual(sys_replay_chnl)
+            return
 
         sys_string = "sudo /sbin/ip link set "                      #build system string for HW intialization
         sys_string += sys_HW_chnl                                   #channel=can0
@@ -226,6 +1179,19 @@ class CAN_core():
         except:                                                     #record an error if unsuccessful
             self.master_ref.upd_errors([create_err_msg('CAN','HW','Unable to start CANbus - hardware error')])
         
+    def CAN_init_virtual(self, chnl):
+        """function sets up a python-can virtual bus in place of the CANbus hardware interface.
+        Used for replay and benchmarking without any CAN hardware.
+
+        :param chnl: virtual bus channel name
+        :type chnl: `string`
+        """
+        try:
+            self.CANbus = can.interface.Bus(channel=chnl, interface='virtual')  #instance virtual CAN object
+            self.CANcom_OK = True                                               #set the CAN status as OK
+        except can.CanError:
+            self.master_ref.upd_errors([create_err_msg('CAN','HW','Unable to start virtual CANbus')])
+
     def CAN_set_RXlistener(self, CANrx_listener_func):
         """function assigns the listener method for any RX'd messages.
         This typically is a function that handles any RX'd messages and
@@ -236,82 +1202,463 @@ class CAN_core():
         """
         self.CAN_notifier = can.Notifier(self.CANbus, [CANrx_listener_func])    #assign listener to notifier
 
+    def CAN_set_RXproc(self, RX_proc):
+        """function hands RX'ing messages over to a separate ingest process. This bus is then only used to
+        send RTR requests, so it is filtered down to one unused extended ID and the kernel doesn't queue
+        every RX'd message for it. The ingest process publishes values through shared memory without
+        memory barriers, so reads are validated with a per channel check word rather than assumed
+        consistent (see `can_proc.py`).
+
+        :param RX_proc: started multi-process ingest instance
+        :type RX_proc: `CAN_ingest_proc` instance
+        """
+        self.RX_proc = RX_proc
+        try: self.CANbus.set_filters([{'can_id':sys_EFF_mask, 'can_mask':sys_EFF_mask, 'extended':True}])
+        except: pass    #catch for cases where CAN is not instanced due to error
+
+    def CAN_set_RXfilehandler(self, tk_ref, CANrx_listener_func):
+        """function assigns the listener method for any RX'd messages, called from the Tk thread instead
+        of a notifier thread. The CAN socket is registered as a Tk file handler, so the Tk main loop wakes
+        when messages are waiting and passes all of them to the listener in one batch. This removes the
+        notifier thread and the thread handoffs from the RX path. Only works if the bus has a file
+        descriptor (IE socketcan, not the virtual bus) and the platform supports Tk file handlers.
+
+        :param tk_ref: any tk widget or the main window, used to access the Tk interpreter
+        :type tk_ref: `tk` widget
+        :param CANrx_listener_func: function to assign as a listener to any RX'd CAN channels
+        :type CANrx_listener_func: method/function
+        :returns: file handler was set - if False, use `CAN_set_RXlistener` instead
+        :rtype: `bool`
+        """
+        try:
+            fd = self.CANbus.fileno()
+            tk_ref.tk.createfilehandler(fd, tk.READABLE, self.CAN_RXfile_ready)
+        except (NotImplementedError, AttributeError, ValueError, tk.TclError):
+            return False                    #no file descriptor, or no Tk file handler support
+        self.RX_filehandler = (tk_ref, fd)
+        self.RX_listener = CANrx_listener_func
+        return True
+
+    def CAN_RXfile_ready(self, fd, mask):
+        """Tk file handler function, called when the CAN socket has RX'd messages waiting. Reads all
+        waiting messages without blocking, up to `sys_CAN_RXbatch_max` so a flooded bus can't stall the
+        Tk main loop, and passes each to the listener.
+
+        :param fd: (not used) - file handler related value
+        :param mask: (not used) - file handler related value
+        """
+        recv = self.CANbus.recv; listener = self.RX_listener
+        for i in range(sys_CAN_RXbatch_max):
+            CAN_msg = recv(0)
+            if CAN_msg is None: break       #no more waiting messages
+            listener(CAN_msg)
+
+    def CAN_RX_stop(self):
+        """function stops RX'ing messages, for either listener mode"""
+        if self.CAN_notifier is not None:
+            self.CAN_notifier.stop()
+            self.CAN_notifier = None
+        if self.RX_filehandler is not None:
+            tk_ref, fd = self.RX_filehandler
+            tk_ref.tk.deletefilehandler(fd)
+            self.RX_filehandler = None
+        if self.RX_proc is not None:
+            self.RX_proc.stop()
+            self.RX_proc = None
+
     def CAN_gen_RXfilters(self, rxfilter_en=False):
-        """Function TBD: function generates the requried RX filter based on the defined CANch PIDs
-        pythonCAN documentation says its a "iterable of dictionaries" with the below information:        
+        """function generates the RX filters based on the defined CANch PIDs, in the python-can format
+        of an "iterable of dictionaries":
             Format from docs: [{"can_id": 0x11, "can_mask": 0x21, "extended": False}]
 
-        To let all SFF or EFF frames through, can use the sys_EFF_mask or sys_SFF_mask
+        Channels sharing a PID share a filter. If there are more PIDs than `sys_RXfilter_max`, PIDs are
+        merged into masked filters (see `CAN_filter_merge`) which also let through some IDs that are not
+        decoded. Those are dropped at the start of the RX listener while the filter is on. The filter limit
+        is split between standard and extended PIDs by PID count, and the extended PIDs get whatever the
+        standard PIDs left over, so the total stays within the limit.
 
         :param rxfilter_en: enable input filters when defining
         :type rxfilter_en: bool - True to enable when defining
         """
+        PIDs = {False:set(), True:set()}                            #temp dict of PIDs by frame format, in format {is_ext:{PID,...}}
         for v in self.CANchs.values():                              #cycle through all defined channels
-            tmp_mask = None                                             #temp mask var
-            if v.ext_PID == True: tmp_mask = sys_EFF_mask               #if it's an extended PID, use EFF mask
-            else: tmp_mask = sys_SFF_mask                               #otherwise use standard (SFF) mask
-            self.RX_filter.append([{v.PID, tmp_mask, v.ext_PID}])       #then append filter to list
+            if v.PID is not None: PIDs[bool(v.ext_PID)].add(v.PID)
+        num_PIDs = len(PIDs[False]) + len(PIDs[True])
+
+        self.RX_filter = []                                         #rebuild the filter list
+        filt_left = sys_RXfilter_max                                #filters left in the limit
+        for is_ext, ext_PIDs in PIDs.items():                       #standard PIDs first, then extended
+            if not ext_PIDs: continue
+            if is_ext == True: id_mask = sys_EFF_mask               #if it's an extended PID, use EFF mask
+            else: id_mask = sys_SFF_mask                            #otherwise use standard (SFF) mask
+            if is_ext == False and PIDs[True]:                      #split the filter limit by PID count, keeping one for extended
+                max_filters = max(1, min(filt_left-1, sys_RXfilter_max*len(ext_PIDs)//num_PIDs))
+            else: max_filters = max(1, filt_left)                   #only or last format gets the remainder
+            filters = CAN_filter_merge(ext_PIDs, id_mask, max_filters)
+            filt_left -= len(filters)
+            for can_id, can_mask in filters:
+                self.RX_filter.append({'can_id':can_id, 'can_mask':can_mask, 'extended':is_ext})
         
         if rxfilter_en == True: self.CAN_RXfilter_on()      #if the filter enable is set, then also start after generating
+
+    def CAN_RXfilter_est_reject(self):
+        """function estimates the share of bus traffic the RX filters reject, from the PID stats. The PID
+        stats only include PIDs that were RX'd while the filter was off.
+
+        :returns: estimated rejected fraction of RX'd messages/s - None if there is no traffic to estimate from
+        :rtype: `float` 0-1 or None
+        """
+        rate_all = 0; rate_rej = 0
+        for stats in self.CAN_rx_data_get(inc_hist=False):
+            rate_all += stats['rate']
+            if not any((stats['PID'] & f['can_mask']) == (f['can_id'] & f['can_mask']) and f['extended'] == stats['is_ext']
+                       for f in self.RX_filter): rate_rej += stats['rate']
+        if rate_all == 0: return None
+        return rate_rej/rate_all
     
     def CAN_RXfilter_on(self):
         """function enables the input CAN message filter at the HW level"""
         self.RX_filter_en = True                        #set status var
+        if self.RX_proc is not None:                    #filter the bus of the ingest process instead
+            self.RX_proc.set_filters(self.RX_filter)
+            return
         try: self.CANbus.set_filters(self.RX_filter)    #enable filter
         except: pass    #catch for cases where CAN is not instanced due to error, cannot toggle filter
 
     def CAN_RXfilter_off(self):
         """function disables the input CAN message filter at the HW level"""
         self.RX_filter_en = False               #set status car
+        if self.RX_proc is not None:            #clear the filter of the ingest process bus instead
+            self.RX_proc.set_filters(None)
+            return
         try: self.CANbus.set_filters()          #per method, zero-length iterable or None will clear
         except: pass    #catch for cases where CAN is not instanced due to error, cannot toggle filter
             
     def CAN_RTR_init(self, RTR_start=False):
-        """function initializes any/all defined CAN channels that require an
-        RTR (remote transmit request) to get their data.
+        """function initializes the RTR (remote transmit request) scheduler for any/all defined
+        CAN channels that require an RTR to get their data.
         
         :param RTR_start: immediately start RTR transmits when defined
         :type RTR_start: bool - True to immediately start
         """
-        for v in self.CANchs.values():  #cycle through defined channels
-            if v.RTR == True:
-                v.CANch_RTR_init()      #instance RTR schedule for channel
-                if RTR_start==True:     #if desired to immediately start
-                    v.CANch_RTR_start() #start RTR
+        self.RTR_sched = CAN_RTR_scheduler(self.CANbus, self.RTR_budget)
+        self.RTR_sched.add_chs(self.CANchs.values())    #schedule the RTR channels
+        self.CAN_RTR_upd_active()                       #set initial rates
+        if RTR_start==True: self.CAN_RTR_ALLstart()     #if desired to immediately start
     
     def CAN_RTR_ALLstart(self):
         """function starts all RTR periodic requests
         """
-        for v in self.CANchs.values():  #cycle through defined channels
-            if v.RTR == True:
-                v.CANch_RTR_start()     #start RTR for channel
+        if self.RTR_sched is not None: self.RTR_sched.start()
                 
     def CAN_RTR_ALLstop(self):
         """function stops all RTR periodic requests
         """
-        for v in self.CANchs.values():  #cycle through defined channels
-            if v.RTR == True:
-                v.CANch_RTR_stop()      #stop RTR for channel
+        if self.RTR_sched is not None: self.RTR_sched.stop()
+
+    def CAN_RTR_set_visible(self, ch_names):
+        """function sets the CAN channels on the displayed page, and updates the RTR rates to match
+
+        :param ch_names: names of the CAN channels on the displayed page
+        :type ch_names: iterable of `string` channel names
+        """
+        self.RTR_visible = {self.CANchs[n] for n in ch_names if n in self.CANchs}
+        self.CAN_RTR_upd_active()
+
+    def CAN_RTR_upd_active(self):
+        """function updates the RTR rates for the channels that are currently visible or logged. Called
+        when the displayed page changes or logging is started/stopped."""
+        if self.RTR_sched is None: return
+        active_chs = set(self.RTR_visible)
+        log_raw = self.CAN_log_mode()
+        if log_raw is not None:                         #if logging, logged channels stay at the full rate
+            for ch in self.CANchs.values():
+                if log_raw == True or ch.log_en == True: active_chs.add(ch)
+        self.RTR_sched.upd_active(active_chs)
+
+    def CAN_log_mode(self):
+        """function gets the current datalogging mode, from the datalogger or the ingest process
+
+        :returns: None if not logging, otherwise True if logging raw frames and False if logging channel values
+        :rtype: `bool` or None
+        """
+        if self.datalogger is not None: return self.datalogger.raw_mode
+        if self.RX_proc is not None: return self.RX_proc.log_raw
+        return None
+
+    def CAN_RTR_stats(self):
+        """function gets the achieved RTR request and response rates
+
+        :returns: dict of rates by channel - empty if RTR is not initialized
+        :rtype: `dictionary` {ch_name:{'req_hz':value, 'resp_hz':value, 'period':value}}
+        """
+        if self.RTR_sched is None: return {}
+        return self.RTR_sched.get_stats()
+
+    def CAN_rx_data_update(self, CAN_msg, t_now):
+        """function updates the RX stats of the message PID, for the CAN sniffer. RX listener thread only.
+        New PIDs are only ever appended to the stats list, so the Tk thread can read it without a copy.
 
-    def CAN_rx_data_update(self, PID, data_frames):
-        """function updates the all CAN data RX'd dictionary for the CAN sniffer"""
-        self.RX_allData.update({PID:data_frames})
+        :param CAN_msg: RX'd CAN message
+        :type CAN_msg: `can.Message`
+        :param t_now: RX time - monotonic clock, in seconds
+        :type t_now: `float`
+        """
+        PID_indx, PID_list = self.RX_PIDtbl         #local ref, the table can be swapped by a clear at any time
+        stats = PID_indx.get(CAN_msg.arbitration_id)
+        if stats is None:                           #first message from this PID
+            stats = CAN_PIDstats(CAN_msg.arbitration_id, CAN_msg.is_extended_id)
+            PID_indx[CAN_msg.arbitration_id] = stats
+            PID_list.append(stats)
+        stats.update(CAN_msg.data, CAN_msg.timestamp, t_now)
     
     def CAN_rx_data_clear(self):
-        """function clears the all CAN data RX'd dictionary for the CAN sniffer"""
-        self.RX_allData.clear()
+        """function clears the RX stats of all PIDs, for the CAN sniffer. The table is swapped for an
+        empty one rather than cleared, so the RX listener never sees a partially cleared table."""
+        self.RX_PIDtbl = ({}, [])
+
+    def CAN_rx_data_get(self, inc_hist=True):
+        """function gets a consistent copy of the RX stats of all PIDs. Tk thread only.
+
+        :param inc_hist: (optional) include the payload history of each PID - Default true
+        :type inc_hist: `bool`
+        :returns: list of stats snapshots, in first RX'd order
+        :rtype: `list` of `dictionary` (see `CAN_PIDstats.snapshot`)
+        """
+        t_now = time.monotonic()
+        PID_list = self.RX_PIDtbl[1]
+        return [PID_list[i].snapshot(t_now, inc_hist) for i in range(len(PID_list))]   #length read once, new PIDs wait for the next call
 
     def CAN_msgRX_func(self, CAN_msg):
         """function processes any received CAN data packets and calls any associated
-        supporting functions as required."""
+        supporting functions as required. This is called from the CAN notifier thread, so
+        decoded values are only queued here and applied to the tk variables from the Tk
+        thread in `CAN_ingest_drain`."""
 
         rxPID = CAN_msg.arbitration_id  #RX'd address
+        if self.RX_filter_en == True and rxPID not in self.CANchs_PIDindx: return  #filtered, drop any IDs let through by merged filters
         rxMSG = CAN_msg.data            #data frames
         #CAN_msg.dlc                    #data length of the RX'd packet
         #True if rx_msg.is_extended_id == 'X' else False    #booloean for EFF data frame
 
-        self.CAN_rx_data_update(rxPID, rxMSG)       #update the raw can RX'd dict with the message
-        for v in self.CANchs.values():              #cycle through all CAN channels
-            if rxPID == v.PID:                      #if the PID corresponds to a data channel
-                v.val_rawCAN = rxMSG                    #set raw CAN frame
-                v.upd_calc_dec()                        #and update decimal value
\ No newline at end of file
+        lat_en = self.lat_track_en                  #local ref, tracking can be toggled from the Tk thread at any time
+        if lat_en == True: t_rx = time.time()       #RX time, for the latency stages
+        else: t_rx = None
+
+        logger = self.datalogger                    #local ref, logging can be stopped from the Tk thread at any time
+        log_ch = False                              #log decoded channel values
+        if logger is not None:
+            if logger.raw_mode == True: logger.log_raw(CAN_msg)     #log every raw frame
+            else: log_ch = True
+
+        t_mono = time.monotonic()                   #RX time for channel timeouts and PID stats
+        self.CAN_rx_data_update(CAN_msg, t_mono)    #update the PID RX stats with the message
+        for v in self.CANchs_PIDindx.get(rxPID, ()):    #cycle through only the CAN channels on this PID
+            v.val_rawCAN = rxMSG                        #set raw CAN frame
+            v.last_RX = t_mono                          #and RX time
+            v.cnt_RX += 1
+            if lat_en == True and v.lat is not None:    #if tracking latency, time the decode
+                t_dec = time.perf_counter()
+                val = v.calc_dec()
+                v.lat.decode.add((time.perf_counter() - t_dec)*1e6)
+                if CAN_msg.timestamp > 0: v.lat.bus.add((t_rx - CAN_msg.timestamp)*1e6)
+            else: val = v.calc_dec()                    #calculate the decimal value
+            if val is None: continue                    #frame too short for the channel, skip the update
+            self.RX_ingest.push((v, val, CAN_msg.timestamp, t_rx))  #and queue it for the Tk thread
+            if log_ch == True and v.log_en == True:
+                logger.log_ch(v.ch_id, val, CAN_msg.timestamp)  #queue the value for the datalog
+
+    def CAN_ingest_drain(self):
+        """function applies all queued RX'd channel values to their tk variables. Only the
+        last queued value for each channel is applied, so a fast channel only triggers one
+        update per call. Must be called from the Tk thread, typically once per display refresh."""
+        t_start = time.perf_counter()               #start time for drain counters
+
+        if self.RX_proc is not None: latest = self.RX_proc.read()  #multi-process ingest, read the shared table
+        else:
+            latest = {}                             #temp dict of the last value per channel, in format {CAN_ch instance:(value, CAN timestamp, RX time)}
+            for ch, val, ts, t_rx in self.RX_ingest.pop_all():  #cycle through all queued values, in RX order
+                latest[ch] = (val, ts, t_rx)                    #keep only the latest value
+        for ch, rx_vals in latest.items():
+            ch.val_last = rx_vals[0]
+            if ch.err == True: self.CAN_tmo_clr_err(ch)     #channel is RX'ing again, so clear timeout before the update
+        if self.CANchs_derived: self.CAN_derived_eval(latest)   #add any derived channels with changed inputs
+        if self.lat_track_en == True:
+            for ch, rx_vals in latest.items(): self.CAN_lat_set(ch, *rx_vals)   #update doublevar and track latency
+        else:
+            for ch, rx_vals in latest.items():
+                ch.val_dec.set(rx_vals[0])          #update doublevar - triggers any element traces
+
+        self.ingest_drain_ms = (time.perf_counter() - t_start)*1000     #update drain counters
+        if self.ingest_drain_ms > self.ingest_drain_max_ms: self.ingest_drain_max_ms = self.ingest_drain_ms
+
+    def CAN_derived_eval(self, latest):
+        """function evaluates the derived channels with an input in the drained values, once each and in
+        dependency order, and adds them to the drained values. A derived channel that fails to evaluate
+        (IE divide by zero) keeps its last value.
+
+        :param latest: drained values, in format {CAN_ch instance:(value, CAN timestamp, RX time)}
+        :type latest: `dictionary` - updated in place
+        """
+        dirty = set()                               #derived channels with a changed input
+        for ch in latest: dirty.update(ch.derived_deps)
+        if not dirty: return
+        for d in self.CANchs_derived:
+            if d not in dirty: continue
+            try: val = d.calc_expr()
+            except (ArithmeticError, ValueError):
+                d.cnt_err += 1
+                continue
+            d.val_last = val
+            d.cnt_RX += 1
+            if d.err == True and not any(ch.err for ch in d.input_chs): self.CAN_tmo_clr_err(d)   #all inputs RX'ing again
+            ts = max((latest[ch][1] for ch in d.input_chs if ch in latest), default=0)  #newest input timestamp
+            latest[d] = (val, ts, None)
+            dirty.update(d.derived_deps)
+
+    def CAN_tmo_init(self):
+        """function starts channel timeout tracking. Every channel gets a full timeout from now to
+        RX its first message."""
+        t_now = time.monotonic()
+        self.tmo_wheel.start(t_now)
+        for ch in self.CANchs.values():
+            ch.err = False
+            if ch.is_derived == False: self.CAN_tmo_sched(ch, t_now)    #derived channels are timed out with their inputs
+
+    def CAN_tmo_sched(self, ch, t_now):
+        """function (re)starts timeout tracking for a channel
+
+        :param ch: CAN channel to track
+        :type ch: `CANch` instance
+        :param t_now: current monotonic time, in seconds
+        :type t_now: `float`
+        """
+        ch.last_RX = t_now
+        self.tmo_wheel.schedule(ch, t_now + ch.timeout)
+
+    def CAN_tmo_tick(self):
+        """function checks the channels with a timeout deadline that has passed. The RX listener
+        only stamps the RX time, so a due channel that RX'd since it was scheduled is just moved to its
+        new deadline. A channel is only scheduled once, so the cost stays flat with the number of
+        channels. Called from the Tk thread, typically once per display refresh."""
+        if self.tmo_wheel.t_start is None: return   #timeout tracking not started
+        t_now = time.monotonic()
+        for ch in self.tmo_wheel.advance(t_now):
+            if self.CANchs.get(ch.Name) is not ch: continue     #channel was removed, stop tracking
+            deadline = ch.last_RX + ch.timeout*ch.RTR_backoff   #scale by any RTR backoff
+            if deadline > t_now: self.tmo_wheel.schedule(ch, deadline)  #RX'd since scheduled, move to new deadline
+            else: self.CAN_tmo_set_err(ch)                              #timed out - tracking resumes on the next RX
+
+    def CAN_tmo_set_err(self, ch):
+        """function flags a channel as timed out, reports the error, and sets the linked elements to the
+        error state. A channel has at most one timeout entry in the master error list, a repeat timeout
+        replaces it with the new error time.
+
+        :param ch: CAN channel that timed out
+        :type ch: `CANch` instance
+        """
+        ch.err = True
+        if ch.is_derived == True: msg = 'an input channel timed out'
+        else: msg = 'no data RX\'d for '+str(ch.timeout)+'s'
+        err_msg = create_err_msg('CAN','RX-'+ch.Name, msg, True)
+        errors = self.master_ref.errors
+        if ch.err_msg in errors: errors[errors.index(ch.err_msg)] = err_msg     #replace the channel's last entry
+        else: self.master_ref.upd_errors([err_msg])
+        ch.err_msg = err_msg
+        for ele in ch.ele_refs: ele.set_err_state(True)
+        for d in ch.derived_deps:                   #any derived channels using this channel are also timed out
+            if d.err == False: self.CAN_tmo_set_err(d)
+
+    def CAN_tmo_clr_err(self, ch):
+        """function clears the timed out flag of a channel, removes its timeout entry from the master error
+        list, and restarts its timeout tracking. The linked elements are restored by the value update that
+        follows.
+
+        :param ch: CAN channel that RX'd data again
+        :type ch: `CANch` instance
+        """
+        ch.err = False
+        if ch.err_msg in self.master_ref.errors: self.master_ref.errors.remove(ch.err_msg)   #may already be cleared by the user
+        ch.err_msg = None
+        for ele in ch.ele_refs: ele.set_err_state(False)
+        if ch.is_derived == False: self.tmo_wheel.schedule(ch, ch.last_RX + ch.timeout*ch.RTR_backoff)
+
+    def CAN_lat_set(self, ch, val, ts, t_rx):
+        """function applies a queued RX'd value to its tk variable and tracks the queue latency stage. The
+        element traces only mark the elements dirty, so the render and total stages are added by
+        `CAN_lat_render_done` once the frame render has redrawn them.
+
+        :param ch: CAN channel the value is for
+        :type ch: `CANch` instance
+        :param val: decoded value
+        :type val: `float`
+        :param ts: CAN message timestamp - 0 if the interface does not timestamp messages
+        :type ts: `float` - seconds
+        :param t_rx: time the RX function got the message - None if queued before tracking was enabled
+        :type t_rx: `float` - seconds
+        """
+        t_set = time.time()
+        ch.val_dec.set(val)                         #update doublevar - triggers any element traces
+        lat = ch.lat
+        if lat is None or t_rx is None: return      #value was queued before tracking was enabled
+        lat.queue.add((t_set - t_rx)*1e6)
+        self.lat_pend.append((lat, ts, t_rx, t_set))
+
+    def CAN_lat_render_done(self):
+        """function adds the render and total latency stages of the values applied since the last call.
+        Called from the Tk thread once the frame render is done."""
+        if not self.lat_pend: return
+        t_done = time.time()
+        for lat, ts, t_rx, t_set in self.lat_pend:
+            lat.render.add((t_done - t_set)*1e6)
+            if ts > 0: lat.total.add((t_done - ts)*1e6)
+            else: lat.total.add((t_done - t_rx)*1e6)    #no CAN timestamp, so start from the RX time
+        self.lat_pend.clear()
+
+    def CAN_lat_track_set(self, en):
+        """function enables or disables latency tracking. Trackers are only assigned to the channels
+        while tracking is enabled, and are cleared each time tracking is enabled.
+
+        :param en: enable latency tracking
+        :type en: `bool`
+        """
+        if en == True:
+            for ch in self.CANchs.values(): ch.lat = perf_lat_track()
+            self.lat_track_en = True
+        else:
+            self.lat_track_en = False
+            self.lat_pend.clear()
+            for ch in self.CANchs.values(): ch.lat = None
+
+    def CAN_lat_track_reset(self):
+        """function clears the latency trackers of all channels"""
+        for ch in self.CANchs.values():
+            if ch.lat is not None: ch.lat.reset()
+
+    def CAN_lat_stats(self):
+        """function gets the latency stage summaries of all channels that have RX'd data while tracking
+
+        :returns: dict of latency stage summaries by channel
+        :rtype: `dictionary` {ch_name:{stage_name:{stat_name:value}}}
+        """
+        rval = {}
+        for name, ch in self.CANchs.items():
+            if ch.lat is not None and ch.lat.total.cnt > 0: rval[name] = ch.lat.get_stats()
+        return rval
+
+    def CAN_ingest_stats(self):
+        """function gets the RX ingest queue counters
+
+        :returns: dict of current queue depth, max queue depth, dropped values, and drain times
+        :rtype: `dictionary` {counter_name:value}
+        """
+        return {'depth':self.RX_ingest.depth(),
+                'depth_max':self.RX_ingest.depth_max,
+                'drops':self.RX_ingest.cnt_drop,
+                'drain_ms':self.ingest_drain_ms,
+                'drain_max_ms':self.ingest_drain_max_ms}
+
+    def CAN_ingest_stats_reset(self):
+        """function resets the RX ingest queue counters"""
+        self.RX_ingest.reset_stats()
+        self.ingest_drain_max_ms = 0
\ No newline at end of file
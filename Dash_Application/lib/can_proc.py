@@ -0,0 +1,326 @@
+"""
+File:       can_proc.py
+Function:   This file contains the optional multi-process CAN ingest. A separate process owns the CAN bus
+            RX, decodes the channel values and does any datalogging, then publishes the latest value of
+            each channel to a shared memory table. The Tk process only reads the table once per display
+            refresh, so decoding and logging run on another core and don't compete with the display for
+            the GIL. The ingest process is started with `spawn`, so it doesn't inherit the Tk process state.
+            The CAN sniffer PID stats are not published from the ingest process, so the sniffer page is not
+            available in this mode.
+
+            Shared table layout, all 8 byte values:
+                header:     write count (bumped after every channel write), RX'd frame count
+                seq:        per channel sequence number - odd while the ingest process is writing the slot
+                val:        per channel decoded value
+                ts:         per channel CAN timestamp of the value
+                chk:        per channel check word - sequence number XOR the raw value and timestamp words
+
+            The table is plain shared memory written with normal stores - there are no memory barriers
+            between the processes. On a weakly ordered CPU (IE the ARM cores of the Pi) the reader can see
+            the stores in a different order than they were made, so a matching sequence number alone does
+            not prove the value and timestamp belong together. The check word catches that case: a slot is
+            only accepted if the check word matches the sequence number, value, and timestamp that were
+            read. This is a check, not a guarantee - a torn read whose words happen to XOR to the same
+            check word would get through, but that needs the mixed old and new words to cancel out exactly.
+"""
+from .sys import *
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import queue
+import signal
+import struct
+from .datalog import dash_datalogger
+from .com_defs import create_err_msg
+
+shm_hdr_len = 2                         #number of header values in the shared table
+shm_num_arrs = 4                        #number of per channel arrays in the shared table (seq, val, ts, chk)
+shm_raw_fmt = struct.Struct('=QQ')      #raw value and timestamp words, converted to floats with `shm_flt_fmt`
+shm_flt_fmt = struct.Struct('=dd')
+mp_ctx = mp.get_context('spawn')        #fresh interpreter for the ingest process - forking would copy the Tk process
+
+#----------------------------------methods----------------------------------
+def CAN_proc_sigterm(signum, frame):
+    """ingest process SIGTERM handler. Exits through the normal cleanup so the datalog is written
+    out when the dash exits."""
+    raise SystemExit()
+
+def CAN_proc_main(bus_kwargs, ch_specs, shm_name, ctl_q, err_q, stop_evt):
+    """ingest process function. RX's every frame on the bus, decodes the channels on its PID, and
+    writes the values to the shared table. Control commands (datalogging, filters) and the stop flag
+    are only checked every `sys_CAN_proc_poll_s` so they add nothing per frame.
+
+    :param bus_kwargs: kwargs for `can.interface.Bus`
+    :type bus_kwargs: `dictionary`
+    :param ch_specs: channel decode definitions, in channel id order
+    :type ch_specs: `list` of (ch_id, PID, `CAN_signal`, scalar, offset, filter) tuples - no derived channels
+    :param shm_name: name of the shared table memory block
+    :type shm_name: `string`
+    :param ctl_q: control commands from the Tk process, in format (command, argument)
+    :type ctl_q: `multiprocessing.Queue`
+    :param err_q: error messages to the Tk process, in format [`err_message`,...]
+    :type err_q: `multiprocessing.Queue`
+    :param stop_evt: set by the Tk process to stop the ingest process
+    :type stop_evt: `multiprocessing.Event`
+    """
+    signal.signal(signal.SIGTERM, CAN_proc_sigterm)
+    table = CAN_shm_table(len(ch_specs), shm_name)
+    PIDindx = {}                                #dispatch index of channel decoders by PID, in format {PID:[(ch_id, extract func, scalar, offset, filter),...]}
+    for ch_id, PID, sig, scalar, offset, filt in ch_specs:
+        PIDindx.setdefault(PID, []).append((ch_id, sig.extract, scalar, offset, filt))
+
+    bus = None
+    logger = None                               #datalogger, when logging is active
+    filter_en = False                           #RX filter is on, drop any IDs let through by merged filters
+    try:
+        bus = can.interface.Bus(**bus_kwargs)
+        hdr = table.hdr; write = table.write
+        t_ctl = 0                               #next time to check for control commands
+        while True:
+            t_now = time.monotonic()
+            if t_now >= t_ctl:
+                t_ctl = t_now + sys_CAN_proc_poll_s
+                if stop_evt.is_set(): break
+                while True:
+                    try: cmd, arg = ctl_q.get_nowait()
+                    except queue.Empty: break
+                    if cmd == 'log_start' and logger is None:
+                        logger = dash_datalogger(*arg, err_func=err_q.put)
+                        logger.start()
+                        if logger.running == False: logger = None  #error is reported by the logger
+                    elif cmd == 'log_stop' and logger is not None:
+                        logger.stop()
+                        logger = None
+                    elif cmd == 'filters':
+                        filter_en = arg is not None
+                        bus.set_filters(arg)
+
+            CAN_msg = bus.recv(sys_CAN_proc_poll_s)
+            if CAN_msg is None: continue
+            hdr[1] += 1
+            decs = PIDindx.get(CAN_msg.arbitration_id)
+            if decs is None and filter_en == True: continue     #filtered, same as `CAN_core.CAN_msgRX_func`
+            if logger is not None and logger.raw_mode == True: logger.log_raw(CAN_msg)
+            if decs is None: continue
+            data = CAN_msg.data; ts = CAN_msg.timestamp
+            for ch_id, extract, scalar, offset, filt in decs:
+                val = extract(data)
+                if val is None: continue                        #frame too short for the channel, skip the update
+                val = val*scalar + offset                       #same as `CANch.calc_dec`
+                if filt is not None: val = filt.update(val)
+                val = round(val, 5)
+                write(ch_id, val, ts)
+                if logger is not None and logger.raw_mode == False: logger.log_ch(ch_id, val, ts)
+    except (OSError, ValueError, can.CanError) as e:
+        err_q.put([create_err_msg('CAN','Proc','Ingest process failed: '+str(e))])
+    finally:
+        if logger is not None: logger.stop()
+        if bus is not None: bus.shutdown()
+        table.close()
+
+#----------------------------------classes----------------------------------
+class CAN_shm_table():
+    def __init__(self, num_chs, shm_name=None):
+        """Construct the shared channel value table, indexed by channel id. There is a single writer
+        (the ingest process) and a single reader (the Tk process), synced with a seqlock per channel:
+        the writer makes the channel sequence number odd, writes the value, timestamp and check word,
+        then makes it even. The reader retries if the sequence number is odd, changed while it read
+        the slot, or doesn't match the check word. The writer never waits. There are no memory barriers
+        between the processes (see the file header), so on a weakly ordered CPU the sequence number alone
+        can match on a torn slot - the check word is what rejects those reads.
+
+        :param num_chs: number of channels in the table
+        :type num_chs: `int`
+        :param shm_name: (optional) name of an existing table to attach to - None to create a new table
+        :type shm_name: `string`
+        """
+        self.owner = shm_name is None   #table was created here, and is removed on close
+        sz = 8*(shm_hdr_len + shm_num_arrs*num_chs)
+        self.shm = shared_memory.SharedMemory(name=shm_name, create=self.owner, size=sz)
+        self.views = []                 #all views of the memory block, released on close
+        self.hdr = self.view(0, shm_hdr_len, 'Q')
+        self.seq = self.view(shm_hdr_len, num_chs, 'Q')
+        self.val = self.view(shm_hdr_len + num_chs, num_chs, 'd')
+        self.ts = self.view(shm_hdr_len + 2*num_chs, num_chs, 'd')
+        self.chk = self.view(shm_hdr_len + 3*num_chs, num_chs, 'Q')
+        self.val_raw = self.view(shm_hdr_len + num_chs, num_chs, 'Q')     #raw words of `val`, for the check word
+        self.ts_raw = self.view(shm_hdr_len + 2*num_chs, num_chs, 'Q')    #raw words of `ts`, for the check word
+
+        #--reader state
+        self.seq_last = [0]*num_chs     #last sequence number read per channel
+        self.cnt_wr_last = 0            #write count when the table was last fully read
+
+    def view(self, indx, num, fmt):
+        """function makes a typed view of part of the memory block
+
+        :param indx: start of the view, in 8 byte values
+        :type indx: `int`
+        :param num: number of values in the view
+        :type num: `int`
+        :param fmt: `struct` format of the values
+        :type fmt: `string` - 'Q' or 'd'
+        :rtype: `memoryview`
+        """
+        v = self.shm.buf[8*indx:8*(indx+num)].cast(fmt)
+        self.views.append(v)
+        return v
+
+    def write(self, ch_id, val, ts):
+        """function writes a channel value. Only call from the ingest process.
+
+        :param ch_id: channel id
+        :type ch_id: `int`
+        :param val: decoded value
+        :type val: `float`
+        :param ts: CAN timestamp of the value
+        :type ts: `float`
+        """
+        seq = self.seq
+        s = seq[ch_id] + 1
+        seq[ch_id] = s                  #odd - write in progress
+        self.val[ch_id] = val
+        self.ts[ch_id] = ts
+        self.chk[ch_id] = (s + 1) ^ self.val_raw[ch_id] ^ self.ts_raw[ch_id]
+        seq[ch_id] = s + 1              #even - write done
+        self.hdr[0] += 1
+
+    def read_changed(self):
+        """function reads the channels written since the last read. If nothing was written the read
+        stops at the header. A slot is read as raw words and only accepted if the sequence number is
+        even, unchanged after the read, and matches the check word. A slot that fails this after
+        `sys_CAN_proc_read_retry` tries is left for the next read. Only call from the Tk process.
+
+        :returns: changed channels, in format [(ch_id, value, CAN timestamp, number of writes),...]
+        :rtype: `list` of `tuple`
+        """
+        cnt_wr = self.hdr[0]
+        if cnt_wr == self.cnt_wr_last: return []
+        seq = self.seq; val_raw = self.val_raw; ts_raw = self.ts_raw; chk = self.chk; seq_last = self.seq_last
+        rval = []
+        read_all = True                 #all changed slots were read
+        for i in [i for i, s in enumerate(seq.tolist()) if s != seq_last[i]]:
+            for n in range(sys_CAN_proc_read_retry):
+                s = seq[i]
+                if s & 1: continue      #write in progress
+                v = val_raw[i]; t = ts_raw[i]; c = chk[i]
+                if seq[i] == s and c == s ^ v ^ t: break    #slot didn't change while reading, and isn't torn
+            else:
+                read_all = False
+                continue
+            v, t = shm_flt_fmt.unpack(shm_raw_fmt.pack(v, t))
+            rval.append((i, v, t, (s - seq_last[i])//2))
+            seq_last[i] = s
+        if read_all == True: self.cnt_wr_last = cnt_wr
+        return rval
+
+    def close(self):
+        """function releases the table, and removes it if it was created here"""
+        for v in self.views: v.release()
+        self.views = []
+        self.shm.close()
+        if self.owner == True: self.shm.unlink()
+
+class CAN_ingest_proc():
+    def __init__(self, CAN_ref):
+        """Construct the Tk process side of the multi-process ingest. Starts the ingest process,
+        applies the shared table values to the CAN channels, and passes datalogging and filter
+        changes to the ingest process.
+
+        :param CAN_ref: reference to the CAN core instance
+        :type CAN_ref: `CAN_core` instance
+        """
+        self.CAN_ref = CAN_ref          #CAN core the channels belong to
+        self.chs = []                   #CAN channels, in channel id order
+        self.table = None               #shared channel value table
+        self.proc = None                #ingest process
+        self.ctl_q = None               #control commands to the ingest process
+        self.err_q = None               #error messages from the ingest process
+        self.stop_evt = None            #stop flag for the ingest process
+        self.log_raw = None             #datalogging mode of the ingest process - None when not logging, True for raw frames
+
+    def start(self, bus_kwargs):
+        """function starts the ingest process
+
+        :param bus_kwargs: kwargs for `can.interface.Bus` in the ingest process
+        :type bus_kwargs: `dictionary`
+        """
+        self.chs = sorted(self.CAN_ref.CANchs.values(), key=lambda ch: ch.ch_id)
+        ch_specs = [(ch.ch_id, ch.PID, ch.calc_sig, ch.calc_Scalar, ch.calc_Offset, ch.calc_filt) for ch in self.chs
+                    if ch.is_derived == False]      #derived channels are evaluated in the Tk process
+        self.table = CAN_shm_table(len(self.chs))
+        self.ctl_q = mp_ctx.Queue()
+        self.err_q = mp_ctx.Queue()
+        self.stop_evt = mp_ctx.Event()
+        self.proc = mp_ctx.Process(target=CAN_proc_main, name='PyDash_CAN', daemon=True,   #daemon only so a crashed dash doesn't leave it running
+                                   args=(bus_kwargs, ch_specs, self.table.shm.name, self.ctl_q, self.err_q, self.stop_evt))
+        self.proc.start()
+
+    def stop(self):
+        """function stops the ingest process, so its datalog is written out, and releases the shared table.
+        Must be called when the dash exits, see `dash_control.dash_stop_HW_ops`. If the process doesn't stop
+        within `sys_CAN_proc_stop_s` it is terminated, which still runs its cleanup."""
+        if self.proc is None: return
+        self.stop_evt.set()
+        self.proc.join(sys_CAN_proc_stop_s)
+        if self.proc.is_alive():
+            self.proc.terminate()       #SIGTERM, handled by `CAN_proc_sigterm`
+            self.proc.join()
+        self.proc = None
+        self.table.close()
+        self.table = None
+
+    def read(self):
+        """function reads the values the ingest process wrote since the last read, and updates the
+        channel RX time and count. Also passes on any errors from the ingest process. Only call from
+        the Tk thread, typically once per display refresh.
+
+        :returns: latest value per changed channel, in format {CAN_ch instance:(value, CAN timestamp, RX time)}.
+            The RX time is always None, latency is not tracked across processes
+        :rtype: `dictionary`
+        """
+        try: self.CAN_ref.master_ref.upd_errors(self.err_q.get_nowait())
+        except queue.Empty: pass
+
+        latest = {}
+        t_now = time.monotonic()
+        chs = self.chs
+        for ch_id, val, ts, cnt in self.table.read_changed():
+            ch = chs[ch_id]
+            ch.last_RX = t_now
+            ch.cnt_RX += cnt
+            latest[ch] = (val, ts, None)
+        return latest
+
+    def log_start(self, log_dir, ch_table, raw_mode):
+        """function starts datalogging in the ingest process
+
+        :param log_dir: directory to write log files to
+        :type log_dir: `string`
+        :param ch_table: channel table to embed in the log header
+        :type ch_table: `list` of (ch_id, name, PID, ext, log_en) tuples
+        :param raw_mode: log every raw RX'd CAN frame instead of decoded channel values
+        :type raw_mode: `bool`
+        """
+        self.ctl_q.put(('log_start', (log_dir, ch_table, raw_mode)))
+        self.log_raw = raw_mode
+
+    def log_stop(self):
+        """function stops datalogging in the ingest process"""
+        self.ctl_q.put(('log_stop', None))
+        self.log_raw = None
+
+    def set_filters(self, filters):
+        """function sets the RX filters of the ingest process bus
+
+        :param filters: filters in the python-can format - None to clear
+        :type filters: `list` of `dictionary` or None
+        """
+        self.ctl_q.put(('filters', filters))
+
+    def get_stats(self):
+        """function gets the ingest process counters
+
+        :returns: dict of RX'd frames and channel writes, and if the process is running
+        :rtype: `dictionary` {counter_name:value}
+        """
+        if self.table is None: return {'frames':0, 'writes':0, 'alive':False}
+        return {'frames':self.table.hdr[1], 'writes':self.table.hdr[0], 'alive':self.proc.is_alive()}
@@ -5,12 +5,18 @@ Function:   This file contains any of the common functions used across any of th
 """
 
 from .sys import *
+import math
+from bisect import bisect_right
+from collections import OrderedDict
+try: from PIL import Image as PIL_Image, ImageTk as PIL_ImageTk
+except ImportError: PIL_Image = None    #Pillow is optional - without it images are used at their file size
 
 #-----------------------------------control dicts----------------------------------
 #--types of menu pages
 pageTypes_dict_menu = {'main_settings':'stngs', #main user configurable settings
                        'error':'err',           #current errors
-                       'CAN_sniffer':'snfr'}    #CAN sniffer
+                       'CAN_sniffer':'snfr',    #CAN sniffer
+                       'latency':'lat'}         #CAN to display latency tracking
 
 #--converting GPIO inputs to 0th index values for button controls
 GPIOconvert_dict = {sys_dash_btn1:0,
@@ -185,29 +191,112 @@ def create_err_msg(system, module, message, clearable=False):
     err_time = round((time.time()*1000)) - sys_start_time_ms
     return err_message({'time':err_time,'sys':system,'mod':module,'clr':clearable,'msg':message})
 
-def get_alert_color(val, dngrLO_lim, warnLO_lim, warnHI_lim, dngrHI_lim):
-    """Function compares the passed value to the passed limits and returns the warning or
-    danger state required for those limits
-    
-    :param val: decimal value to compare
-    :type val: `int` or `float`
-    :param dngrLO_lim: alert limit - low danger
-    :param warnLO_lim: alert limit - low warning
-    :param warnHI_lim: alert limit - high danger
-    :param dngrHI_lim: alert limit - high warning
-    :returns: name of the theme color attribute
-    :rtype: `WarnState_dict` or None - None if inside limits
-    """
-    rval = None     #temp return for alert state
-
-    if val < dngrLO_lim: rval = WarnState_dict['DNGR_LO']
-    elif val < warnLO_lim: rval = WarnState_dict['WARN_LO']
-    elif val > dngrHI_lim: rval = WarnState_dict['DNGR_HI']
-    elif val > warnHI_lim: rval = WarnState_dict['WARN_HI']
+#----------------------------------common classes----------------------------------
+class alert_bands:
+    __slots__ = ('edges', 'vals', 'hyst', 'band')
+
+    def __init__(self, lims_lo, lims_hi, vals, hyst=0):
+        """Construct a precompiled alert band lookup for an element. The limits split the value range into
+        bands (below each low limit, inside all limits, above each high limit) and each band has a ready
+        display value, IE a tuple of hex colors, so a lookup is one bisect and an index. A value equal to a
+        limit is inside it.
+
+        :param lims_lo: low limits, in ascending order (IE danger then warning)
+        :type lims_lo: iterable of `float`
+        :param lims_hi: high limits, in ascending order (IE warning then danger)
+        :type lims_hi: iterable of `float`
+        :param vals: display value of each band, from the lowest band up - one more than the number of limits
+        :type vals: `tuple`
+        :param hyst: (optional) hysteresis - a value has to cross a limit by this much to change band
+        :type hyst: `float` - Default 0, no hysteresis
+        """
+        self.edges = [*lims_lo, *(math.nextafter(lim, math.inf) for lim in lims_hi)]  #high limits are inclusive
+        self.vals = vals            #display value of each band
+        self.hyst = hyst or 0       #band change hysteresis, in channel units
+        self.band = None            #current band index, None until the first lookup
+
+    def lookup(self, val):
+        """function gets the band of the passed value, applying the hysteresis when the band changes
+
+        :param val: channel value
+        :type val: `float`
+        :returns: band index - use with `vals` for the display value
+        :rtype: `int`
+        """
+        band = bisect_right(self.edges, val)
+        crnt = self.band
+        if band != crnt and self.hyst and crnt is not None:     #only move as far as the limits crossed by the hysteresis
+            if band > crnt: band = max(crnt, bisect_right(self.edges, val - self.hyst))
+            else: band = min(crnt, bisect_right(self.edges, val + self.hyst))
+        self.band = band
+        return band
+
+class dash_img_cache:
+    def __init__(self, budget_MB=sys_img_cache_MB):
+        """Construct the theme image cache. Each image is decoded once per target size and shared by every
+        page that uses it. Past the memory budget the least recently used images are dropped from the cache
+        (pages still showing a dropped image keep their own reference to it).
+
+        :param budget_MB: (optional) memory budget, in MB - Default `sys_img_cache_MB`
+        :type budget_MB: `int` or `float`
+        """
+        self.imgs = OrderedDict()           #cached images, in LRU order, in format {(path, size):(tk image, bytes)}
+        self.budget = budget_MB*1024*1024   #memory budget, in bytes
+        self.bytes = 0                      #estimated memory of the cached images, in bytes
+        self.cnt_hit = 0                    #requests served from the cache
+        self.cnt_miss = 0                   #requests that decoded the image
+        self.cnt_evict = 0                  #images dropped for the budget
+
+    def get(self, master, path, size=None):
+        """function gets a tk image of the passed file, decoding (and scaling) it only if it isn't cached
+
+        :param master: Tk root the image is created in
+        :type master: `tk.Tk` reference
+        :param path: absolute filepath to the image
+        :type path: `string`
+        :param size: (optional) target size, ignored if Pillow is not installed - Default None, file size
+        :type size: `tuple` (width, height) or None
+        :returns: tk image
+        :rtype: `tk.PhotoImage` or `ImageTk.PhotoImage`
+        """
+        if PIL_Image is None: size = None   #can't scale without Pillow
+        key = (path, size)
+        ent = self.imgs.get(key)
+        if ent is not None:
+            self.imgs.move_to_end(key)      #most recently used
+            self.cnt_hit += 1
+            return ent[0]
+        self.cnt_miss += 1
+        if size is None: img = tk.PhotoImage(master=master, file=path)
+        else:
+            with PIL_Image.open(path) as src:
+                img = PIL_ImageTk.PhotoImage(src.resize(size), master=master)
+        img_bytes = img.width()*img.height()*4  #Tk photo images are stored as 32bit pixels
+        self.imgs[key] = (img, img_bytes)
+        self.bytes += img_bytes
+        while self.bytes > self.budget and len(self.imgs) > 1:     #drop the least recently used, always keep the newest
+            _, (_, old_bytes) = self.imgs.popitem(last=False)
+            self.bytes -= old_bytes
+            self.cnt_evict += 1
+        return img
+
+    def get_stats(self):
+        """function gets the cache counters
+
+        :returns: dict of cached images, estimated memory in MB, hits, misses, and evictions
+        :rtype: `dictionary` {counter_name:value}
+        """
+        return {'imgs':len(self.imgs),
+                'MB':self.bytes/(1024*1024),
+                'hits':self.cnt_hit,
+                'misses':self.cnt_miss,
+                'evicted':self.cnt_evict}
 
-    return rval
+    def clear(self):
+        """function drops all cached images"""
+        self.imgs.clear()
+        self.bytes = 0
 
-#----------------------------------common classes----------------------------------
 class err_message:
     def __init__(self, kwargs):
         """class used for defining error messages"""
@@ -278,6 +367,7 @@ class dash_page_user(page_template):
         self.Lbl_dat = {}       #dict of data labels. Format is {'Name' : Label_Data_Class}
         self.Ind_blt = {}       #dict of bullet indicators. Format is {'Name' : Ind_Bullet_Class}
         self.Ind_bar = {}       #dict of bar indicators. Format is {'Name' : Ind_Bar_Class}
+        self.built = False      #page canvas items are built - pages are built when first shown, see `dash_control.page_build`
 
     def set_cfg(self, **kwargs):
         """ function sets class attributes based on the passed KWARGs.
@@ -318,6 +408,44 @@ class dash_page_user(page_template):
                 case Indicator_Bar():
                     self.Ind_bar.update({k:v})   #add or update bar indicator
     
+    def get_data_chs(self):
+        """function gets the CAN channels used by the data elements on the page
+
+        :returns: names of the linked CAN channels
+        :rtype: `set` of `string` channel names
+        """
+        rval = set()
+        for eles in (self.Lbl_dat, self.Ind_blt, self.Ind_bar):
+            for ele in eles.values(): rval.add(ele.data_ch)
+        return rval
+
+    def get_data_eles(self):
+        """function gets the data elements on the page, IE the elements linked to a CAN channel
+
+        :returns: data elements
+        :rtype: `list` of data element instances like `Label_Data` or `Indicator_Bullet`
+        """
+        return [*self.Lbl_dat.values(), *self.Ind_blt.values(), *self.Ind_bar.values()]
+
+    def get_upd_stats(self):
+        """function gets the update counts of the data elements on the page. An update is skipped when
+        the new value doesn't change anything visible (text at the displayed resolution, bar pixel, or color)
+
+        :returns: total updates applied and skipped, in format {'applied':count, 'skipped':count}
+        :rtype: `dictionary`
+        """
+        rval = {'applied':0, 'skipped':0}
+        for eles in (self.Lbl_dat, self.Ind_blt, self.Ind_bar):
+            for ele in eles.values():
+                rval['applied'] += ele.cnt_upd
+                rval['skipped'] += ele.cnt_skip
+        return rval
+
+    def reset_upd_stats(self):
+        """function resets the update counts of the data elements on the page"""
+        for eles in (self.Lbl_dat, self.Ind_blt, self.Ind_bar):
+            for ele in eles.values(): ele.cnt_upd = ele.cnt_skip = 0
+
     def dashCFG_checkErrs(self, theme_cfg=None, CAN_cfg=None):
         """function checks the required class attributes to see if they are set and if the set value is
         a correct format and/or reference. If it is not set, or the value is not correct for the configuration,
@@ -371,6 +499,9 @@ class dash_theme_user:
         self.colors = {}        #defined colors in format {'ref_name':#HEX_val}
         self.fonts = {}         #defined fonts in format {'ref_name':(font,information,tuple)}
         self.images = {}        #defined images in format {'ref_name':'absolute_path_string'}
+        self.fnt_objs = {}      #tk font objects of the defined fonts, for text measurement - in format {'ref_name':tkFont.Font}
+        self.txt_extents = {}   #cached text extents, in format {(font_name, text):(width, height)}
+        self.img_cache = dash_img_cache()   #decoded images, shared by all pages
 
         self.alert_FG=None      #named color for FG (text) when alert color-changing is enabled
         self.alert_warn=None    #warning named color for BG when alert color-changing is enabled
@@ -424,6 +555,33 @@ class dash_theme_user:
         for k,v in self.fonts.items():          #cycle through all the defined fonts
             self.fonts[k] = literal_eval(v)     #convert string into a tuple
 
+    def build_fnt_objs(self):
+        """function creates a tk font object for each defined font, used to measure text without a canvas
+        round trip. Needs the Tk root, so is called when the pages are built."""
+        for k,v in self.fonts.items():
+            if k not in self.fnt_objs: self.fnt_objs[k] = tkFont.Font(font=v)
+        self.txt_extents.clear()
+
+    def get_txt_extent(self, fnt_name, txt):
+        """function gets the size of the passed text drawn in the passed theme font. Sizes are cached, so
+        only a new (font, text) pair is measured by Tk.
+
+        :param fnt_name: theme font name
+        :type fnt_name: `string`
+        :param txt: text to measure
+        :type txt: `string` - single line
+        :returns: text width and height, in pixels
+        :rtype: `tuple` (width, height)
+        """
+        key = (fnt_name, txt)
+        ext = self.txt_extents.get(key)
+        if ext is None:
+            fnt = self.fnt_objs.get(fnt_name)
+            if fnt is None: fnt = self.fnt_objs[fnt_name] = tkFont.Font(font=self.fonts[fnt_name])
+            if len(self.txt_extents) >= sys_txt_extent_cache_sz: self.txt_extents.clear()     #bound the cache
+            ext = self.txt_extents[key] = (fnt.measure(txt), fnt.metrics('linespace'))
+        return ext
+
     def convert_init_img_path(self):
         """function converts the initial read image name into the actual path where it's located
         for later use in the theme config"""
@@ -520,8 +678,10 @@ class dash_config:
         includes screen resolution, backlight PWM value, and other "core" options."""
         self.Res_x = None       #window x-resolution
         self.Res_y = None       #window y-resolution
-        self.Refresh = None     #refresh rate - default of approx 15Hz in ms
+        self.Refresh = None     #display refresh period, in ms - page elements are redrawn once per refresh
         self.Baklite = None     #backlight brightness - default full bright
+        self.Log_en = False     #datalogging enabled on start - default off
+        self.Log_raw = False    #datalog all raw CAN frames instead of decoded channels - default off
     
     def upd_cfg(self, **kwargs):
         """ function sets attributes based on the passed KWARGs. All KWARGs have default values
@@ -535,6 +695,8 @@ class dash_config:
         if 'RES_Y' in kwargs: self.Res_y = str2dec(kwargs.get('RES_Y'))
         if 'REFRESH' in kwargs: self.Refresh = str2dec(kwargs.get('REFRESH'))
         if 'BAKLITE' in kwargs: self.Baklite = str2dec(kwargs.get('BAKLITE'))
+        if 'LOG_EN' in kwargs: self.Log_en = str2bool(kwargs.get('LOG_EN') or False)
+        if 'LOG_RAW' in kwargs: self.Log_raw = str2bool(kwargs.get('LOG_RAW') or False)
     
     def dashCFG_checkErrs(self):
         """function checks the required class attributes to see if they are set and if the set value is
@@ -551,6 +713,8 @@ class dash_config:
         for att, val in self.__dict__.items():  #loop through all attributes
             if val is None or val == '':
                 tmp_err_list.append(create_err_msg('Dash CFG','Core',att+'-Value is required and not defined'))
+            elif att == 'Refresh' and val <= 0:
+                tmp_err_list.append(create_err_msg('Dash CFG','Core',att+'-Value must be greater than 0'))
 
         return tmp_err_list
 
@@ -577,15 +741,17 @@ class Label_Static:
 
         #--create tupple for class attributes used to generate dash config file
         self.fields_dashCFG = self.fields_editorCFG
+
+        #--create tupple for class attributes set by `init_config`, used for the compiled config cache
+        self.fields_initCFG = ('text', 'x0', 'y0', 'fill', 'name', 'font', 'pad', 'clr_bg')
     
     def init_config(self, kwargs):
         """function sets the initial element configuration values based on the passed kwargs. This is
         typically used when instancing a new element.
         
         :param kwargs: element attributes to update
-        :type kwargs: `dict` formatted {kwarg_name:value}
+        :type kwargs: `dict` formatted {KWARG_NAME:value} - names in uppercase, as read from the XML
         """
-        kwargs = {k.upper(): v for k, v in kwargs.items()}  #convert kwarg names to uppercase. Allows for use with XML and editor attributes
         self.text = kwargs.get('TEXT', None)
         self.x0 = str2dec(kwargs.get('X0', 0))
         self.y0 = str2dec(kwargs.get('Y0', 0)) 
@@ -683,28 +849,38 @@ class Label_Data:
         self.lim_WarnLo = None      #warning low limit
         self.lim_WarnHi = None      #warning high limit
         self.lim_DngrHi = None      #danger high limit
+        self.hyst = None            #alert hysteresis - a value has to cross a limit by this much to change color
 
         #-----ref vars
         self.master_ref = None      #reference back to the master window > needed for theme and font transformations
         self.canv_ref = None        #reference to the canvas instance object is drawn on
         self.objID = None           #self canvas object reference ID
         self.padID = None           #background padding object reference ID
+        self.pad_ext = None         #text extent (width, height) the pad was last sized to
+        self.pad_clr = None         #hex color the pad was last set to
         self.CAN_dec_ref = None     #refernece back to the CAN data instance decimal value that widget is based on
+        self.trace_id = None        #CAN data trace ID, while the page is displayed
+        self.alert = None           #precompiled alert bands, with (text color, pad color) hex codes per band - see `build_alert`
+        self.vis_last = None        #last rendered visual state (text, alert band) - None forces the next update
+        self.cnt_upd = 0            #count of updates applied to the canvas
+        self.cnt_skip = 0           #count of updates skipped, no visible change
 
         #--create tupple for class attributes used to save editor XML file
-        self.fields_editorCFG = ('x0', 'y0', 'fill', 'font', 'max_val', 'data_ch', 'pad', 'clr_bg', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi')
+        self.fields_editorCFG = ('x0', 'y0', 'fill', 'font', 'max_val', 'data_ch', 'pad', 'clr_bg', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi', 'hyst')
 
         #--create tupple for class attributes used to generate dash config file
-        self.fields_dashCFG = ('x0', 'y0', 'fill', 'font', 'data_ch', 'pad', 'clr_bg', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi')
+        self.fields_dashCFG = ('x0', 'y0', 'fill', 'font', 'data_ch', 'pad', 'clr_bg', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi', 'hyst')
+
+        #--create tupple for class attributes set by `init_config`, used for the compiled config cache
+        self.fields_initCFG = ('x0', 'y0', 'fill', 'font', 'name', 'data_ch', 'sigdig', 'pad', 'clr_bg', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi', 'hyst')
     
     def init_config(self, kwargs):
         """function sets the initial element configuration values based on the passed kwargs. This is
         typically used when instancing a new element.
         
         :param kwargs: element attributes to update
-        :type kwargs: `dict` formatted {kwarg_name:value}
+        :type kwargs: `dict` formatted {KWARG_NAME:value} - names in uppercase, as read from the XML
         """
-        kwargs = {k.upper(): v for k, v in kwargs.items()}  #convert kwarg names to uppercase. Allows for use with XML and editor attributes
         self.x0 = str2dec(kwargs.get('X0', 0))
         self.y0 = str2dec(kwargs.get('Y0', 0))
         self.fill = kwargs.get('CLR_FG', kwargs.get('FILL', False))
@@ -719,6 +895,7 @@ class Label_Data:
         self.lim_WarnLo = str2dec(kwargs.get('LIM_WARNLO', None))
         self.lim_WarnHi = str2dec(kwargs.get('LIM_WARNHI', None))
         self.lim_DngrHi = str2dec(kwargs.get('LIM_DNGRHI', None))
+        self.hyst = str2dec(kwargs.get('HYST', None))
     
     def upd_config(self, kwargs):
         """function updates element configuration values based on the passed kwargs.
@@ -785,6 +962,9 @@ class Label_Data:
                 elif attr == 'data_ch':
                     if not self.master_ref.dash_CAN.chk_exist_CANch(val):
                         tmp_err_list.append(create_err_msg('Page',self.name,'CANch-'+val+'-not defined'))
+                elif attr == 'hyst':
+                    if val is not None and val < 0:
+                        tmp_err_list.append(create_err_msg('Page',self.name,'attr-'+attr+'-must not be negative'))
                 elif attr == 'pad':
                     if (val is None) or val == '':
                         tmp_err_list.append(create_err_msg('Page',self.name,'attr-'+attr+'-required and is undefined'))
@@ -802,9 +982,25 @@ class Label_Data:
                             tmp_err_list.append(create_err_msg('Page',self.name,'color for Limit_Warn_Hi not defined in theme'))
                         if self.lim_DngrHi is None or self.lim_DngrHi == '':
                             tmp_err_list.append(create_err_msg('Page',self.name,'color for Limit_Danger_Hi not defined in theme'))
+                        lims = [self.lim_DngrLo, self.lim_WarnLo, self.lim_WarnHi, self.lim_DngrHi]
+                        if None not in lims and '' not in lims and lims != sorted(lims):
+                            tmp_err_list.append(create_err_msg('Page',self.name,'alert limits must be in order Danger_Lo, Warn_Lo, Warn_Hi, Danger_Hi'))
 
         return tmp_err_list
     
+    def build_alert(self):
+        """function resolves the alert limits and theme colors into the precompiled alert bands. Called
+        when the element is built, after the theme is loaded."""
+        thm_ref = self.master_ref.dash_theme
+        thm_clrs = thm_ref.colors
+        clrs_norm = (thm_clrs[self.fill], thm_clrs.get(self.clr_bg))    #default text and pad colors
+        if self.warn_en == True:
+            clrs_warn = (thm_clrs[thm_ref.alert_FG], thm_clrs[thm_ref.alert_warn])
+            clrs_dngr = (thm_clrs[thm_ref.alert_FG], thm_clrs[thm_ref.alert_dngr])
+            self.alert = alert_bands((self.lim_DngrLo, self.lim_WarnLo), (self.lim_WarnHi, self.lim_DngrHi),
+                                     (clrs_dngr, clrs_warn, clrs_norm, clrs_warn, clrs_dngr), self.hyst)
+        else: self.alert = alert_bands((), (), (clrs_norm,))  #no limits, one band
+
     def update_state(self, var, indx, mode):
         """function updates the state of the dash element. Typically called when
         new CAN data that controls the widget is received
@@ -812,34 +1008,36 @@ class Label_Data:
         :param var_name: (not used) - variable trace related value
         :param indx: (not used) - variable trace related value
         :param mode: (not used) - variable trace related value"""
-        thm_ref = self.master_ref.dash_theme            #local ref for dash theme
-        thm_clrs = thm_ref.colors                       #local ref for theme colors
-        cntrl_ref = self.master_ref.dash_ctl            #local ref for dash control
-        upd_kwargs = {}                                 #temp dict of kwargs to edit/update the displayed widget
-        
         new_val = self.CAN_dec_ref.get()                #get current data value
-        new_txt = dec2str(new_val, self.sigdig)         #and convert to string
-        upd_kwargs.update({'text': new_txt})            #and update text value
-
-        if self.warn_en == True:    #if warnings are enabled, check to see if threshold crossed
-            color_attr = get_alert_color(new_val, self.lim_DngrLo, self.lim_WarnLo, self.lim_WarnHi, self.lim_DngrHi)       #get the current warning attribute
-            if color_attr is not None:                  #if alert limit is crossed, set BG and fill colors
-                fill_clr_name = thm_ref.alert_FG
-                bg_clr_name = getattr(thm_ref,color_attr)
-            else:                   #otherwise reset to default
-                fill_clr_name = self.fill
-                bg_clr_name = self.clr_bg
-        else:                       #if no warning enabled, then use default
-            fill_clr_name = self.fill
-            bg_clr_name = self.clr_bg
-        
-        fill_clr = thm_clrs[fill_clr_name]          #get appropriate color hex codes
-        bg_clr = thm_clrs[bg_clr_name]
-        upd_kwargs.update({'fill': fill_clr})       #add fill color to text update kwargs
-
-        self.canv_ref.itemconfigure(self.objID, upd_kwargs)             #update canvas object props
+        new_txt = dec2str(new_val, self.sigdig)         #and convert to string, at the displayed resolution
+        band = self.alert.lookup(new_val)               #alert band - same band for no warnings
+
+        vis_new = (new_txt, band)
+        if vis_new == self.vis_last:                #nothing visible changed, skip the canvas calls
+            self.cnt_skip += 1
+            return
+        self.vis_last = vis_new
+        self.cnt_upd += 1
+
+        fill_clr, bg_clr = self.alert.vals[band]    #get band color hex codes
+        self.canv_ref.itemconfigure(self.objID, {'text': new_txt, 'fill': fill_clr})   #update canvas object props
         if self.pad == True:                                            #if padded
-            cntrl_ref.elePad_update(self.canv_ref, self.objID, self.padID, {'fill':bg_clr})     #update pad object
+            self.master_ref.dash_ctl.elePad_set(self, new_txt, bg_clr)  #update pad object, if its size or color changed
+
+    def set_err_state(self, err):
+        """function sets or clears the error state of the dash element. Typically called when the
+        linked CAN channel times out. When cleared, the next `update_state` restores the element.
+
+        :param err: element is in the error state
+        :type err: `bool`
+        """
+        if self.objID is None: return                   #page not built - synced when it is
+        self.vis_last = None                            #force the next value update to redraw
+        if err == False: return                         #restored by the next value update
+        self.canv_ref.itemconfigure(self.objID, {'text':sys_err_txt, 'fill':sys_err_clr})  #show greyed error text
+        if self.pad == True:                            #if padded, resize pad to the error text and reset alert color
+            bg_clr = self.master_ref.dash_theme.colors[self.clr_bg]
+            self.master_ref.dash_ctl.elePad_set(self, sys_err_txt, bg_clr)
         
 class Indicator_Bullet:
     def __init__(self):
@@ -854,27 +1052,35 @@ class Indicator_Bullet:
         self.outln = None           #named outline color (see theme class)
         self.clr_lo = None          #(fill) color - low trigger
         self.clr_hi = None          #(fill) color - hi trigger
+        self.hyst = None            #hysteresis - a value has to cross a limit by this much to change color
 
         #-----ref vars
         self.master_ref = None      #reference back to the master window > needed for theme and font transformations
         self.canv_ref = None        #reference to the canvas instance object is drawn on
         self.objID = None           #canvas object reference ID - once created
         self.CAN_dec_ref = None     #refernece back to the CAN data instance decimal value that widget is based on
+        self.trace_id = None        #CAN data trace ID, while the page is displayed
+        self.alert = None           #precompiled limit bands, with the fill hex code per band - see `build_alert`
+        self.vis_last = None        #last rendered fill hex code - None forces the next update
+        self.cnt_upd = 0            #count of updates applied to the canvas
+        self.cnt_skip = 0           #count of updates skipped, no visible change
 
         #--create tupple for class attributes used to save editor XML file
-        self.fields_editorCFG = ('x0', 'y0', 'fill', 'size', 'data_ch', 'outln', 'ind_on', 'ind_off', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi')
+        self.fields_editorCFG = ('x0', 'y0', 'fill', 'size', 'data_ch', 'outln', 'ind_on', 'ind_off', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi', 'hyst')
 
         #--create tupple for class attributes used to generate dash config file
         self.fields_dashCFG = self.fields_editorCFG
+
+        #--create tupple for class attributes set by `init_config`, used for the compiled config cache
+        self.fields_initCFG = ('x0', 'y0', 'size', 'name', 'data_ch', 'lim_lo', 'lim_hi', 'outln', 'clr_lo', 'clr_hi', 'hyst')
     
     def init_config(self, kwargs):
         """function sets the initial element configuration values based on the passed kwargs. This is
         typically used when instancing a new element.
         
         :param kwargs: element attributes to update
-        :type kwargs: `dict` formatted {kwarg_name:value}
+        :type kwargs: `dict` formatted {KWARG_NAME:value} - names in uppercase, as read from the XML
         """
-        kwargs = {k.upper(): v for k, v in kwargs.items()}      #convert kwarg names to uppercase. Allows for use with XML and editor attributes
         self.x0 = str2dec(kwargs.get('X0', 0))
         self.y0 = str2dec(kwargs.get('Y0', 0))
         self.size = str2dec(kwargs.get('SIZE', None))
@@ -885,6 +1091,7 @@ class Indicator_Bullet:
         self.outln = kwargs.get('OUTLN', None)
         self.clr_lo = kwargs.get('CLR_LO', None)
         self.clr_hi = kwargs.get('CLR_HI', None)
+        self.hyst = str2dec(kwargs.get('HYST', None))
     
     def upd_config(self, kwargs):
         """function updates element configuration values based on the passed kwargs.
@@ -942,6 +1149,9 @@ class Indicator_Bullet:
                 elif attr == 'data_ch':
                     if not self.master_ref.dash_CAN.chk_exist_CANch(val):
                         tmp_err_list.append(create_err_msg('Page',self.name,'CANch-'+val+'-not defined'))
+                elif attr == 'hyst':
+                    if val is not None and val < 0:
+                        tmp_err_list.append(create_err_msg('Page',self.name,'attr-'+attr+'-must not be negative'))
                 elif attr == 'warn_en':
                     if (val is None) or val == '':
                         tmp_err_list.append(create_err_msg('Page',self.name,'attr-'+attr+'-required and is undefined'))
@@ -957,6 +1167,12 @@ class Indicator_Bullet:
 
         return tmp_err_list
     
+    def build_alert(self):
+        """function resolves the limits and theme colors into the precompiled limit bands. Called when the
+        element is built, after the theme is loaded. Between the limits the fill is unchanged."""
+        thm_clrs = self.master_ref.dash_theme.colors
+        self.alert = alert_bands((self.lim_lo,), (self.lim_hi,), (thm_clrs[self.clr_lo], None, thm_clrs[self.clr_hi]), self.hyst)
+
     def update_state(self, var, indx, mode):
         """function updates the state of the dash element. Typically called when
         new CAN data that controls the widget is received
@@ -964,19 +1180,32 @@ class Indicator_Bullet:
         :param var_name: (not used) - variable trace related value
         :param indx: (not used) - variable trace related value
         :param mode: (not used) - variable trace related value"""
-        thm_ref = self.master_ref.dash_theme            #local ref for dash theme
-        thm_clrs = thm_ref.colors                       #local ref for theme colors
-        upd_kwargs = {}                                 #temp dict of kwargs to edit/update the displayed widget
-        
         new_val = self.CAN_dec_ref.get()                #get current data value
-        
-        #--check fill state
-        if new_val > self.lim_hi:                       #if above the "high" limit
-            upd_kwargs.update({'fill': thm_clrs[self.clr_hi]})  #update fill color
-        elif new_val < self.lim_lo:                     #or below the "low" limit
-            upd_kwargs.update({'fill': thm_clrs[self.clr_lo]})  #update fill color
-
-        self.canv_ref.itemconfigure(self.objID, upd_kwargs)     #update canvas object props
+        clr = self.alert.vals[self.alert.lookup(new_val)]   #fill color - None between the limits, fill is unchanged
+
+        if clr is None or clr == self.vis_last:         #nothing visible changed, skip the canvas calls
+            self.cnt_skip += 1
+            return
+        self.vis_last = clr
+        self.cnt_upd += 1
+        self.canv_ref.itemconfigure(self.objID, {'fill': clr})  #update fill color
+
+    def set_err_state(self, err):
+        """function sets or clears the error state of the dash element. Typically called when the
+        linked CAN channel times out. When cleared the bullet is reset to the "low" color, since a value
+        between the limits does not change the fill.
+
+        :param err: element is in the error state
+        :type err: `bool`
+        """
+        if self.objID is None: return                   #page not built - synced when it is
+        if err == True:
+            clr = sys_err_clr                                               #greyed error color
+            self.vis_last = None
+        else:
+            clr = self.master_ref.dash_theme.colors[self.clr_lo]            #initial color
+            self.vis_last = clr
+        self.canv_ref.itemconfigure(self.objID, {'fill':clr})
 
 class Indicator_Bar:
     def __init__(self):
@@ -999,27 +1228,35 @@ class Indicator_Bar:
         self.lim_WarnLo = None      #warning low limit
         self.lim_WarnHi = None      #warning high limit
         self.lim_DngrHi = None      #danger high limit
+        self.hyst = None            #alert hysteresis - a value has to cross a limit by this much to change color
 
         #-----ref vars
         self.master_ref = None      #reference back to the master window > needed for theme and font transformations
         self.canv_ref = None        #reference to the canvas instance object is drawn on
         self.objID = None           #canvas object reference ID - once created
         self.CAN_dec_ref = None     #refernece back to the CAN data instance decimal value that widget is based on
+        self.trace_id = None        #CAN data trace ID, while the page is displayed
+        self.alert = None           #precompiled alert bands, with the color hex code per band - see `build_alert`
+        self.vis_last = None        #last rendered visual state (bar end pixel, alert band) - None forces the next update
+        self.cnt_upd = 0            #count of updates applied to the canvas
+        self.cnt_skip = 0           #count of updates skipped, no visible change
 
         #--create tupple for class attributes used to save editor XML file
-        self.fields_editorCFG = ('x0', 'y0', 'width', 'height', 'fill', 'data_ch', 'outln', 'ordr', 'scale_lo', 'scale_hi', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi')
+        self.fields_editorCFG = ('x0', 'y0', 'width', 'height', 'fill', 'data_ch', 'outln', 'ordr', 'scale_lo', 'scale_hi', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi', 'hyst')
 
         #--create tupple for class attributes used to generate dash config file
         self.fields_dashCFG = self.fields_editorCFG
+
+        #--create tupple for class attributes set by `init_config`, used for the compiled config cache
+        self.fields_initCFG = ('x0', 'y0', 'width', 'height', 'x1', 'y1', 'fill', 'outln', 'name', 'data_ch', 'ordr', 'scale_lo', 'scale_hi', 'warn_en', 'lim_DngrLo', 'lim_WarnLo', 'lim_WarnHi', 'lim_DngrHi', 'hyst')
     
     def init_config(self, kwargs):
         """function sets the initial element configuration values based on the passed kwargs. This is
         typically used when instancing a new element.
         
         :param kwargs: element attributes to update
-        :type kwargs: `dict` formatted {kwarg_name:value}
+        :type kwargs: `dict` formatted {KWARG_NAME:value} - names in uppercase, as read from the XML
         """
-        kwargs = {k.upper(): v for k, v in kwargs.items()}      #convert kwarg names to uppercase. Allows for use with XML and editor attributes
         self.x0 = str2dec(kwargs.get('X0', 0))
         self.y0 = str2dec(kwargs.get('Y0', 0))
         self.width = str2dec(kwargs.get('WIDTH', None))
@@ -1038,6 +1275,7 @@ class Indicator_Bar:
         self.lim_WarnLo = str2dec(kwargs.get('LIM_WARNLO', None))
         self.lim_WarnHi = str2dec(kwargs.get('LIM_WARNHI', None))
         self.lim_DngrHi = str2dec(kwargs.get('LIM_DNGRHI', None))
+        self.hyst = str2dec(kwargs.get('HYST', None))
     
     def upd_config(self, kwargs):
         """function updates element configuration values based on the passed kwargs.
@@ -1095,6 +1333,9 @@ class Indicator_Bar:
                 elif attr == 'data_ch':
                     if not self.master_ref.dash_CAN.chk_exist_CANch(val):
                         tmp_err_list.append(create_err_msg('Page',self.name,'CANch-'+val+'-not defined'))
+                elif attr == 'hyst':
+                    if val is not None and val < 0:
+                        tmp_err_list.append(create_err_msg('Page',self.name,'attr-'+attr+'-must not be negative'))
                 elif attr == 'warn_en':
                     if (val is None) or val == '':
                         tmp_err_list.append(create_err_msg('Page',self.name,'attr-'+attr+'-required and is undefined'))
@@ -1107,9 +1348,25 @@ class Indicator_Bar:
                             tmp_err_list.append(create_err_msg('Page',self.name,'color for Limit_Warn_Hi not defined in theme'))
                         if self.lim_DngrHi is None or self.lim_DngrHi == '':
                             tmp_err_list.append(create_err_msg('Page',self.name,'color for Limit_Danger_Hi not defined in theme'))
+                        lims = [self.lim_DngrLo, self.lim_WarnLo, self.lim_WarnHi, self.lim_DngrHi]
+                        if None not in lims and '' not in lims and lims != sorted(lims):
+                            tmp_err_list.append(create_err_msg('Page',self.name,'alert limits must be in order Danger_Lo, Warn_Lo, Warn_Hi, Danger_Hi'))
 
         return tmp_err_list
     
+    def build_alert(self):
+        """function resolves the alert limits and theme colors into the precompiled alert bands. Called
+        when the element is built, after the theme is loaded. Without warnings the color is never changed."""
+        thm_ref = self.master_ref.dash_theme
+        thm_clrs = thm_ref.colors
+        if self.warn_en == True:
+            clr_norm = thm_clrs[self.fill]
+            clr_warn = thm_clrs[thm_ref.alert_warn]
+            clr_dngr = thm_clrs[thm_ref.alert_dngr]
+            self.alert = alert_bands((self.lim_DngrLo, self.lim_WarnLo), (self.lim_WarnHi, self.lim_DngrHi),
+                                     (clr_dngr, clr_warn, clr_norm, clr_warn, clr_dngr), self.hyst)
+        else: self.alert = alert_bands((), (), (None,))   #no limits, one band
+
     def update_state(self, var, indx, mode):
         """function updates the state of the dash element. Typically called when
         new CAN data that controls the widget is received
@@ -1117,25 +1374,37 @@ class Indicator_Bar:
         :param var_name: (not used) - variable trace related value
         :param indx: (not used) - variable trace related value
         :param mode: (not used) - variable trace related value"""
-        thm_ref = self.master_ref.dash_theme            #local ref for dash theme
-        thm_clrs = thm_ref.colors                       #local ref for theme colors
-        upd_kwargs = {}                                 #temp dict of kwargs to edit/update the displayed widget
-        
         new_val = self.CAN_dec_ref.get()                #get current data value
 
-        #--calculate new y1 val
-        new_x1 = self.x0 + (new_val-self.scale_lo)/(self.scale_hi-self.scale_lo)*self.width
-        self.canv_ref.coords(self.objID, self.x0, self.y0, new_x1, self.y1)     #update rectangle size
-
-        #--check warning limits
-        if self.warn_en == True:
-            color_attr = get_alert_color(new_val, self.lim_DngrLo, self.lim_WarnLo, self.lim_WarnHi, self.lim_DngrHi)       #get the current warning attribute
-            if color_attr is not None:                  #if alert limit set, set BG and fill colors
-                ele_color_name = getattr(thm_ref,color_attr)
-            else:                                       #otherwise, use default config values
-                ele_color_name = self.fill
-            ele_color = thm_clrs[ele_color_name]        #get hex code from theme for color
-            upd_kwargs.update({'outline': ele_color,
-                               'fill':ele_color})       #add fill and outline to color update       
-
-        self.canv_ref.itemconfigure(self.objID, upd_kwargs)     #update canvas object props
+        #--calculate new x1 val, quantised to the displayed pixel
+        new_x1 = round(self.x0 + (new_val-self.scale_lo)/(self.scale_hi-self.scale_lo)*self.width)
+        band = self.alert.lookup(new_val)               #alert band - same band for no warnings
+
+        x1_last, band_last = self.vis_last or (None, None)
+        if new_x1 == x1_last and band == band_last:     #nothing visible changed, skip the canvas calls
+            self.cnt_skip += 1
+            return
+        self.vis_last = (new_x1, band)
+        self.cnt_upd += 1
+
+        if new_x1 != x1_last:
+            self.canv_ref.coords(self.objID, self.x0, self.y0, new_x1, self.y1)     #update rectangle size
+        ele_color = self.alert.vals[band]               #band color hex code - None if warnings are disabled
+        if band != band_last and ele_color is not None:
+            self.canv_ref.itemconfigure(self.objID, {'outline': ele_color, 'fill':ele_color})   #update canvas object colors
+
+    def set_err_state(self, err):
+        """function sets or clears the error state of the dash element. Typically called when the
+        linked CAN channel times out. When cleared the configured colors are restored, and the bar size
+        is updated by the next `update_state`.
+
+        :param err: element is in the error state
+        :type err: `bool`
+        """
+        if self.objID is None: return                   #page not built - synced when it is
+        if err == True: upd_kwargs = {'fill':sys_err_clr, 'outline':sys_err_clr}  #greyed error color
+        else:
+            thm_clrs = self.master_ref.dash_theme.colors
+            upd_kwargs = {'fill':thm_clrs[self.fill], 'outline':thm_clrs[self.outln]}   #configured colors
+        self.vis_last = None                            #force the next value update to redraw
+        self.canv_ref.itemconfigure(self.objID, upd_kwargs)
@@ -5,11 +5,14 @@ Function:   This file contains any of the functions used for checking, loading,
 """
 
 from .sys import *
-from .com_defs import check_file_exists, check_dir_exists, XML_open, create_err_msg
+from .com_defs import check_file_exists, check_dir_exists, create_err_msg
 from .com_defs import XMLcfg_types
-from .can import CANch
+from .can import CANch, CANch_derived
 from .com_defs import dash_page_user, Label_Static, Label_Data, Indicator_Bullet, Indicator_Bar, err_message
 
+XMLele_types = {'LBL_STATIC':Label_Static, 'LBL_DATA':Label_Data,   #page element classes, by XML tag
+                'IND_BLT':Indicator_Bullet, 'IND_BAR':Indicator_Bar}
+
 def check_new_config():
     """function checks if there is a new config available
     
@@ -50,16 +53,49 @@ def load_new_config(master_ref):
     else:
         master_ref.upd_errors([create_err_msg('FileSys','CFG Dir','Unknown error extracting new cfg')])
 
-def dashCFG_load(master_ref):
-    """Function loads the dash config XML file to populate the various data classes
+def dashCFG_load(master_ref, cfg_file=sys_config_file, cache_file=sys_config_cache_file, img_dir=sys_cfg_Images_dir):
+    """Function loads the dash config to populate the various data classes. If the compiled config cache
+    matches the config XML and images, the config is built directly from the cache. Otherwise the XML file
+    is parsed and checked for errors, and if there are none the compiled config is written to the cache
+    for the next boot. The load time and source are kept on the master for the perf page.
     
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
-    """   
-    xmlFile_ET = XML_open(master_ref, sys_config_file)              #open the config file 
-    if xmlFile_ET is not None: parseXML(master_ref, xmlFile_ET)     #if successful, then start parsing the contents
-    
+    :param cfg_file: path of the config XML file
+    :type cfg_file: `string`
+    :param cache_file: path of the compiled config cache
+    :type cache_file: `string`
+    :param img_dir: path of the config images directory
+    :type img_dir: `string`
+    :returns: True if the config was loaded from the cache
+    :rtype: `bool`
+    """
+    t_start = time.perf_counter()
+    cache_key = dashCFG_cache_key(cfg_file, img_dir)                #hash of the current config files
+    from_cache = False
+    if cache_key is not None:
+        cfg_data = dashCFG_cache_read(cache_file, cache_key)        #compiled config, if the cache matches
+        if cfg_data is not None:
+            dashCFG_build(master_ref, cfg_data)                     #already checked when cached, so no error check
+            from_cache = True
+    if from_cache == False:
+        cfg_data = iterparseXML(master_ref, cfg_file)                   #parse the config file
+        err_msgs = dashCFG_ErrChk(master_ref)                           #and check for any errors
+        if cfg_data is not None and not err_msgs and cache_key is not None:
+            dashCFG_cache_write(cache_file, cache_key, cfg_data)
+
+    master_ref.cfg_load_ms = (time.perf_counter() - t_start)*1000   #config load time, in ms
+    master_ref.cfg_load_src = 'cache' if from_cache == True else 'XML'
+    return from_cache
+
 def dashCFG_ErrChk(master_ref):
+    """function checks the loaded config for errors and adds any found to the master error list
+
+    :param master_ref: reference back to the main/master window
+    :type master_ref: main `tk.window` ref
+    :returns: error messages found
+    :rtype: `list`
+    """
     err_msgs = []   #temp list for compiled error messages    
     
     dash_err = master_ref.dash_settings.dashCFG_checkErrs()     #check core config errors
@@ -79,172 +115,306 @@ def dashCFG_ErrChk(master_ref):
             for err in page_err: err_msgs.append(err)
 
     master_ref.upd_errors(err_msgs) #append all error messages
+    return err_msgs
+
+def dashCFG_cache_key(cfg_file=sys_config_file, img_dir=sys_cfg_Images_dir):
+    """function hashes the contents of the config XML file and all the config images. The cache format
+    version and the config directory are hashed too, so a cache is never used by a different app version
+    or from a different location.
+
+    :param cfg_file: path of the config XML file
+    :type cfg_file: `string`
+    :param img_dir: path of the config images directory
+    :type img_dir: `string`
+    :returns: hex digest of the config, or None if the config file can't be read
+    :rtype: `string`
+    """
+    key = hashlib.sha256()
+    key.update(f"{sys_config_cache_ver}|{cfg_file}|".encode())
+    try:
+        with open(cfg_file, 'rb') as f: key.update(f.read())
+    except OSError: return None
+    if check_dir_exists(img_dir) == True:
+        for img in sorted(os.listdir(img_dir)):                 #all images, in a fixed order
+            img_path = os.path.join(img_dir, img)
+            if os.path.isfile(img_path) == False: continue
+            key.update(b'|' + img.encode() + b'|')
+            with open(img_path, 'rb') as f: key.update(f.read())
+    return key.hexdigest()
+
+def dashCFG_cache_read(cache_file, cache_key):
+    """function reads the compiled config cache. The cache is a header line with the config hash, followed
+    by the compiled config as JSON. The header is checked before the rest of the file is read, and the cache
+    only holds plain data, so a stale or foreign cache file is never run or trusted.
+
+    :param cache_file: path of the compiled config cache
+    :type cache_file: `string`
+    :param cache_key: hash of the current config, see `dashCFG_cache_key`
+    :type cache_key: `string`
+    :returns: compiled config data, or None if there is no cache or it doesn't match the current config
+    :rtype: `dict`
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            if f.readline().rstrip('\n') != cache_key: return None    #cache is for a different config
+            cfg_data = json.load(f)
+        for k in cfg_data['THEME']['FONTS']:                #JSON has no tuples, fonts are tuples
+            cfg_data['THEME']['FONTS'][k] = tuple(cfg_data['THEME']['FONTS'][k])
+    except (OSError, ValueError, KeyError, TypeError): return None     #missing or unreadable cache, parse the XML instead
+    return cfg_data
+
+def dashCFG_cache_write(cache_file, cache_key, cfg_data):
+    """function writes the compiled config cache. The cache is written to a temp file and then moved into
+    place, so a power loss part way through doesn't leave a partial cache. A failed write is ignored, the
+    XML is just parsed again on the next boot.
+
+    :param cache_file: path of the compiled config cache
+    :type cache_file: `string`
+    :param cache_key: hash of the config, see `dashCFG_cache_key`
+    :type cache_key: `string`
+    :param cfg_data: compiled config data, as returned by `iterparseXML`
+    :type cfg_data: `dict`
+    """
+    tmp_file = cache_file + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(cache_key + '\n')                      #header, checked before the config is read
+            json.dump(cfg_data, f, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+    except (OSError, ValueError, TypeError): pass
+
+def dashCFG_build(master_ref, cfg_data):
+    """function builds the config classes from compiled config data, like when loading it from the cache
 
-def parseXML(master_ref, config_tree):
-    """function serves as the primary function for parsing an XML file. The passed element tree
-    of the opened file is split into its various defined sections related to the PyDash configuration. Individual
-    functions are then called to prase and convert the XML file into the internal class structure for
-    storing and editing information. When done, the "buildPages" funciton is also called to generate the core
-    editor configuration.
-    
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
-    :param config_tree: opened XML file element tree
-    :type config_tree: XML ET.file() object
+    :param cfg_data: compiled config data, as returned by `iterparseXML`
+    :type cfg_data: `dict`
     """
-    config_root = config_tree.getroot()             #get root element
+    master_ref.dash_settings.upd_cfg(**cfg_data['DISP'])    #core config
+    dashCFG_build_THEME(master_ref, cfg_data['THEME'])
+    dashCFG_build_CAN(master_ref, cfg_data['CAN'], compiled=True)
+    dashCFG_build_PAGES(master_ref, cfg_data['PAGES'], compiled=True)
 
-    #--parse XML file blocks for various dash config options
-    parseXML_CORE(master_ref, config_root.find(XMLcfg_types['DISP']))       #cycle through DISPLAY (core) config
-    parseXML_THEME(master_ref, config_root.find(XMLcfg_types['THEME']))     #cycle through THEME config
-    parseXML_CAN(master_ref, config_root.find(XMLcfg_types['CAN']))         #cycle through CAN channels config
-    parseXML_PAGES(master_ref, config_root.find(XMLcfg_types['FRAMES']))    #cycle through page definitions
+def dashCFG_build_THEME(master_ref, theme_data):
+    """function sets the theme from compiled theme data. Fonts and images are already converted.
 
-def parseXML_CORE(master_ref, block):
-    """function parses the core config information for a PyDash editor file
-    
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
-    :param block: XML element tree specific to the read config class, IE the "theme" block or the "CAN" block
-    :type block: XML ET.file() object
+    :param theme_data: compiled theme data, as returned by `dashCFG_convert_THEME`
+    :type theme_data: `dict`
     """
-    tmp_config = master_ref.dash_settings               #shorthand ref for config being updated
-    read_DISPconfig = {}                                #temp dict for read values
-    
-    for cfg in block:                                   #cycle through all the config values
-        read_DISPconfig.update({cfg.tag : cfg.text})        #append to temp dict
-    tmp_config.upd_cfg(**read_DISPconfig)               #update main definition with read values
+    tmp_theme = master_ref.dash_theme
+    tmp_theme.set_colors(theme_data['COLORS'])
+    tmp_theme.set_fonts(theme_data['FONTS'])
+    tmp_theme.set_imgs(theme_data['IMAGES'])
+    tmp_theme.set_alert_colors(theme_data['ALERT_COLORS'])
+
+def dashCFG_get_cfg_vals(cfg_obj):
+    """function gets the converted config values of a CAN channel or page element, for the compiled config
+
+    :param cfg_obj: CAN channel or page element
+    :type cfg_obj: `CANch` or element class instance, like `Label_Data`
+    :returns: converted config values
+    :rtype: `dict` {attribute name:value} - see the `fields_initCFG` of the class
+    """
+    return {k:getattr(cfg_obj, k) for k in cfg_obj.fields_initCFG}
+
+def dashCFG_build_CAN(master_ref, CAN_data, compiled=False):
+    """function sets the CAN config and creates the CAN channels from read CAN config data, or from compiled
+    CAN data where the channel values are already converted
 
-def parseXML_THEME(master_ref, block):
-    """function parses the theme config information for a PyDash editor file
-    
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
-    :param block: XML element tree specific to the read config class, IE the "theme" block or the "CAN" block
-    :type block: XML ET.file() object
-    """
-    tmp_theme = master_ref.dash_theme           #shorthand ref for config being updated
-    for clrs in block.findall('COLORS'):        #read all colors
-        read_colors = {}                            #temp colors dict for read values
-        for clr in clrs.findall('COLOR'):           #cycle through all parsed colors
-            read_colors.update({clr.attrib.get('NAME') : clr.text})     #append color to temp dict
-        tmp_theme.set_colors(read_colors)           #set theme colors
-    for fnts in block.findall('FONTS'):         #read all fonts
-        read_fnts = {}                              #temp fonts dict for read values
-        for fnt in fnts.findall('FONT'):            #cycle through all parsed fonts
-            read_fnts.update({fnt.attrib.get('NAME') : fnt.text})  #append font to temp dict
-        tmp_theme.set_fonts(read_fnts)              #set theme fonts
-    for imgs in block.findall('IMAGES'):        #read all images
-        read_imgs = {}                              #temp dict for read images
-        for img in imgs.findall('IMG'):             #cycle through all parsed images
-            read_imgs.update({img.attrib.get('NAME') : img.text})   #append image to temp dict
-        tmp_theme.set_imgs(read_imgs)               #set theme images
-    for alert in block.findall('ALERT_COLORS'): #read all alert colors
-        alert_colors = {}                           #temp dict for read alert color settings
-        for alrt_color in alert:                    #read all alert colors
-            alert_colors.update({alrt_color.tag:alrt_color.text}) #append to temp dict
-        tmp_theme.set_alert_colors(alert_colors)    #set the alert colors
-    
-    tmp_theme.convert_init_fnt_tup()                #convert all the font (string format) tupples to be correct format
-    tmp_theme.convert_init_img_path()               #convert all the images to their full path
-   
-def parseXML_CAN(master_ref, block):
-    """function parses the CAN config information for a PyDash editor file
-    
+    :param CAN_data: read CAN data, as returned by `iterreadXML`, or compiled CAN data
+    :type CAN_data: `dict` {'CORE':{tag:text}, 'CH':[channel values,...], 'DERIVED':[derived channel values,...]}
+    :param compiled: the channel values are compiled (converted) values - see `dashCFG_get_cfg_vals`
+    :type compiled: `bool`
+    :returns: compiled CAN data
+    :rtype: `dict`, same format as `CAN_data`
+    """
+    tmp_CAN = master_ref.dash_CAN                       #shorthand ref for config being updated
+    tmp_CAN.set_cfg(**CAN_data['CORE'])                 #set core CAN config
+    read_CAN_ch = {}                                    #temp CANch dict for the created channels
+    CAN_cmpld = {'CORE':CAN_data['CORE'], 'CH':[], 'DERIVED':[]}
+    for ch_type, ch_class in (('CH', CANch), ('DERIVED', CANch_derived)):
+        for read_CAN_data in CAN_data[ch_type]:         #cycle through all defined channels
+            tmp_ch = ch_class(tmp_CAN.CANbus)               #create temp CAN channel
+            if compiled == True: tmp_ch.load_cfg(read_CAN_data)
+            else:
+                tmp_ch.set_cfg(**read_CAN_data)             #update config
+                read_CAN_data = dashCFG_get_cfg_vals(tmp_ch)    #and keep the converted values
+            read_CAN_ch.update({tmp_ch.Name: tmp_ch})
+            CAN_cmpld[ch_type].append(read_CAN_data)
+    tmp_CAN.CAN_add_channels(read_CAN_ch)               #update CAN master with all the read channels
+    return CAN_cmpld
+
+def dashCFG_build_PAGES(master_ref, pages_data, compiled=False):
+    """function creates the user pages and their elements from read page config data, or from compiled page
+    data where the element values are already converted
+
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
-    :param block: XML element tree specific to the read config class, IE the "theme" block or the "CAN" block
-    :type block: XML ET.file() object
+    :param pages_data: read page data, as returned by `iterreadXML`, or compiled page data
+    :type pages_data: `list` of (page props, [(element type tag, element values),...]) tuples
+    :param compiled: the element values are compiled (converted) values - see `dashCFG_get_cfg_vals`
+    :type compiled: `bool`
+    :returns: compiled page data
+    :rtype: `list`, same format as `pages_data`
+    """
+    tmp_cfg_pages = master_ref.dash_pages_user  #temp dict for user pages
+    pages_cmpld = []
+    for read_frame_props, read_eles in pages_data:
+        read_frame = dash_page_user(master_ref) #instance read frame
+        read_frame.set_cfg(**read_frame_props)  #set the properties
+        read_elm = {}                           #temp element dict for all read elements
+        eles_cmpld = []
+        for ele_tag, read_lbl in read_eles:
+            tmp_ele = XMLele_types[ele_tag]()       #instance element
+            if compiled == True: tmp_ele.upd_config(read_lbl)
+            else:
+                tmp_ele.init_config(read_lbl)       #set its config
+                read_lbl = dashCFG_get_cfg_vals(tmp_ele)    #and keep the converted values
+            tmp_ele.master_ref = master_ref         #set reference to main window
+            read_elm.update({tmp_ele.name : tmp_ele})
+            eles_cmpld.append((ele_tag, read_lbl))
+        read_frame.update_eleCfg(read_elm)                      #add page elements
+        tmp_cfg_pages.update({read_frame.name : read_frame})    #add or update page to config dict
+        pages_cmpld.append((read_frame_props, eles_cmpld))
+    return pages_cmpld
+
+def dashCFG_convert_THEME(master_ref, alert_colors):
+    """function converts the read theme fonts and images once all the theme values are set
+
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
+    :param alert_colors: read alert color settings
+    :type alert_colors: `dictionary` {alert_kwarg : theme_color_name}
+    :returns: converted theme data, see `dashCFG_build_THEME`
+    :rtype: `dict` {'COLORS':{}, 'FONTS':{}, 'IMAGES':{}, 'ALERT_COLORS':{}}
     """
-    tmp_CAN = master_ref.dash_CAN                       #shorthand ref for config being updated
-    #--get core config values
-    CAN_coreCFG = {}                                    #temp dict for CAN core CFG values 
-    for canCFG in block.findall('CORE'):
-        for cfg in canCFG:
-            CAN_coreCFG.update({cfg.tag : cfg.text})    #append to temp dict
-    tmp_CAN.set_cfg(**CAN_coreCFG)                      #set core CAN config
-    
-    #--get CAN data channels
-    for chs in block.findall('CHANNELS'):
-        read_CAN_data = {}                                              #temp CANch property dict for read values
-        read_CAN_ch = {}                                                #temp CANch array for read values
-
-        for ch in chs.findall('CH'):                                    #cycle through all defined channels
-            read_CAN_data.update({'NAME' : ch.attrib.get('NAME')})      #append CANch Name to temp dict
-            for ch_props in ch:
-                read_CAN_data.update({ch_props.tag : ch_props.text})    #append CANch props to temp dict
-            tmp_ch = CANch(tmp_CAN.CANbus)                              #create temp CAN channel
-            tmp_ch.set_cfg(**read_CAN_data)                             #update config
-            read_CAN_ch.update({ch.attrib.get('NAME'): tmp_ch})         #append CANch data to temp dict
-        
-        tmp_CAN.CAN_add_channels(read_CAN_ch)                           #update CAN master with all the read channels
-
-def parseXML_PAGES(master_ref, block):
-    """function parses the page config information for a PyDash editor file.
-    
+    tmp_theme = master_ref.dash_theme
+    tmp_theme.convert_init_fnt_tup()                #convert all the font (string format) tupples to be correct format
+    tmp_theme.convert_init_img_path()               #convert all the images to their full path
+    return {'COLORS':dict(tmp_theme.colors), 'FONTS':dict(tmp_theme.fonts), 'IMAGES':dict(tmp_theme.images),
+            'ALERT_COLORS':alert_colors}
+
+def iterparseXML(master_ref, cfg_file):
+    """function loads the config XML file in a single streaming pass, see `iterreadXML`. The file is read
+    fully before anything is created, so a malformed file changes nothing.
+
     :param master_ref: reference back to the main/master window
     :type master_ref: main `tk.window` ref
-    :param block: XML element tree specific to the read config class, IE the "theme" block or the "CAN" block
-    :type block: XML ET.file() object
+    :param cfg_file: path of the config XML file
+    :type cfg_file: `string`
+    :returns: compiled config data - plain data only, so it can be cached. See `dashCFG_build`. None if
+        the file couldn't be read
+    :rtype: `dict` {'DISP':core data, 'THEME':theme data, 'CAN':CAN data, 'PAGES':page data}
     """
-    tmp_cfg_pages = master_ref.dash_pages_user  #temp dict for user pages
-    for child in block:
-        read_frame_props = {}                   #temp page prop dict for core page props
-        read_frame_props.update({'NAME' : child.attrib.get('NAME')})
-        for atrb in child:                      #for each page
-            if atrb.tag != 'ELM':
-                read_frame_props.update({atrb.tag : atrb.text})
+    try: read_cfg = iterreadXML(cfg_file)
+    except (ET.ParseError, OSError) as e:
+        master_ref.upd_errors([create_err_msg('Core','CFG','Unable to Open XML congig file. System error is: '+str(e))])
+        return None
 
-        read_frame = dash_page_user(master_ref) #instance read frame
-        read_frame.set_cfg(**read_frame_props)  #set the properties
-        read_frame_props.clear()                #clear temp dict
-
-        for elmnts in child.findall('ELM'):     #elements in page
-            read_elm = {}                       #temp element dict for all read elements
-            read_lbl = {}                       #temp static label element dict
-            for lbl_static in elmnts.findall('LBL_STATIC'):            
-                for lbl in lbl_static:
-                    read_lbl.update({'NAME' : lbl.attrib.get('NAME')})
-                    for atributes in lbl:
-                        read_lbl.update({atributes.tag : atributes.text})
-                    tmp_stat_ele = Label_Static()                               #instance element
-                    tmp_stat_ele.init_config(read_lbl)                          #set its config
-                    tmp_stat_ele.master_ref = master_ref                        #set reference to main window
-                    read_elm.update({lbl.attrib.get('NAME') : tmp_stat_ele})    #append static label to read elements
-            read_lbl.clear()                    #clear temp dict
-            for lbl_data in elmnts.findall('LBL_DATA'):
-                for lbl in lbl_data:
-                    read_lbl.update({'NAME' : lbl.attrib.get('NAME')})
-                    for atributes in lbl:
-                        read_lbl.update({atributes.tag : atributes.text})
-                    tmp_dat_ele = Label_Data()                                  #instance element
-                    tmp_dat_ele.init_config(read_lbl)                           #set its config
-                    tmp_dat_ele.master_ref = master_ref                         #set reference to main window
-                    read_elm.update({lbl.attrib.get('NAME') : tmp_dat_ele})     #append data labels to read elements
-            read_lbl.clear() #clear temp dict
-            for lbl_data in elmnts.findall('IND_BLT'):
-                for lbl in lbl_data:
-                    read_lbl.update({'NAME' : lbl.attrib.get('NAME')})
-                    for atributes in lbl:
-                        read_lbl.update({atributes.tag : atributes.text})
-                    tmp_blt_ele = Indicator_Bullet()                            #instance element
-                    tmp_blt_ele.init_config(read_lbl)                           #set its config
-                    tmp_blt_ele.master_ref = master_ref                         #set reference to main window
-                    read_elm.update({lbl.attrib.get('NAME') : tmp_blt_ele})     #append data labels to read elements
-            read_lbl.clear() #clear temp dict
-            for lbl_data in elmnts.findall('IND_BAR'):
-                for lbl in lbl_data:
-                    read_lbl.update({'NAME' : lbl.attrib.get('NAME')})
-                    for atributes in lbl:
-                        read_lbl.update({atributes.tag : atributes.text})
-                    tmp_bar_ele = Indicator_Bar()                               #instance element
-                    tmp_bar_ele.init_config(read_lbl)                           #set its config
-                    tmp_bar_ele.master_ref = master_ref                         #set reference to main window
-                    read_elm.update({lbl.attrib.get('NAME') : tmp_bar_ele})     #append data labels to read elements
-            read_lbl.clear() #clear temp dict
+    #--create the config classes from the read values
+    read_theme = read_cfg['THEME']
+    tmp_theme = master_ref.dash_theme
+    tmp_theme.set_colors(read_theme['COLORS'])
+    tmp_theme.set_fonts(read_theme['FONTS'])
+    tmp_theme.set_imgs(read_theme['IMAGES'])
+    if read_theme['ALERT_COLORS'] is not None: tmp_theme.set_alert_colors(read_theme['ALERT_COLORS'])
 
-        read_frame.update_eleCfg(read_elm)                      #add page elements
-        read_elm.clear()                                        #clear temp dict
-        tmp_cfg_pages.update({read_frame.name : read_frame})    #add or update page to config dict
\ No newline at end of file
+    cfg_data = {}
+    cfg_data['DISP'] = read_cfg['DISP']
+    master_ref.dash_settings.upd_cfg(**cfg_data['DISP'])
+    cfg_data['THEME'] = dashCFG_convert_THEME(master_ref, read_theme['ALERT_COLORS'] or {})
+    cfg_data['CAN'] = dashCFG_build_CAN(master_ref, read_cfg['CAN'])
+    cfg_data['PAGES'] = dashCFG_build_PAGES(master_ref, read_cfg['PAGES'])
+    return cfg_data
+
+def iterreadXML(cfg_file):
+    """function reads the config XML file values without building the whole element tree. Only element end
+    events are used, and each config record (block, channel, or page element list) is read by its handler in
+    `XMLstream_handlers` when its end tag is reached and then cleared, so memory stays flat with config size.
+    The handlers read whole records with plain loops, so the per-element cost is one handler lookup by tag.
+
+    :param cfg_file: path of the config XML file
+    :type cfg_file: `string`
+    :returns: read config values
+    :rtype: `dict` {'DISP':{}, 'THEME':{}, 'CAN':{}, 'PAGES':[]}
+    :raises ET.ParseError: if the file is not valid XML
+    :raises OSError: if the file can't be read
+    """
+    read_cfg = {'DISP':{}, 'THEME':{'COLORS':{}, 'FONTS':{}, 'IMAGES':{}, 'ALERT_COLORS':None},
+                'CAN':{'CORE':{}, 'CH':[], 'DERIVED':[]}, 'PAGES':[], 'ELES':{}}
+    get_handler = XMLstream_handlers.get        #local ref, looked up for every element
+    for event, elem in ET.iterparse(cfg_file):
+        handler = get_handler(elem.tag)
+        if handler is not None and handler(read_cfg, elem) == True: elem.clear()   #done with the record
+    del read_cfg['ELES']                        #page elements by ELM block, only used while streaming
+    return read_cfg
+
+def XMLstream_rd_props(elem):
+    """function reads the NAME attribute and the child tag values of a config record. The tags are
+    normalized to uppercase here, once, so the channel and element classes can read them directly."""
+    props = {'NAME' : elem.attrib.get('NAME')}
+    props.update([(prop.tag.upper(), prop.text) for prop in elem])
+    return props
+
+def XMLstream_DISP(read_cfg, elem):
+    """function reads the core config block - DISP/value"""
+    read_cfg['DISP'].update([(cfg.tag, cfg.text) for cfg in elem])
+    return True
+
+def XMLstream_THEME(read_cfg, elem):
+    """function reads the theme block - THEME/block/value"""
+    read_theme = read_cfg['THEME']
+    for block in elem:
+        if block.tag == 'ALERT_COLORS':
+            if read_theme['ALERT_COLORS'] is None: read_theme['ALERT_COLORS'] = {}
+            read_theme['ALERT_COLORS'].update([(alrt.tag, alrt.text) for alrt in block])
+        elif block.tag in XMLtheme_tags:
+            read_theme[block.tag].update([(v.attrib.get('NAME'), v.text) for v in block.iterfind(XMLtheme_tags[block.tag])])
+    return True
+
+def XMLstream_CAN_CORE(read_cfg, elem):
+    """function reads the CAN core config - CAN/CORE/value"""
+    read_cfg['CAN']['CORE'].update([(cfg.tag, cfg.text) for cfg in elem])
+    return True
+
+def XMLstream_CAN_CH(read_cfg, elem):
+    """function reads a CAN channel or derived channel - CAN/CHANNELS/channel"""
+    read_cfg['CAN'][elem.tag].append(XMLstream_rd_props(elem))
+    return True
+
+def XMLstream_ELM(read_cfg, elem):
+    """function reads the elements of a page - page/ELM/element type/element. Elements are read by type, so a
+    page's elements are added grouped by type, in `XMLele_types` order. They are kept by their ELM block
+    until the FRAMES block ends and the pages are read."""
+    read_eles = []
+    for ele_tag in XMLele_types:
+        for lbls in elem.iterfind(ele_tag): read_eles.extend([(ele_tag, XMLstream_rd_props(lbl)) for lbl in lbls])
+    read_cfg['ELES'][elem] = read_eles
+    return True
+
+def XMLstream_FRAMES(read_cfg, elem):
+    """function reads the pages - FRAMES/page. Their ELM blocks are already read and cleared, only the page
+    properties are left. A channel also has a FRAMES value, which has no children and is left for the channel."""
+    if len(elem) == 0: return False             #channel frames value, or no pages
+    for page in elem:
+        read_frame_props = {'NAME' : page.attrib.get('NAME')}
+        read_eles = []
+        for atrb in page:
+            if atrb.tag == 'ELM': read_eles.extend(read_cfg['ELES'].pop(atrb, ()))
+            else: read_frame_props[atrb.tag] = atrb.text
+        read_cfg['PAGES'].append((read_frame_props, read_eles))
+    return True
+
+XMLtheme_tags = {'COLORS':'COLOR', 'FONTS':'FONT', 'IMAGES':'IMG'}      #theme value tag, by theme block
+XMLstream_handlers = {XMLcfg_types['DISP']:XMLstream_DISP,              #streaming record handlers, by tag - return True when the record can be cleared
+                      XMLcfg_types['THEME']:XMLstream_THEME,
+                      'CORE':XMLstream_CAN_CORE,
+                      'CH':XMLstream_CAN_CH,
+                      'DERIVED':XMLstream_CAN_CH,
+                      'ELM':XMLstream_ELM,
+                      XMLcfg_types['FRAMES']:XMLstream_FRAMES}
@@ -4,7 +4,12 @@ Function:   This file contains any of the classes and methods related to general
             and functions of the dash, including I/O interations, etc.
 """
 from .sys import *
-from .com_defs import GPIOconvert_dict, EleTypes_dict
+from .com_defs import GPIOconvert_dict, EleTypes_dict, dash_page_user, Label_Data
+from .perf import perf_frame_track, perf_histogram
+from collections import OrderedDict
+from .datalog import dash_datalogger
+from .can_proc import CAN_ingest_proc
+from .replay import CAN_log_replay
 
 class dash_control:
     def __init__(self, master):
@@ -13,6 +18,16 @@ class dash_control:
         self.active_page_ref = None         #reference to the current active page being displayed
         self.menu_prev_pages = []           #tuple to track previous nested menu pages
         self.logging_en = tk.BooleanVar()   #bool to track if logging is currently active or not
+        self.logging_en.trace_add('write', self.dash_log_toggle)   #start/stop the datalogger when changed
+        self.CAN_replay = None              #log replay instance, when in replay mode
+        self.render_period_ms = sys_refresh_rate    #display refresh period in ms - set from the dash config once loaded
+        self.render_dirty = set()           #page elements with a new value, redrawn once on the next frame render
+        self.render_stats = perf_frame_track()      #display refresh frame time, redraw count, and overruns
+        self.pg_built = OrderedDict()       #built user pages, least recently shown first, in format {page ref:None}
+        self.pg_switch_cold = perf_histogram()  #user page switch time when the page had to be built, in us
+        self.pg_switch_warm = perf_histogram()  #user page switch time when the page was already built, in us
+        self.boot_ms = None                 #app start to the first displayed user page, in ms
+        self.pad_tmpls = {}                 #rounded rectangle polygon points at the origin, in format {(width, height, radius):[x,y,...]}
 
         self.usrBtns_init()                 #initialize user input controls - Needed immediately for menus / error navigation
 
@@ -98,11 +113,27 @@ class dash_control:
         :type pg_ref: `tk.Frame` reference
         """
 
+        t_start = time.perf_counter()
+        is_user = isinstance(pg_ref, dash_page_user)
+        cold = is_user and pg_ref.built == False                #page has to be built first
+        if isinstance(self.active_page_ref, dash_page_user):    #stop updating the hidden user page
+            self.page_ele_deactivate(self.active_page_ref)
+        if is_user == True:                                     #build the new user page if needed, and start updating it, synced before shown
+            self.page_build(pg_ref)
+            self.page_ele_activate(pg_ref)
+
         try: self.active_page_ref.pack_forget()                 #hide currrent frame if displayed
         except: pass
         self.active_page_ref = pg_ref                           #update to the new frame
         self.active_page_ref.pack(fill="both", expand=True)     #place new frame and fill new frame to window size
 
+        if is_user == True:
+            t_switch = (time.perf_counter() - t_start)*1e6
+            if cold == True: self.pg_switch_cold.add(t_switch)
+            else: self.pg_switch_warm.add(t_switch)
+            if self.boot_ms is None: self.master_ref.after_idle(self.boot_done)    #first user page, record once drawn
+            if sys_pg_prebuild == True: self.master_ref.after_idle(self.page_prebuild_adj)   #build the next/previous pages once idle
+
     def goto_page_user(self, pg_name):
         """function loads a user page to the dash display based on the passed name
         
@@ -111,6 +142,7 @@ class dash_control:
         """
         pg_ref = self.master_ref.dash_pages_user[pg_name]       #get the active page ref
         self.goto_page(pg_ref)                                  #and go to the page
+        self.master_ref.dash_CAN.CAN_RTR_set_visible(pg_ref.get_data_chs())    #request the page channels at the full RTR rate
     
     def goto_page_menu(self, pg_name, nxt_lvl=False):
         """function loads a menu page to the dash display based on the passed name
@@ -124,6 +156,8 @@ class dash_control:
             self.menu_prev_pages.append(self.active_page_ref.name)              #then append the current name as the "last" page to navigate back to
         pg_ref = self.master_ref.dash_pages_menu[pg_name]                   #get the active page ref
         self.goto_page(pg_ref)                                              #and go to the page
+        CANref = getattr(self.master_ref, 'dash_CAN', None)                 #CAN is only instanced if a config was found
+        if CANref is not None: CANref.CAN_RTR_set_visible(())               #no user channels displayed, so back off RTR rates
     
     def goto_user_FirstPage(self):
         """function goes to the first user page, typically used on load"""
@@ -205,14 +239,79 @@ class dash_control:
         CANref = self.master_ref.dash_CAN   #temp local ref to CANbus for shorthand
         CANref.CAN_init()                   #initialize CAN operation
         if CANref.CANcom_OK == True:        #if CANbus was successfully started at the HW level, proceed
-            CANref.CAN_set_RXlistener(CANref.CAN_msgRX_func)    #assign the listener function to call on a message RX
+            if sys_CAN_RXmode == 'process' and sys_replay_log is None:     #virtual replay bus can't be shared with another process
+                RX_proc = CAN_ingest_proc(CANref)
+                RX_proc.start({'channel':sys_HW_chnl, 'interface':sys_CAN_intrfce})
+                CANref.CAN_set_RXproc(RX_proc)                  #RX and decode in the ingest process
+            elif sys_CAN_RXmode != 'filehandler' or not CANref.CAN_set_RXfilehandler(self.master_ref, CANref.CAN_msgRX_func):
+                CANref.CAN_set_RXlistener(CANref.CAN_msgRX_func)    #assign the listener function to call on a message RX
             CANref.CAN_gen_RXfilters(CANref.RX_filter_en)       #generate the CAN message RX filters, and enable if set
             CANref.CAN_RTR_init()                               #instance/create any RTR requests
             CANref.CAN_RTR_ALLstart()                           #and start all RTR requests
+            CANref.CAN_tmo_init()                               #start channel timeout tracking
+            self.logging_en.set(self.master_ref.dash_settings.Log_en)   #start datalogging, if enabled
+            if sys_replay_log is not None: self.dash_replay_start()     #in replay mode, start feeding the recorded log
+
+    def dash_stop_HW_ops(self):
+        """Function stops the hardware functions started by `dash_start_HW_ops` when the dash exits. Any
+        datalog is written out and the CAN RX is stopped, including the ingest process and its shared table
+        in multi-process mode. Doesn't use Tk, so it can be called after the main window is destroyed."""
+        CANref = getattr(self.master_ref, 'dash_CAN', None)     #CAN is only instanced if a config was found
+        if CANref is None: return
+        self.dash_log_stop()                #write out the datalog
+        CANref.CAN_RX_stop()                #and stop RX'ing
+
+    def dash_replay_start(self):
+        """Function starts replaying the recorded datalog through the CAN RX path, in place of CAN hardware"""
+        CANref = self.master_ref.dash_CAN   #temp local ref to CANbus for shorthand
+        if sys_replay_on_bus == True: bus_chnl = sys_replay_chnl    #send on the virtual bus the notifier listens on
+        else: bus_chnl = None                                       #or call the RX function directly
+        self.CAN_replay = CAN_log_replay(CANref, sys_replay_log, sys_replay_speed, bus_chnl)
+        self.CAN_replay.start()
+
+    def dash_log_toggle(self, var, indx, mode):
+        """function starts or stops the datalogger to match the logging enable variable
+
+        :param var_name: (not used) - variable trace related value
+        :param indx: (not used) - variable trace related value
+        :param mode: (not used) - variable trace related value"""
+        if self.logging_en.get() == True: self.dash_log_start()
+        else: self.dash_log_stop()
+
+    def dash_log_start(self):
+        """Function starts the datalogger and attaches it to the CAN RX listener"""
+        CANref = self.master_ref.dash_CAN   #temp local ref to CANbus for shorthand
+        if CANref.CAN_log_mode() is not None: return    #already logging
+        if CANref.RX_proc is not None:      #multi-process ingest, the ingest process does the logging
+            CANref.RX_proc.log_start(sys_log_dir, CANref.CAN_get_ch_table(), self.master_ref.dash_settings.Log_raw)
+            CANref.CAN_RTR_upd_active()     #logged channels are requested at the full RTR rate
+            return
+
+        logger = dash_datalogger(sys_log_dir, CANref.CAN_get_ch_table(),
+                                 self.master_ref.dash_settings.Log_raw, self.master_ref.upd_errors)
+        logger.start()                      #open log file and start writer thread
+        if logger.running == True:          #only attach if successfully started
+            CANref.datalogger = logger
+            CANref.CAN_RTR_upd_active()     #logged channels are requested at the full RTR rate
+        else: self.logging_en.set(False)    #otherwise reset the enable - error is reported by the logger
+
+    def dash_log_stop(self):
+        """Function detaches the datalogger from the CAN RX listener, then writes out any queued records
+        and closes the log file"""
+        CANref = getattr(self.master_ref, 'dash_CAN', None)     #CAN is only instanced if a config was found
+        if CANref is None or CANref.CAN_log_mode() is None: return  #not logging
+        if CANref.RX_proc is not None:      #multi-process ingest, stop logging in the ingest process
+            CANref.RX_proc.log_stop()
+            CANref.CAN_RTR_upd_active()
+            return
+        logger = CANref.datalogger
+        CANref.datalogger = None            #detach first so no new records are queued
+        logger.stop()                       #then finish writing
+        CANref.CAN_RTR_upd_active()         #logged channels no longer need the full RTR rate
     
     def page_ele_CANref_init(self):
-        """function links the data elements to the associated CAN cannel
-        and sets trace triggers for data updates"""
+        """function links the data elements to the associated CAN cannel. The trace triggers for data
+        updates are only set while the page is displayed, see `page_ele_activate`"""
         for p in self.master_ref.dash_pages_user.values():      #cycle through all the defined user pages
             for ele in p.Lbl_dat.values(): self.page_ele_CANref_set(ele)    #set triggers for data labels
             for ele in p.Ind_blt.values(): self.page_ele_CANref_set(ele)    #set triggers for bullet indicators
@@ -226,16 +325,148 @@ class dash_control:
         """
         tmp_CANch = self.master_ref.dash_CAN.CANchs                     #shorthand local ref for CAN channels
         ele_cfg.CAN_dec_ref = tmp_CANch[ele_cfg.data_ch].val_dec        #assign ref to CAN channel
-        ele_cfg.CAN_dec_ref.trace_add('write', ele_cfg.update_state)    #add trace to update page element
+        tmp_CANch[ele_cfg.data_ch].ele_refs.append(ele_cfg)             #link element to channel for timeout error state
+
+    def page_ele_activate(self, page):
+        """function sets the trace triggers for data updates of the elements on the passed page, and
+        syncs the elements to the current channel values in one pass. Elements of a timed out channel are set
+        to the error state, and elements of a channel that has not RX'd yet are left as they are.
+
+        :param page: user page being displayed
+        :type page: `class` dash_page_user instance
+        """
+        tmp_CANch = self.master_ref.dash_CAN.CANchs                     #shorthand local ref for CAN channels
+        for ele in page.get_data_eles():
+            if ele.CAN_dec_ref is None: continue                        #not linked to a channel
+            if ele.trace_id is None:
+                ele.trace_id = ele.CAN_dec_ref.trace_add('write', lambda var, indx, mode, ele=ele: self.render_dirty.add(ele))   #add trace to mark page element for redraw
+            ch = tmp_CANch[ele.data_ch]
+            if ch.err == True: ele.set_err_state(True)                  #show timed out channels, IE on a newly built page
+            elif ch.cnt_RX > 0: ele.update_state(None, None, None)      #sync to the current value
+
+    def page_ele_deactivate(self, page):
+        """function removes the trace triggers for data updates of the elements on the passed page, and
+        drops any of its elements waiting for a redraw
+
+        :param page: user page being hidden
+        :type page: `class` dash_page_user instance
+        """
+        eles = page.get_data_eles()
+        for ele in eles:
+            if ele.trace_id is not None:
+                ele.CAN_dec_ref.trace_remove('write', ele.trace_id)
+                ele.trace_id = None
+        self.render_dirty.difference_update(eles)
+
+    def render_set_period(self, period_ms):
+        """function sets the display refresh period, IE the configured dash refresh rate
+
+        :param period_ms: display refresh period, in ms
+        :type period_ms: `int` or `float` > 0
+        """
+        self.render_period_ms = int(period_ms)
+
+    def render_frame(self):
+        """function redraws every page element marked dirty since the last frame, once each with the
+        latest value of its channel. Value writes only mark the elements, so a fast channel costs one
+        redraw per frame no matter how many values it RX'd.
+
+        :returns: number of elements redrawn
+        :rtype: `int`
+        """
+        dirty = self.render_dirty
+        if not dirty: return 0
+        self.render_dirty = set()               #swap first, so redraw side effects mark for the next frame
+        for ele in dirty: ele.update_state(None, None, None)
+        return len(dirty)
 
     def dash_buildPages(self):
-        """Function builds the various pages in the configuration and udpates the main dash pages dict
-        with the instanced/built values
+        """Function prepares the various pages in the configuration for display. The page canvases are not
+        built here, each page is built when first shown (see `page_build`), so the boot time doesn't grow
+        with the number of pages.
         """
+        self.master_ref.dash_theme.build_fnt_objs()             #font objects for measuring padded label text
+        self.dash_loadImgs()                                    #decode the page images once, before building
         for p in self.master_ref.dash_pages_user.values():      #cycle through all the defined user pages
-            self.dash_buildPage(p)                                  #construct page
             p.btn_func = self.master_ref.dash_ctl.dflt_user_pg_btns #assign default button functions
+
+    def page_build(self, page):
+        """function builds the passed user page, if not already built, and marks it most recently shown.
+        Past `sys_pg_built_max` built pages, the least recently shown page (other than the displayed page) is
+        torn down again.
+
+        :param page: user page to build
+        :type page: `class` dash_page_user instance
+        """
+        if page.built == False:
+            self.dash_buildPage(page)                           #construct page
+            page.built = True
+        self.pg_built[page] = None
+        self.pg_built.move_to_end(page)                         #most recently shown
+        if sys_pg_built_max <= 0: return
+        for old_pg in list(self.pg_built):                      #least recently shown first
+            if len(self.pg_built) <= sys_pg_built_max: break
+            if old_pg is page or old_pg is self.active_page_ref: continue
+            self.page_unbuild(old_pg)
+
+    def page_unbuild(self, page):
+        """function tears down the canvas items of a built (hidden) user page, returning it to its parsed
+        config. It is built again the next time it is shown.
+
+        :param page: user page to tear down
+        :type page: `class` dash_page_user instance
+        """
+        self.page_ele_deactivate(page)
+        page.canv.delete('all')                                 #drop all canvas items
+        page.bg_img_obj = None                                  #release the background image ref
+        for ele in page.Lbl_stc.values(): ele.upd_config({'objID':None, 'padID':None})
+        for ele in page.get_data_eles():
+            ele.upd_config({'objID':None, 'padID':None})
+            ele.vis_last = None                                 #redraw everything on the next build
+            if isinstance(ele, Label_Data): ele.pad_ext = ele.pad_clr = None
+        page.built = False
+        self.pg_built.pop(page, None)
+
+    def page_prebuild_adj(self):
+        """function builds the user pages before and after the displayed page, if not built, so switching to
+        them is warm. Called in idle time after a page switch, and builds one page per idle callback."""
+        pg_ref = self.active_page_ref
+        if not isinstance(pg_ref, dash_page_user): return       #a menu page is displayed
+        pg_names = list(self.master_ref.dash_pages_user)
+        pg_indx = pg_names.index(pg_ref.name)
+        for adj_indx in (pg_indx + 1, pg_indx - 1):             #next, then previous page - wraps, same as the page buttons
+            adj_pg = self.master_ref.dash_pages_user[pg_names[adj_indx % len(pg_names)]]
+            if adj_pg.built == False:
+                self.page_build(adj_pg)
+                self.pg_built.move_to_end(pg_ref)               #keep the displayed page most recent
+                self.master_ref.after_idle(self.page_prebuild_adj)  #any other page on the next idle callback
+                return
+
+    def boot_done(self):
+        """function records the boot time, from the app start to the first user page being drawn. Called in
+        idle time once the first page is displayed."""
+        self.boot_ms = round(time.time()*1000) - sys_start_time_ms
             
+    def dash_loadImgs(self):
+        """function loads the background images used by the user pages into the theme image cache, scaled to
+        the display size if enabled (see `sys_img_prescale`), so each image is decoded once no matter how many
+        pages use it. Images that fail to load are left for the page build to report."""
+        thm_ref = self.master_ref.dash_theme
+        for p in self.master_ref.dash_pages_user.values():
+            img_path = thm_ref.images.get(p.bg_img)
+            if img_path is None: continue
+            try: thm_ref.img_cache.get(self.master_ref, img_path, self.get_bgImg_size())
+            except (tk.TclError, OSError): pass
+
+    def get_bgImg_size(self):
+        """function gets the size page background images are scaled to
+
+        :returns: display size, or None to use the image file size
+        :rtype: `tuple` (width, height) or None
+        """
+        if sys_img_prescale == True: return (sys_disp_xSz, sys_disp_ySz)
+        return None
+
     def dash_buildPage(self, page):
         """function builds and defines the various page elements for the passed page
         
@@ -251,7 +482,7 @@ class dash_control:
         #--add page background image
         frm_bg_img=self.master_ref.dash_theme.images.get(page.bg_img)       #get the frame background image path
         if frm_bg_img is not None:
-            pg_canv.bg_img_obj = self.addImg(pg_canv, frm_bg_img)           #add background image and set ref to prevent trash collection
+            page.bg_img_obj = self.addImg(pg_canv, frm_bg_img, size=self.get_bgImg_size())  #add background image and set ref to prevent trash collection
 
         #--add page elements
         for ele_cfg in page.Lbl_stc.values():   #loop through all static label configs
@@ -308,8 +539,9 @@ class dash_control:
             if call_func is not None: call_func()                       #if its assigned a valid function then call it
         except: pass
 
-    def addImg(self, canv, image, x=0, y=0):
-        """Function adds an imave to the pased canvas object at the listed coords.
+    def addImg(self, canv, image, x=0, y=0, size=None):
+        """Function adds an imave to the pased canvas object at the listed coords. The image is taken from the
+        theme image cache, so it is shared with any other page using it.
         
         :param canv: parent canvas to make object on
         :type canv: `Tk.Canvas` class
@@ -319,10 +551,12 @@ class dash_control:
         :type x: `int`
         :param y: y0 position of the image, upper-left corner (default=0)
         :type y: `int`
+        :param size: (optional) image size (default=None, the image file size)
+        :type size: `tuple` (width, height)
         :returns: PhotoImage reference
         :rtype: `tk.PhotoImage` int
         """
-        tkImg = tk.PhotoImage(master=canv, file=image)                  #create tk photoImage
+        tkImg = self.master_ref.dash_theme.img_cache.get(self.master_ref, image, size)     #get shared tk photoImage
         canv.create_image(x, y, image = tkImg, anchor=tk.NW)            #place image
         return tkImg    #return tk image for ref
     
@@ -344,6 +578,9 @@ class dash_control:
                                                     ref_canv,
                                                     ele_cfg.get_edtr_wgt_kwargs())      #create new widget and assign to object ref in class
         ele_cfg.upd_config({'canv_ref':ref_canv, 'objID':ele_refID, 'padID':ele_padID}) #set reference IDs for later updating
+        if isinstance(ele_cfg, Label_Data) and ele_padID is not None:                  #resize the data label pad from the text extent its updates use
+            self.elePad_set(ele_cfg, ref_canv.itemcget(ele_refID, 'text'), ref_canv.itemcget(ele_padID, 'fill'))
+        if callable(getattr(ele_cfg, 'build_alert', None)): ele_cfg.build_alert()      #resolve alert limits and colors for data elements
 
     def instance_widget(self, ele_type, prnt_canv, widg_kwargs):
         """function to create a new element in the dash page editor. If only an opbject is created, the
@@ -419,6 +656,64 @@ class dash_control:
         padY0=prntY0; padY1=prntY1                                          #calcualte Y0, Y1 for background pad object
         self.update_rectangle(prnt_canv, pad_objID, padX0, padY0, padX1, padY1)   #update the size of the pad object
         prnt_canv.itemconfigure(pad_objID, **kwargs)                #update pad object with passed properties
+
+    def elePad_set(self, ele_cfg, txt, clr):
+        """function updates the background pad of a padded text element (anchored NW) for the passed text and
+        color. The pad is sized from the cached theme text extent instead of a canvas bbox, and its coords are
+        only updated when the text size changes, and its fill only when the color changes. Also used when the
+        element is created, so the pad never switches between the two sizes.
+
+        :param ele_cfg: padded text element, IE `Label_Data`
+        :type ele_cfg: element class instance with `pad_ext` and `pad_clr` attributes
+        :param txt: text now displayed by the element
+        :type txt: `string`
+        :param clr: pad fill color
+        :type clr: HEX string color value
+        """
+        ext = self.master_ref.dash_theme.get_txt_extent(ele_cfg.font, txt)
+        if ext != ele_cfg.pad_ext:
+            ele_cfg.pad_ext = ext
+            padX0 = ele_cfg.x0 - sys_pad_margin                                 #pad is the text size plus the margin
+            ele_cfg.canv_ref.coords(ele_cfg.padID, self.rect_points(padX0, ele_cfg.y0, ext[0] + 2*sys_pad_margin, ext[1]))
+        if clr != ele_cfg.pad_clr:
+            ele_cfg.pad_clr = clr
+            ele_cfg.canv_ref.itemconfigure(ele_cfg.padID, fill=clr)
+
+    def rect_points(self, x0, y0, width, height, r=sys_dflt_pad_radius):
+        """function gets the rounded rectangle polygon points (see `draw_rectangle`) for the passed position
+        and size. The points at the origin are cached by size, so only the offset to the position is applied.
+        The cache is cleared when it reaches `sys_pad_tmpl_cache_sz` sizes.
+
+        :param x0: start x coordinate
+        :type x0: `int`
+        :param y0: start y coordinate
+        :type y0: `int`
+        :param width: rectangle width
+        :type width: `int`
+        :param height: rectangle height
+        :type height: `int`
+        :param r: (optional) rectangle corner radius
+        :type r: num pixels in `int`
+        :returns: polygon points
+        :rtype: `list` [x,y,...]
+        """
+        tmpl = self.pad_tmpls.get((width, height, r))
+        if tmpl is None:
+            if len(self.pad_tmpls) >= sys_pad_tmpl_cache_sz: self.pad_tmpls.clear()     #bound the cache
+            x1 = width; y1 = height
+            tmpl = self.pad_tmpls[(width, height, r)] = [r, 0, r, 0,   #create the polycon points
+                                                         x1-r, 0, x1-r, 0,
+                                                         x1, 0,
+                                                         x1, r, x1, r,
+                                                         x1, y1-r, x1, y1-r,
+                                                         x1, y1,
+                                                         x1-r, y1, x1-r, y1,
+                                                         r, y1, r, y1,
+                                                         0, y1,
+                                                         0, y1-r, 0, y1-r,
+                                                         0, r, 0, r,
+                                                         0, 0]
+        return [v + (x0, y0)[i & 1] for i, v in enumerate(tmpl)]
     
     def draw_rectangle(self, prnt_canv, clr, x0, y0, x1, y1, r=sys_dflt_pad_radius):
         """function draws a rectagle on the parent canvas. Rectangle is based on the passed coords.
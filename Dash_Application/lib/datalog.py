@@ -0,0 +1,257 @@
+"""
+File:       datalog.py
+Function:   This file contains the background datalogger used to record CAN data to the log directory,
+            and the supporting functions for reading a recorded log file back.
+
+            Log files are a header followed by fixed size binary records. The header embeds the
+            channel table so a log can be decoded without the dash config it was recorded with.
+                header:     magic, format ver, record type, record size, start time, channel table size
+                            then the channel table as utf-8 text, one "ch_id,name,PID,ext,log_en" line per channel
+                records:    'CH' type   > timestamp, channel id, decoded value
+                            'RAW' type  > timestamp, PID (bit 31 set for extended IDs), DLC, 8 data frames
+"""
+from .sys import *
+import struct
+import threading
+from .can import CAN_ringbuf
+from .com_defs import create_err_msg
+
+#-----------------------------------log format----------------------------------
+datalog_magic = b'PYDLOG'                       #file identifier at the start of every log file
+datalog_fmt_ver = 1                             #log file format version
+datalog_file_ext = '.pdl'                       #log file extension
+
+datalog_rec_types = {'CH':1,                    #decoded channel value records
+                     'RAW':2}                   #raw CAN frame records
+
+datalog_hdr = struct.Struct('<6sBBHdI')         #magic, format ver, record type, record size, start time, channel table size
+datalog_rec_ch = struct.Struct('<dHf')          #timestamp, channel id, value
+datalog_rec_raw = struct.Struct('<dIB8s')       #timestamp, PID | ext flag, DLC, data frames
+datalog_ext_flag = 0x80000000                   #PID flag bit for extended IDs in raw records
+
+#----------------------------------methods----------------------------------
+def datalog_open(log_path):
+    """function opens a recorded log file and reads its header
+
+    :param log_path: absolute path to the log file
+    :type log_path: `string`
+    :returns: tuple of the header info and the opened file, positioned at the first record
+    :rtype: (`dictionary` {header_field:value}, file object)
+    """
+    log_file = open(log_path, 'rb')
+    magic, ver, rec_type, rec_sz, t_start, tbl_sz = datalog_hdr.unpack(log_file.read(datalog_hdr.size))
+    if magic != datalog_magic:
+        log_file.close()
+        raise ValueError('not a PyDash log file: '+str(log_path))
+
+    ch_table = []                                               #temp list of channel table entries
+    for ln in log_file.read(tbl_sz).decode('utf-8').splitlines():
+        ch_id, name, PID, ext, log_en = ln.split(',')
+        ch_table.append((int(ch_id), name, int(PID), ext == 'True', log_en == 'True'))
+
+    hdr = {'ver':ver, 'rec_type':rec_type, 'rec_sz':rec_sz, 't_start':t_start, 'ch_table':ch_table}
+    return hdr, log_file
+
+def datalog_read_recs(log_path):
+    """function reads all records from a recorded log file
+
+    :param log_path: absolute path to the log file
+    :type log_path: `string`
+    :returns: tuple of the header info and an iterator of record tuples. Records are in the
+        format (timestamp, ch_id, value) for 'CH' logs and (timestamp, PID, is_ext, dlc, data) for 'RAW' logs
+    :rtype: (`dictionary` {header_field:value}, iterator)
+    """
+    hdr, log_file = datalog_open(log_path)
+    if hdr['rec_type'] == datalog_rec_types['RAW']: rec_struct = datalog_rec_raw
+    else: rec_struct = datalog_rec_ch
+
+    def rec_iter():
+        with log_file:
+            data = log_file.read()
+            data_sz = len(data) - len(data)%rec_struct.size     #ignore any partially written last record
+            for rec in rec_struct.iter_unpack(memoryview(data)[:data_sz]):
+                if rec_struct is datalog_rec_raw:
+                    ts, PID, dlc, frms = rec
+                    yield (ts, PID & ~datalog_ext_flag, bool(PID & datalog_ext_flag), dlc, frms[:dlc])
+                else: yield rec
+    return hdr, rec_iter()
+
+#----------------------------------classes----------------------------------
+class dash_datalogger():
+    def __init__(self, log_dir, ch_table, raw_mode=False, err_func=None):
+        """Construct a background datalogger. Records are queued by the CAN RX listener and written
+        to the log directory by a dedicated writer thread, so the RX listener never waits on the
+        SD card. Records are packed into a preallocated buffer and the buffer is written out when
+        full or on the flush interval. Log files are rotated by size and by time.
+
+        :param log_dir: directory to write log files to
+        :type log_dir: `string`
+        :param ch_table: channel table to embed in the log header
+        :type ch_table: `list` of (ch_id, name, PID, ext, log_en) tuples
+        :param raw_mode: log every raw RX'd CAN frame instead of decoded channel values
+        :type raw_mode: `bool`
+        :param err_func: (optional) function called with a list of `err_message` on a logging error
+        :type err_func: method/function
+        """
+        #--config
+        self.log_dir = log_dir          #directory for log files
+        self.ch_table = ch_table        #channel table embedded in each log file header
+        self.raw_mode = raw_mode        #log raw CAN frames instead of decoded channels
+        self.err_func = err_func        #function for reporting errors
+        if raw_mode == True: self.rec_struct = datalog_rec_raw
+        else: self.rec_struct = datalog_rec_ch
+
+        #--queue and buffer
+        self.queue = CAN_ringbuf(sys_log_queue_sz)  #records waiting to be written
+        self.buf = bytearray(sys_log_buf_sz)        #preallocated write buffer
+        self.buf_view = memoryview(self.buf)        #view of the write buffer, so writes don't copy
+        self.buf_indx = 0                           #current fill level of the write buffer
+
+        #--file handling
+        self.log_file = None            #current open log file
+        self.log_path = None            #path of the current log file
+        self.file_sz = 0                #bytes written to the current log file
+        self.file_start = 0             #time the current log file was opened
+
+        #--writer thread
+        self.writer = None              #writer thread
+        self.running = False            #writer thread should keep running
+
+        #--counters
+        self.cnt_rec = 0                #total records written
+        self.cnt_files = 0              #total log files opened
+
+    def start(self):
+        """function opens the first log file and starts the writer thread"""
+        if self.running == True: return
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)    #make sure the log directory exists
+            self.file_open()
+        except OSError:
+            self.report_err('Unable to open log file in '+str(self.log_dir))
+            return
+        self.running = True
+        self.writer = threading.Thread(target=self.writer_loop, name='PyDash_datalog', daemon=True)
+        self.writer.start()
+
+    def stop(self):
+        """function stops the writer thread, writes any queued records, and closes the log file"""
+        self.running = False
+        if self.writer is not None:
+            self.writer.join()          #writer writes out the queue and closes the file on exit
+            self.writer = None
+
+    def log_ch(self, ch_id, val, ts):
+        """function queues a decoded channel value record. Safe to call from the CAN RX listener thread.
+
+        :param ch_id: channel id from the channel table
+        :type ch_id: `int`
+        :param val: decoded channel value
+        :type val: `float`
+        :param ts: RX timestamp
+        :type ts: `float` - seconds
+        """
+        self.queue.push((ts, ch_id, val))
+
+    def log_raw(self, CAN_msg):
+        """function queues a raw CAN frame record. Safe to call from the CAN RX listener thread.
+
+        :param CAN_msg: RX'd CAN message
+        :type CAN_msg: `can.Message`
+        """
+        PID = CAN_msg.arbitration_id
+        if CAN_msg.is_extended_id: PID |= datalog_ext_flag
+        self.queue.push((CAN_msg.timestamp, PID, CAN_msg.dlc, bytes(CAN_msg.data)))
+
+    def file_open(self):
+        """function opens a new log file and writes the header"""
+        self.file_start = time.time()
+        f_name = 'PyDash_log_' + time.strftime('%Y%m%d_%H%M%S', time.localtime(self.file_start))
+        f_indx = self.cnt_files
+        while True:                                         #find an unused file name, never overwrite an old log
+            self.log_path = os.path.join(self.log_dir, f_name + '_' + str(f_indx) + datalog_file_ext)
+            if not os.path.exists(self.log_path): break
+            f_indx += 1
+
+        tbl = ''.join(f"{ch_id},{name},{PID},{ext},{log_en}\n" for ch_id, name, PID, ext, log_en in self.ch_table)
+        tbl = tbl.encode('utf-8')
+        if self.raw_mode == True: rec_type = datalog_rec_types['RAW']
+        else: rec_type = datalog_rec_types['CH']
+
+        self.log_file = open(self.log_path, 'wb')
+        self.log_file.write(datalog_hdr.pack(datalog_magic, datalog_fmt_ver, rec_type,
+                                             self.rec_struct.size, self.file_start, len(tbl)))
+        self.log_file.write(tbl)
+        self.file_sz = datalog_hdr.size + len(tbl)
+        self.cnt_files += 1
+
+    def file_close(self):
+        """function writes out the buffer and closes the current log file"""
+        if self.log_file is None: return
+        self.buf_write()
+        self.log_file.close()
+        self.log_file = None
+
+    def file_rotate_chk(self):
+        """function starts a new log file if the current file has reached its size or time limit"""
+        if (self.file_sz >= sys_log_rotate_sz) or (time.time() - self.file_start >= sys_log_rotate_s):
+            self.file_close()
+            self.file_open()
+
+    def buf_write(self):
+        """function writes the filled part of the write buffer to the log file"""
+        if self.buf_indx > 0:
+            self.log_file.write(self.buf_view[:self.buf_indx])
+            self.file_sz += self.buf_indx
+            self.buf_indx = 0
+
+    def writer_loop(self):
+        """writer thread function. Drains the record queue into the write buffer and writes the
+        buffer out when it is full, or on the flush interval."""
+        pack_into = self.rec_struct.pack_into
+        rec_sz = self.rec_struct.size
+        buf_lim = len(self.buf) - rec_sz            #last offset a record fits at
+        t_flush = time.monotonic()
+        try:
+            while True:
+                running = self.running              #read before draining so the final drain is complete
+                for rec in self.queue.pop_all():    #pack all queued records
+                    if self.buf_indx > buf_lim:         #if buffer is full, write it out
+                        self.buf_write()
+                        self.file_rotate_chk()
+                    pack_into(self.buf, self.buf_indx, *rec)
+                    self.buf_indx += rec_sz
+                    self.cnt_rec += 1
+
+                if running == False: break
+                if time.monotonic() - t_flush >= sys_log_flush_s:  #periodic flush so a power loss only loses the last interval
+                    self.buf_write()
+                    self.log_file.flush()
+                    self.file_rotate_chk()
+                    t_flush = time.monotonic()
+                time.sleep(sys_log_poll_s)
+            self.file_close()
+        except (OSError, ValueError) as e:
+            self.running = False
+            self.report_err('Log write error - logging stopped: '+str(e))
+
+    def report_err(self, msg):
+        """function reports a logging error through the error function, if assigned
+
+        :param msg: error message
+        :type msg: `string`
+        """
+        if self.err_func is not None:
+            self.err_func([create_err_msg('Log','Writer',msg, True)])
+
+    def get_stats(self):
+        """function gets the datalogger counters
+
+        :returns: dict of records written, records dropped, queue depth, and files opened
+        :rtype: `dictionary` {counter_name:value}
+        """
+        return {'records':self.cnt_rec,
+                'drops':self.queue.cnt_drop,
+                'depth':self.queue.depth(),
+                'depth_max':self.queue.depth_max,
+                'files':self.cnt_files}
@@ -19,7 +19,8 @@ def menuPages_instMain(master_ref):
     #--update the menu pages dict to contain all the defined menu pages
     master_ref.dash_pages_menu.update({pageTypes_dict_menu['main_settings']:page_menu_settingsMain(master_ref),
                                        pageTypes_dict_menu['error']:page_menu_errorsMain(master_ref),
-                                       pageTypes_dict_menu['CAN_sniffer']:page_menu_CANsniffer(master_ref),})
+                                       pageTypes_dict_menu['CAN_sniffer']:page_menu_CANsniffer(master_ref),
+                                       pageTypes_dict_menu['latency']:page_menu_latency(master_ref),})
     
     #--assign the default button functions
     for page in master_ref.dash_pages_menu.values():
@@ -105,7 +106,10 @@ class page_menu_settingsMain(menu_page_template):
         self.data_listbox.grid(row=0, column=1, sticky=tk.NSEW)
 
         #--button labels
-        #btn1_lbl=N/A
+        self.var_log_btn_txt = tk.StringVar(value='Log\n')
+        btn1_lbl = tk.Label(self.lt_btn_frm, textvariable=self.var_log_btn_txt, font=menuTheme_font_tiny,
+                            fg=menuTheme_color_TextFG, bg=self.frm_bg_clr, justify=tk.LEFT)
+        btn1_lbl.grid(row=0, column=0, sticky=tk.NW)
         #btn2 = default exit menu
         #btn3_lbl=N/A
         #btn4 = default previous page
@@ -114,6 +118,12 @@ class page_menu_settingsMain(menu_page_template):
     
     def assign_btn_calls(self):
         """function assigns any page-specific button calls/functions"""
+        self.btn_func[0] = self.toggle_logging                          #assign the toggle logging call
+
+    def toggle_logging(self):
+        """function toggles the datalogging state"""
+        log_en = self.master_ref.dash_ctl.logging_en
+        log_en.set(not log_en.get())
 
     def upd_page(self):
         """function updates the current page with any changed values"""
@@ -123,15 +133,42 @@ class page_menu_settingsMain(menu_page_template):
             string = f"{att}: {val}"                             #make the display string
             self.data_listbox.insert(tk.END, string)            #insert display string
 
+        #--update logging status
+        CANref = self.master_ref.dash_CAN
+        if CANref.CAN_log_mode() is None: self.var_log_btn_txt.set('Log\nOff')    #logging in this process or the ingest process
+        else:
+            self.var_log_btn_txt.set('Log\nOn')
+            logger = CANref.datalogger
+            if logger is not None:
+                log_stats = logger.get_stats()
+                string = f"Log: {log_stats['records']} rec, {log_stats['drops']} dropped, {log_stats['files']} files"
+            else: string = 'Log: in the ingest process'     #logger counters are not published by the ingest process
+            self.data_listbox.insert(tk.END, string)
+
+        #--update RTR rates
+        for name, RTR_stats in self.master_ref.dash_CAN.CAN_RTR_stats().items():
+            string = f"RTR {name}: {RTR_stats['req_hz']:.1f} req/s, {RTR_stats['resp_hz']:.1f} resp/s, period {RTR_stats['period']}s"
+            self.data_listbox.insert(tk.END, string)
+
 class page_menu_CANsniffer(menu_page_template):
     def __init__(self, master_ref):
-        """class is for the CAN sniffer window that displays any/all current CAN data
+        """class is for the CAN sniffer window that displays any/all current CAN data. Each RX'd PID
+        has one persistent row that is only updated when its displayed values change.
         
         :param master_ref: reference back to the main/master window
         :type master_ref: `tk.window` ref
         """
         super().__init__(master_ref)
         self.name = pageTypes_dict_menu['CAN_sniffer']
+
+        #--displayed rows
+        self.row_vals = {}              #values currently displayed per row, in format {row_id:(value,...)}
+        self.row_order = []             #row ids in their displayed order
+        self.sort_rate = False          #sort rows by rate (highest first) instead of PID
+        self.tk_calls = 0               #Tk calls made by the last page update
+        self.stats_txt = ''             #currently displayed page stats text
+        self.fltr_txt = ''              #RX filter rejected traffic estimate text, set when the filter is turned on
+
         self.init_window()              #build main window elements
     
     def init_window(self):
@@ -143,11 +180,23 @@ class page_menu_CANsniffer(menu_page_template):
                                        bg=self.frm_bg_clr,
                                        padx=10, pady=10, justify=tk.LEFT)   #create menu label
         self.wndw_title_lbl.grid(row=0,column=0)   
+        self.var_stats_txt = tk.StringVar(value='')
+        stats_lbl = tk.Label(self.wndw_frm, textvariable=self.var_stats_txt, font=menuTheme_font_tiny,
+                             fg=menuTheme_color_TextFG, bg=self.frm_bg_clr, padx=10)   #PID and Tk call counts
+        stats_lbl.grid(row=0, column=0, sticky=tk.E)
 
-        #--listbox to display values
-        self.data_listbox = tk.Listbox(self.alt_frm, font=menuTheme_font_tiny,
-                                       fg=menuTheme_color_TextFG, bg=menuTheme_color_listboxBG) #create listbox to display errors
-        self.data_listbox.grid(row=0, column=1, sticky=tk.NSEW)
+        #--table to display values, one row per PID
+        tree_style = tkStyle(self)
+        tree_style.configure('Sniffer.Treeview', font=menuTheme_font_tiny, rowheight=menuTheme_tree_rowheight,
+                             foreground=menuTheme_color_TextFG, background=menuTheme_color_listboxBG,
+                             fieldbackground=menuTheme_color_listboxBG)
+        tree_style.configure('Sniffer.Treeview.Heading', font=menuTheme_font_tiny)
+        cols = {'PID':140, 'DLC':60, 'Rate':100, 'Count':110, 'Data':300, 'Changes':250}   #column names and widths
+        self.data_tree = tkTree(self.alt_frm, columns=tuple(cols), show='headings', style='Sniffer.Treeview')
+        for col, wdth in cols.items():
+            self.data_tree.heading(col, text=col)
+            self.data_tree.column(col, width=wdth, minwidth=wdth, stretch=(col == 'Data'))
+        self.data_tree.grid(row=0, column=1, sticky=tk.NSEW)
 
         #--button labels
         btn1_lbl = tk.Label(self.lt_btn_frm, text='Reset', font=menuTheme_font_tiny,
@@ -161,7 +210,10 @@ class page_menu_CANsniffer(menu_page_template):
         btn3_lbl.grid(row=0, column=0, sticky=tk.SW)      
 
         #btn4 = default previous page
-        #btn5_lbl=N/A
+        self.var_sort_btn_txt = tk.StringVar(value='Sort\nPID')
+        btn5_lbl = tk.Label(self.rt_btn_frm, textvariable=self.var_sort_btn_txt, font=menuTheme_font_tiny,
+                            fg=menuTheme_color_TextFG, bg=self.frm_bg_clr, justify=tk.RIGHT)
+        btn5_lbl.grid(row=0, column=0, sticky=tk.E)
         #btn6 = default next page
 
         #--set initial state of the filter variable
@@ -170,32 +222,187 @@ class page_menu_CANsniffer(menu_page_template):
     
     def assign_btn_calls(self):
         """function assigns any page-specific button calls/functions"""
-        self.btn_func[0] = self.master_ref.dash_CAN.CAN_rx_data_clear   #assign the clear CANrx dict call
+        self.btn_func[0] = self.reset_data                              #assign the clear CANrx data call
         self.btn_func[2] = self.toggle_CANrx_filter                     #assign the toggle filter call
+        self.btn_func[4] = self.toggle_sort                             #assign the toggle sort call
+
+    def reset_data(self):
+        """function clears the RX'd CAN data and all displayed rows"""
+        self.master_ref.dash_CAN.CAN_rx_data_clear()
+        self.data_tree.delete(*self.data_tree.get_children())
+        self.row_vals.clear()
+        self.row_order.clear()
 
     def toggle_CANrx_filter(self):
         """function toggles the CANrx filter state. WARNING: this persists outside of settings menu"""
         if self.master_ref.dash_CAN.RX_filter_en == True:
             self.master_ref.dash_CAN.CAN_RXfilter_off()
             self.var_filtr_btn_txt.set('RX Fltr\nOff')
+            self.fltr_txt = ''
         else:
+            rej = self.master_ref.dash_CAN.CAN_RXfilter_est_reject()   #estimate from the traffic seen before filtering
             self.master_ref.dash_CAN.CAN_RXfilter_on()
             self.var_filtr_btn_txt.set('RX Fltr\nOn')
+            if rej is not None: self.fltr_txt = f", filter rejects ~{rej:.0%}"
+
+    def toggle_sort(self):
+        """function toggles the row sort between PID and rate"""
+        self.sort_rate = not self.sort_rate
+        if self.sort_rate == True: self.var_sort_btn_txt.set('Sort\nRate')
+        else: self.var_sort_btn_txt.set('Sort\nPID')
+
+    def upd_page(self):
+        """function updates the current page with any changed values. Only rows with a changed payload
+        or rate are updated, and rows are only moved if the sort order changed. The message count is
+        refreshed along with those changes."""
+        if self.master_ref.dash_CAN.RX_proc is not None:           #PID stats aren't published by the ingest process
+            stats_txt = 'Not available - CAN RX is in the ingest process'
+            if stats_txt != self.stats_txt:
+                self.var_stats_txt.set(stats_txt)
+                self.stats_txt = stats_txt
+            return
+        tree = self.data_tree
+        tk_calls = 0                                                #Tk calls made this update
+        sort_keys = {}                                              #temp dict of row sort keys, in format {row_id:key}
+
+        for stats in self.master_ref.dash_CAN.CAN_rx_data_get(inc_hist=False): #loop through the PID RX stats
+            #format should be: 0xPID | DLC | rate | count | 0x[MSB]...[LSB] | changes per frame [MSB]...[LSB]
+            if stats['is_ext'] == True: row_id = f"0x{stats['PID']:08X}"               #format the PID value
+            else: row_id = f"0x{stats['PID']:03X}"
+            rate_str = f"{stats['rate']:.1f}"
+            dat_str = '0x[{}]'.format(', '.join(f"{val:02X}" for val in stats['data'][::-1]))  #format data string
+            prev_vals = self.row_vals.get(row_id)
+            if prev_vals is None or prev_vals[4] != dat_str or prev_vals[2] != rate_str:    #new row, or changed payload/rate
+                chg_str = ','.join(str(c) for c in stats['byte_chg'][::-1])                 #format change counters
+                vals = (row_id, stats['dlc'], rate_str, stats['cnt'], dat_str, chg_str)
+                if prev_vals is None:
+                    tree.insert('', tk.END, iid=row_id, values=vals)
+                    self.row_order.append(row_id)
+                else: tree.item(row_id, values=vals)
+                self.row_vals[row_id] = vals
+                tk_calls += 1
+            if self.sort_rate == True: sort_keys[row_id] = -stats['rate']
+            else: sort_keys[row_id] = (stats['is_ext'], stats['PID'])
+
+        #--sort rows, only moving the rows that are out of place
+        new_order = sorted(self.row_order, key=sort_keys.__getitem__)
+        if new_order != self.row_order:
+            crnt_order = self.row_order                                 #working copy of the displayed order
+            for indx, row_id in enumerate(new_order):
+                if crnt_order[indx] != row_id:                          #row is out of place, move it
+                    tree.move(row_id, '', indx)
+                    crnt_order.remove(row_id)
+                    crnt_order.insert(indx, row_id)
+                    tk_calls += 1
+            self.row_order = new_order
+
+        #--update page stats
+        stats_txt = f"{len(self.row_order)} PIDs, {tk_calls} Tk calls{self.fltr_txt}"
+        if stats_txt != self.stats_txt:                             #only update the label if changed
+            self.var_stats_txt.set(stats_txt)
+            self.stats_txt = stats_txt
+        self.tk_calls = tk_calls
+        
+class page_menu_latency(menu_page_template):
+    def __init__(self, master_ref):
+        """class is for the latency window that displays the CAN to display latency of each channel,
+        split into the latency stages (see `perf_lat_stages`)
+        
+        :param master_ref: reference back to the main/master window
+        :type master_ref: `tk.window` ref
+        """
+        super().__init__(master_ref)
+        self.name = pageTypes_dict_menu['latency']
+        self.init_window()              #build main window elements
+    
+    def init_window(self):
+        """function builds the main window elements"""
+        #--menu label
+        self.wndw_title_lbl = tk.Label(self.wndw_frm, text='Latency Menu',
+                                       font=menuTheme_font_small,
+                                       fg=menuTheme_color_TextFG,
+                                       bg=self.frm_bg_clr,
+                                       padx=10, pady=10, justify=tk.LEFT)   #create menu label
+        self.wndw_title_lbl.grid(row=0,column=0)
+
+        #--listbox to display values
+        self.data_listbox = tk.Listbox(self.alt_frm, font=menuTheme_font_tiny,
+                                       fg=menuTheme_color_TextFG, bg=menuTheme_color_listboxBG) #create listbox to display latency
+        self.data_listbox.grid(row=0, column=1, sticky=tk.NSEW)
+
+        #--button labels
+        self.var_lat_btn_txt = tk.StringVar(value='Track\nOff')
+        btn1_lbl = tk.Label(self.lt_btn_frm, textvariable=self.var_lat_btn_txt, font=menuTheme_font_tiny,
+                            fg=menuTheme_color_TextFG, bg=self.frm_bg_clr, justify=tk.LEFT)
+        btn1_lbl.grid(row=0, column=0, sticky=tk.NW)
+        #btn2 = default exit menu
+        btn3_lbl = tk.Label(self.lt_btn_frm, text='Reset', font=menuTheme_font_tiny,
+                            fg=menuTheme_color_TextFG, bg=self.frm_bg_clr, justify=tk.LEFT)
+        btn3_lbl.grid(row=0, column=0, sticky=tk.SW)
+        #btn4 = default previous page
+        #btn5_lbl=N/A
+        #btn6 = default next page
+    
+    def assign_btn_calls(self):
+        """function assigns any page-specific button calls/functions"""
+        self.btn_func[0] = self.toggle_lat_track                        #assign the toggle tracking call
+        self.btn_func[2] = self.reset_stats                             #assign the reset trackers call
+
+    def toggle_lat_track(self):
+        """function toggles the latency tracking state"""
+        CAN_ref = self.master_ref.dash_CAN
+        CAN_ref.CAN_lat_track_set(not CAN_ref.lat_track_en)
+        if CAN_ref.lat_track_en == True: self.var_lat_btn_txt.set('Track\nOn')
+        else: self.var_lat_btn_txt.set('Track\nOff')
+
+    def reset_stats(self):
+        """function resets the latency trackers, the display frame tracker, and the element update counts"""
+        self.master_ref.dash_CAN.CAN_lat_track_reset()
+        self.master_ref.dash_ctl.render_stats.reset()
+        self.master_ref.dash_ctl.pg_switch_cold.reset()
+        self.master_ref.dash_ctl.pg_switch_warm.reset()
+        for pg in self.master_ref.dash_pages_user.values(): pg.reset_upd_stats()
 
     def upd_page(self):
         """function updates the current page with any changed values"""
         #--update listbox
         self.data_listbox.delete(0, tk.END)                         #clear listbox
-        """Note: local copy is needed because if during the for loop if a new value is added and the dict
-        size changes, it causes a runtime error."""
-        local_allDat = dict(self.master_ref.dash_CAN.RX_allData)    #make local copy
-        for pid, dat_frm in local_allDat.items():                   #loop through raw CAN data
-            #format should be: 0xPID - [MSB]...[LSB]
-            pid_str = f"0x{pid:03X}"                                                    #format the PID value
-            dat_str = '0x[{}]'.format(', '.join(f"{val:02X}" for val in dat_frm[::-1])) #format data string
-            string = pid_str + ' - ' + dat_str                      #make the display string
+        upd_applied = upd_skipped = 0                               #element updates, totalled over all user pages
+        for pg in self.master_ref.dash_pages_user.values():
+            pg_stats = pg.get_upd_stats()
+            upd_applied += pg_stats['applied']
+            upd_skipped += pg_stats['skipped']
+        upd_pct = 100*upd_skipped/max(1, upd_applied + upd_skipped)
+        self.data_listbox.insert(tk.END, f"Element updates - applied {upd_applied} skipped {upd_skipped} ({upd_pct:.0f}%)")
+        frm = self.master_ref.dash_ctl.render_stats.get_stats()    #display refresh frames
+        self.data_listbox.insert(tk.END, f"Frames - {frm['p50']/1000:.1f}/{frm['p99']/1000:.1f}/{frm['max']/1000:.1f}ms"
+                                         f" | redrawn avg {frm['eles_avg']:.1f} max {frm['eles_max']} | overruns {frm['overruns']}/{frm['cnt']}")
+        ctl_ref = self.master_ref.dash_ctl
+        sw_warm = ctl_ref.pg_switch_warm.get_stats()                #user page switches, p50/max in ms
+        sw_cold = ctl_ref.pg_switch_cold.get_stats()
+        boot_txt = f"{ctl_ref.boot_ms/1000:.2f}s" if ctl_ref.boot_ms is not None else '-'
+        if self.master_ref.cfg_load_ms is not None:                 #config load time, XML parse or cache
+            boot_txt += f" (cfg {self.master_ref.cfg_load_src} {self.master_ref.cfg_load_ms:.0f}ms)"
+        self.data_listbox.insert(tk.END, f"Page switch - warm {sw_warm['p50']/1000:.1f}/{sw_warm['max']/1000:.1f}ms"
+                                         f" cold {sw_cold['p50']/1000:.1f}/{sw_cold['max']/1000:.1f}ms | built {len(ctl_ref.pg_built)} | boot {boot_txt}")
+        img = self.master_ref.dash_theme.img_cache.get_stats()     #shared theme images
+        self.data_listbox.insert(tk.END, f"Images - {img['imgs']} cached {img['MB']:.1f}MB | hits {img['hits']} misses {img['misses']} evicted {img['evicted']}")
+        if ctl_ref.CAN_replay is not None:                          #in replay mode, show the achieved replay rate
+            rpl = ctl_ref.CAN_replay.get_stats()
+            state = 'done' if rpl['done'] == True else 'running'
+            self.data_listbox.insert(tk.END, f"Replay {state} - {rpl['frames']} frames in {rpl['elapsed_s']:.1f}s, {rpl['fps']:.0f} frames/s"
+                                             f" | lag max {rpl['lag_max_s']*1000:.1f}ms")
+        if self.master_ref.dash_CAN.lat_track_en == False:
+            self.data_listbox.insert(tk.END, 'Latency tracking off')
+            return
+        #format should be: name - total p50/p95/p99/max, then the p99 of each stage, all in ms
+        for name, stats in self.master_ref.dash_CAN.CAN_lat_stats().items():
+            tot = stats['total']
+            string = (f"{name} - {tot['p50']/1000:.1f}/{tot['p95']/1000:.1f}/{tot['p99']/1000:.1f}/{tot['max']/1000:.1f}ms"
+                      f" | p99 bus {stats['bus']['p99']/1000:.1f} dec {stats['decode']['p99']/1000:.2f}"
+                      f" que {stats['queue']['p99']/1000:.1f} rndr {stats['render']['p99']/1000:.1f}")
             self.data_listbox.insert(tk.END, string)                #insert display string
-        
+
 class page_menu_errorsMain(menu_page_template):
     def __init__(self, master_ref):
         """class is for the main errors window that displays any/all current errors
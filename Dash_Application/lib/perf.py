@@ -0,0 +1,154 @@
+"""
+File:       perf.py
+Function:   This file contains the performance instrumentation used to profile the dash at runtime,
+            like the CAN to display latency tracking. Everything here is kept cheap enough to leave
+            running on the CM4 while driving.
+"""
+from .sys import *
+from bisect import bisect_left
+
+#----------------------------------latency stages----------------------------------
+"""Latency is split into the stages a CAN value passes through on the way to the display:
+    bus     > CAN message timestamp to the start of the RX function (HW, kernel, notifier wake-up)
+    decode  > time spent decoding the channel value in the RX function
+    queue   > time the decoded value waits in the ingest queue for the Tk thread
+    render  > time from applying the value on the Tk thread to the end of the frame render that redraws it
+    total   > CAN message timestamp to the end of render"""
+perf_lat_stages = ('bus', 'decode', 'queue', 'render', 'total')
+
+#----------------------------------methods----------------------------------
+def perf_hist_edges():
+    """function builds the shared bucket upper edges for the latency histograms. Edges are log spaced so
+    the resolution is relative (~same % error at 50us and at 500ms).
+
+    :returns: bucket upper edges, in us
+    :rtype: `list` of `float`
+    """
+    return [sys_lat_hist_min_us * sys_lat_hist_growth**i for i in range(sys_lat_hist_buckets)]
+
+perf_hist_edges_us = perf_hist_edges()      #shared by all histograms, only the counts are per-histogram
+
+#----------------------------------classes----------------------------------
+class perf_histogram():
+    __slots__ = ('counts', 'cnt', 'max')
+
+    def __init__(self):
+        """Construct a fixed-bucket histogram. Adding a value is a bisect and an increment, no
+        allocation, so it can be called per CAN message. Percentiles are the upper edge of the
+        bucket they fall in. The last bucket catches anything past the last edge."""
+        self.counts = [0]*(len(perf_hist_edges_us)+1)   #count per bucket
+        self.cnt = 0                                    #total values added
+        self.max = 0                                    #exact max value, in us
+
+    def add(self, val_us):
+        """function adds a value to the histogram
+
+        :param val_us: value to add, in us
+        :type val_us: `float`
+        """
+        self.counts[bisect_left(perf_hist_edges_us, val_us)] += 1
+        self.cnt += 1
+        if val_us > self.max: self.max = val_us
+
+    def percentile(self, p):
+        """function gets the approximate p-th percentile
+
+        :param p: percentile to get
+        :type p: `int` or `float` 0-100
+        :returns: upper edge of the bucket the percentile falls in (max value if in the last bucket), in us
+        :rtype: `float`
+        """
+        if self.cnt == 0: return 0
+        target = self.cnt*p/100
+        run_cnt = 0                         #running count of values at or below the current bucket
+        for i, c in enumerate(self.counts):
+            run_cnt += c
+            if run_cnt >= target:
+                if i >= len(perf_hist_edges_us): return self.max
+                return min(perf_hist_edges_us[i], self.max)
+        return self.max
+
+    def get_stats(self):
+        """function gets the histogram summary
+
+        :returns: dict of count, p50, p95, p99, and max - in us
+        :rtype: `dictionary` {stat_name:value}
+        """
+        return {'cnt':self.cnt,
+                'p50':self.percentile(50),
+                'p95':self.percentile(95),
+                'p99':self.percentile(99),
+                'max':self.max}
+
+    def reset(self):
+        """function clears the histogram"""
+        for i in range(len(self.counts)): self.counts[i] = 0
+        self.cnt = 0
+        self.max = 0
+
+class perf_lat_track():
+    __slots__ = perf_lat_stages
+
+    def __init__(self):
+        """Construct a latency tracker for one CAN channel, holding one histogram per latency stage.
+        The bus and decode stages are only written by the CAN RX thread and the queue, render and
+        total stages only by the Tk thread, so no locking is needed."""
+        for stage in perf_lat_stages: setattr(self, stage, perf_histogram())
+
+    def get_stats(self):
+        """function gets the summary of all latency stages
+
+        :returns: dict of histogram summaries by stage
+        :rtype: `dictionary` {stage_name:{stat_name:value}}
+        """
+        return {stage:getattr(self, stage).get_stats() for stage in perf_lat_stages}
+
+    def reset(self):
+        """function clears all latency stages"""
+        for stage in perf_lat_stages: getattr(self, stage).reset()
+
+class perf_frame_track():
+    __slots__ = ('frame', 'cnt_overrun', 'cnt_eles', 'eles_max')
+
+    def __init__(self):
+        """Construct a tracker for the display refresh frames - the frame time, the number of page
+        elements redrawn each frame, and the frames that took longer than the refresh period."""
+        self.frame = perf_histogram()   #frame time, in us
+        self.cnt_overrun = 0            #frames that overran the refresh period
+        self.cnt_eles = 0               #total elements redrawn
+        self.eles_max = 0               #most elements redrawn in one frame
+
+    def add(self, frame_us, num_eles, budget_us):
+        """function adds a frame
+
+        :param frame_us: frame time, in us
+        :type frame_us: `float`
+        :param num_eles: number of elements redrawn in the frame
+        :type num_eles: `int`
+        :param budget_us: frame time budget (the refresh period), in us
+        :type budget_us: `float`
+        """
+        self.frame.add(frame_us)
+        if frame_us > budget_us: self.cnt_overrun += 1
+        self.cnt_eles += num_eles
+        if num_eles > self.eles_max: self.eles_max = num_eles
+
+    def get_stats(self):
+        """function gets the frame summary
+
+        :returns: dict of frame count, frame time p50/p95/p99/max in us, overrun frames, and average and
+            max elements redrawn per frame
+        :rtype: `dictionary` {stat_name:value}
+        """
+        rval = self.frame.get_stats()
+        rval.update({'overruns':self.cnt_overrun,
+                     'eles_avg':self.cnt_eles/self.frame.cnt if self.frame.cnt else 0,
+                     'eles_max':self.eles_max})
+        return rval
+
+    def reset(self):
+        """function clears the frame tracker"""
+        self.frame.reset()
+        self.cnt_overrun = 0
+        self.cnt_eles = 0
+        self.eles_max = 0
@@ -0,0 +1,114 @@
+"""
+File:       replay.py
+Function:   This file contains the log replay engine, used to feed a recorded raw CAN datalog back
+            through the CAN RX path. Lets the full decode and display path run on a desk machine
+            without any CAN hardware, for reproducing field issues and comparing throughput.
+"""
+from .sys import *
+import threading
+from .datalog import datalog_read_recs, datalog_rec_types
+from .com_defs import create_err_msg
+
+class CAN_log_replay():
+    def __init__(self, CAN_ref, log_path, speed=1, bus_chnl=None):
+        """Construct a log replay instance. Frames from a raw CAN datalog are injected either
+        directly into `CAN_core.CAN_msgRX_func` (in-process feeder) or sent on a python-can
+        `virtual` bus channel that the CAN core is listening on.
+
+        :param CAN_ref: reference to the CAN core instance the frames are fed to
+        :type CAN_ref: `CAN_core` instance
+        :param log_path: absolute path to a raw ('RAW' record type) datalog file
+        :type log_path: `string`
+        :param speed: replay speed - 1 for real-time, N for N x accelerated, 0 for as fast as possible
+        :type speed: `float`
+        :param bus_chnl: (optional) virtual bus channel to send frames on - None to use the in-process feeder
+        :type bus_chnl: `string`
+        """
+        #--config
+        self.CAN_ref = CAN_ref          #CAN core the frames are fed to
+        self.log_path = log_path        #raw datalog to replay
+        self.speed = speed              #replay speed multiplier, 0 for as fast as possible
+        self.bus_chnl = bus_chnl        #virtual bus channel, None for in-process feeder
+
+        #--replay thread
+        self.thread = None              #replay thread
+        self.running = False            #replay thread should keep running
+        self.done = False               #replay finished (or was stopped)
+        self.err_msg = None             #error message if the replay failed
+
+        #--counters
+        self.cnt_frames = 0             #frames injected
+        self.t_elapsed = 0              #wall time since the replay started, in seconds
+        self.lag_max = 0                #max time injection fell behind the recorded timing, in seconds
+
+    def start(self):
+        """function starts the replay thread"""
+        if self.running == True: return
+        self.running = True
+        self.done = False
+        self.thread = threading.Thread(target=self.replay_loop, name='PyDash_replay', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """function stops the replay thread"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def replay_loop(self):
+        """replay thread function. Reads the datalog and injects each frame at its recorded time
+        offset, scaled by the replay speed. Frames keep their recorded timestamps, offset to the replay
+        start. Runs outside the Tk thread, so the counters are only read through `get_stats` and a
+        failure is reported on the Tk thread."""
+        bus = None
+        try:
+            hdr, recs = datalog_read_recs(self.log_path)
+            if hdr['rec_type'] != datalog_rec_types['RAW']:
+                raise ValueError('replay requires a raw frame datalog')
+            if self.bus_chnl is not None:       #send on a virtual bus, otherwise call the RX function directly
+                bus = can.interface.Bus(channel=self.bus_chnl, interface='virtual', preserve_timestamps=True)
+                feed_func = bus.send
+            else: feed_func = self.CAN_ref.CAN_msgRX_func
+
+            speed = self.speed
+            t_wall0 = time.perf_counter()       #wall clock replay start
+            ts0 = None                          #first recorded timestamp
+            for ts, PID, is_ext, dlc, data in recs:
+                if self.running == False: break
+                if ts0 is None:
+                    ts0 = ts
+                    ts_offs = time.time() - ts0     #recorded to replay time offset, keeps the recorded frame spacing
+                if speed > 0:                   #keep recorded inter-frame timing, scaled by speed
+                    delay = t_wall0 + (ts - ts0)/speed - time.perf_counter()
+                    if delay > sys_replay_min_sleep: time.sleep(delay)
+                    elif -delay > self.lag_max: self.lag_max = -delay
+                msg = can.Message(timestamp=ts + ts_offs, arbitration_id=PID, is_extended_id=is_ext,
+                                  dlc=dlc, data=data)
+                feed_func(msg)
+                self.cnt_frames += 1
+                self.t_elapsed = time.perf_counter() - t_wall0
+        except (OSError, ValueError, can.CanError) as e:
+            self.err_msg = str(e)
+            err_msg = create_err_msg('CAN','Replay','Replay failed: '+self.err_msg)
+            master_ref = self.CAN_ref.master_ref
+            master_ref.after(0, master_ref.upd_errors, [err_msg])     #error list is only changed on the Tk thread
+        finally:
+            if bus is not None: bus.shutdown()
+            self.running = False
+            self.done = True
+
+    def get_stats(self):
+        """function gets the replay counters
+
+        :returns: dict of frames injected, elapsed time, achieved frames/s, max lag behind the recorded timing,
+            and the replay finished flag
+        :rtype: `dictionary` {counter_name:value}
+        """
+        fps = 0
+        if self.t_elapsed > 0: fps = self.cnt_frames/self.t_elapsed
+        return {'frames':self.cnt_frames,
+                'elapsed_s':self.t_elapsed,
+                'fps':fps,
+                'lag_max_s':self.lag_max,
+                'done':self.done}
@@ -11,12 +11,16 @@ import pathlib
 import can
 import time
 import shutil
+import json
+import hashlib
+import importlib.util
 import xml.etree.ElementTree as ET
 import re as rgx
 from tkinter import font as tkFont
 import copy
 from ast import literal_eval
 from tkinter.ttk import Treeview as tkTree
+from tkinter.ttk import Style as tkStyle
 
 #---system state
 sys_inDEBUG = False    #variable to handle debug parts of code 
@@ -34,6 +38,7 @@ sys_config_dir = sys_root_dir + 'PyDash_Config/'       #directory of configurati
 sys_config_archive = sys_root_dir + 'PyDash_Config.zip' #path for new config archive
 sys_cfg_Images_dir = sys_config_dir + 'images/'       #path for any images used in config
 sys_config_file = sys_config_dir + 'PyDash_Config.xml'  #path of dash config file
+sys_config_cache_file = sys_config_dir + 'PyDash_Config.cache'  #path of the compiled dash config cache
 sys_log_dir = sys_root_dir + 'data_logs'                #directory for storing datalogs
 
 #----physical hardware constants
@@ -72,12 +77,60 @@ sys_CAN_intrfce = 'socketcan'
 sys_default_PID = 0xA0              #default self PID for the dash
 sys_SFF_mask = 0x7FF                #message filter mask - compare all bits - standard frame format (SFF)
 sys_EFF_mask = 0x1FFFFFFF           #message filter mask - compare all bits - extended frame format (EFF)
+sys_RXfilter_max = 64               #max RX filters - kernel limit is 512 but every RX'd frame is checked against each filter
 sys_RTR_freq_dflt = 5               #default RTR frequency in seconds - also used for channel timeouts (why it is very long)
+sys_RTR_bus_budget = 10             #default max share of the bus used by RTR requests, in percent
+sys_RTR_backoff = 4                 #RTR period multiplier for channels that are not visible or logged
+sys_RTR_burst_frms = 8              #max RTR requests sent back to back when under the bus budget
+sys_RTR_frm_bits_SFF = 55           #approx bus bits per standard ID RTR frame, including bit stuffing and inter-frame space
+sys_RTR_frm_bits_EFF = 80           #approx bus bits per extended ID RTR frame, including bit stuffing and inter-frame space
+sys_RTR_stats_s = 5                 #min window for the achieved RTR request/response rates, in seconds
+sys_CAN_ingest_sz = 4096            #number of slots in the RX ingest queue between the CAN notifier thread and the Tk thread
+sys_CAN_RXmode = 'notifier'         #CAN RX mode - 'notifier' (python-can notifier thread), 'filehandler' (Tk file handler, falls back to notifier if not supported), or 'process' (separate ingest process, see can_proc.py)
+sys_CAN_RXbatch_max = 256           #max messages read per Tk file handler call
+sys_CAN_proc_poll_s = 0.05          #ingest process control command and stop check interval, in seconds
+sys_CAN_proc_read_retry = 4         #shared table read tries per channel before leaving it for the next refresh
+sys_CAN_proc_stop_s = 2             #time the ingest process is given to stop and write out its datalog before it is terminated, in seconds
+sys_CAN_tmo_tick_s = 0.1            #channel timeout timer wheel resolution, in seconds
+sys_CAN_tmo_slots = 512             #channel timeout timer wheel slots - one turn of the wheel is ~51s
+sys_PIDrate_bin_s = 0.25            #CAN sniffer PID rate bin width, in seconds
+sys_PIDrate_bins = 8                #CAN sniffer PID rate bins - the sliding window is 2s
+sys_PIDhist_sz = 16                 #number of recent messages kept per PID for the CAN sniffer
+sys_PIDsnap_tries = 50              #CAN sniffer PID snapshot copy attempts before using the last consistent copy
+
+#----CAN replay mode - feed a recorded raw datalog through the CAN RX path instead of the CAN hardware
+sys_replay_log = os.environ.get('PYDASH_REPLAY', None)                  #path of raw datalog to replay, None for normal operation
+sys_replay_speed = float(os.environ.get('PYDASH_REPLAY_SPEED', 1))      #1=real-time, N=N x accelerated, 0=as fast as possible
+sys_replay_on_bus = os.environ.get('PYDASH_REPLAY_BUS', '0') == '1'     #send frames on a virtual bus instead of calling the RX function directly
+sys_replay_chnl = 'pydash_replay'   #virtual bus channel used in replay mode
+sys_replay_min_sleep = 0.001        #replay waits only if the next frame is at least this far ahead, in seconds
+
+#----datalogging constants
+sys_log_queue_sz = 65536            #number of slots in the datalog record queue - approx 10s of full bus load
+sys_log_buf_sz = 65536              #datalog write buffer size in bytes
+sys_log_flush_s = 1                 #max time between datalog writes to the SD card, in seconds
+sys_log_poll_s = 0.05               #datalog writer thread poll interval, in seconds
+sys_log_rotate_sz = 64*1024*1024    #start a new log file after this many bytes
+sys_log_rotate_s = 30*60            #start a new log file after this many seconds
+
+#----performance instrumentation
+sys_lat_hist_min_us = 10            #upper edge of the first latency histogram bucket, in us
+sys_lat_hist_growth = 1.4           #ratio between latency histogram bucket edges
+sys_lat_hist_buckets = 42           #number of latency histogram buckets - covers 10us to ~10s
 
 #----misc constants
 sys_pad_margin = 2                  #padding margin of the BG pad object, in pixels, larger than its parent
 sys_dflt_pad_radius = 20            #default radius of the background pad polygon
+sys_txt_extent_cache_sz = 4096      #max cached text extents (font, text) for pad sizing before the cache is cleared
+sys_pad_tmpl_cache_sz = 1024        #max cached pad polygon sizes (width, height, radius) before the cache is cleared
 sys_dat_sigdig = 0                  #default sigdigs for data labels
+sys_img_cache_MB = 64               #memory budget of the theme image cache, in MB - least recently used images are dropped past it
+sys_img_prescale = importlib.util.find_spec('PIL') is not None     #scale page background images to the display size once when loaded - needs Pillow, so off without it
+sys_pg_built_max = 4                #max user pages kept built, least recently shown pages are torn down past it - 0 for no limit
+sys_pg_prebuild = True              #build the pages next to the displayed page in idle time
+sys_config_cache_ver = 1            #compiled config cache format - bump when the config classes or checks change so old caches are rebuilt
+sys_err_txt = 'ERR'                 #data label text when the linked CAN channel has timed out
+sys_err_clr = '#9A9A9A'             #greyed element color when the linked CAN channel has timed out
 
 #------------------------------------Menu theme------------------------------------
 menuTheme_font_tiny = ('Sui Generis', 18)
@@ -87,4 +140,5 @@ menuTheme_font_large = ('Sui Generis', 72)
 
 menuTheme_color_TextFG = '#02C6D0'
 menuTheme_color_BG = '#636363'
-menuTheme_color_listboxBG = "#7E7E7E"
\ No newline at end of file
+menuTheme_color_listboxBG = "#7E7E7E"
+menuTheme_tree_rowheight = 30       #row height of treeview tables in menu pages, in pixels
\ No newline at end of file
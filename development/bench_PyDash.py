@@ -0,0 +1,638 @@
+"""
+File:       bench_PyDash.py
+Function:   Benchmark suite for the CAN ingest and render path of the PyDash application. Synthetic dash
+            configs (10, 100, and 1000 channels across 1-50 pages) are generated and loaded through the
+            normal streaming config load (iterparseXML), then synthetic CAN traffic is driven through the RX path.
+
+            Reported results:
+                - config parse time
+                - config file read time and peak memory, element tree vs the single pass streaming reader
+                - boot config load time - full XML parse and error check (cold) vs the compiled config cache
+                - signal decode cost per channel (CANch.calc_dec)
+                - RX function cost per frame (CAN_core.CAN_msgRX_func) - p50/p99 latency and frames/s
+                - end to end frames/s through a python-can `virtual` bus and notifier
+                - ingest drain cost per display refresh
+                - per element update_state cost (requires a display - use `xvfb-run` on a headless box)
+
+            Results are written to a JSON file tagged with the git commit so runs can be compared across
+            commits. Passing a previous results file with --compare flags any regressions.
+
+            usage:  python development/bench_PyDash.py [--quick] [--out FILE] [--compare FILE]
+"""
+import argparse
+import copy
+import os
+import tempfile
+import tracemalloc
+import json
+import pathlib
+import platform
+import subprocess
+import sys as py_sys
+import xml.etree.ElementTree as ET
+
+py_sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / 'Dash_Application'))     #make the app lib importable
+import tkinter as tk
+import time
+import can
+import socket
+import select
+import struct
+import threading
+from lib.can import CAN_core
+from lib.com_defs import dash_config, dash_theme_user
+from lib.dash_config import dashCFG_load
+from lib.dash_config import iterreadXML, iterparseXML
+from lib.dash_control import dash_control
+
+#----------------------------------constants----------------------------------
+bench_sizes = [(10, 1),             #benchmarked config sizes, in format (num channels, num pages)
+               (100, 8),
+               (1000, 50)]
+bench_chs_per_PID = 4               #synthetic channels packed into each PID
+bench_regress_pct = 10              #percent change flagged as a regression when comparing results
+bench_bus_chnl = 'pydash_bench'     #virtual bus channel used for the end to end test
+bench_RXmode_fps = 4000             #frame rate sent for the RX mode comparison, in frames/s
+bench_RXmode_burst = 8              #frames sent per burst for the RX mode comparison
+bench_RXmode_tick_ms = 16           #refresh tick period for the RX mode comparison, in ms
+bench_render_writes = 10            #values written per channel between frame renders
+bench_read_reps = 7                 #config file reads timed per reader, the fastest is reported
+
+#----------------------------------synthetic config----------------------------------
+def bench_gen_config(num_chs, num_pages):
+    """function generates a synthetic dash config XML tree. Channels are packed bench_chs_per_PID to a
+    PID, alternating between the legacy frames definition and the bit level definition. Each channel
+    gets a data label, every 4th channel also gets a bar indicator and every 8th a bullet indicator,
+    spread evenly across the pages.
+
+    :param num_chs: number of CAN channels to define
+    :type num_chs: `int`
+    :param num_pages: number of user pages to define
+    :type num_pages: `int`
+    :returns: config XML element tree
+    :rtype: `ET.ElementTree`
+    """
+    root = ET.Element('DASH')
+    disp = ET.SubElement(root, 'DISP')
+    for tag, txt in (('RES_X','1024'), ('RES_Y','600'), ('REFRESH','16'), ('BAKLITE','100')):
+        ET.SubElement(disp, tag).text = txt
+
+    theme = ET.SubElement(root, 'THEME')
+    clrs = ET.SubElement(theme, 'COLORS')
+    for name, hex_clr in (('BG','#636363'), ('FG','#FFFFFF'), ('ALERT_FG','#000000'),
+                          ('ALERT_WARN','#FFFF00'), ('ALERT_DNGR','#FF0000'), ('FG_accent','#02C6D0')):
+        ET.SubElement(clrs, 'COLOR', NAME=name).text = hex_clr
+    alrt = ET.SubElement(theme, 'ALERT_COLORS')
+    for tag in ('ALERT_FG', 'ALERT_WARN', 'ALERT_DNGR'): ET.SubElement(alrt, tag).text = tag
+    fnts = ET.SubElement(theme, 'FONTS')
+    ET.SubElement(fnts, 'FONT', NAME='SZ_DEFLT').text = "('Sui Generis', '24', 'normal', 'roman')"
+    ET.SubElement(theme, 'IMAGES')
+
+    CANblk = ET.SubElement(root, 'CAN')
+    core = ET.SubElement(CANblk, 'CORE')
+    ET.SubElement(core, 'BASE_PID').text = '0x9A'
+    ET.SubElement(core, 'RX_FILTER').text = 'False'
+    chs = ET.SubElement(CANblk, 'CHANNELS')
+    for i in range(num_chs):
+        ch = ET.SubElement(chs, 'CH', NAME=f"CH{i}")
+        ET.SubElement(ch, 'PID').text = hex(0x100 + i//bench_chs_per_PID)
+        ET.SubElement(ch, 'EXT').text = 'False'
+        ET.SubElement(ch, 'DLC').text = '8'
+        ET.SubElement(ch, 'REM_REQ').text = 'False'
+        slot = i % bench_chs_per_PID                            #16 bit slot in the packed PID
+        if i % 2 == 0: ET.SubElement(ch, 'FRAMES').text = f"{slot*2+1},{slot*2+2}"
+        else:
+            ET.SubElement(ch, 'START_BIT').text = str(slot*16)
+            ET.SubElement(ch, 'BIT_LEN').text = '12'
+        ET.SubElement(ch, 'SCALAR').text = '0.1'
+        ET.SubElement(ch, 'OFFSET').text = '0'
+
+    frms = ET.SubElement(root, 'FRAMES')
+    pages = []
+    for p in range(num_pages):
+        frm = ET.SubElement(frms, 'FRM', NAME=f"Gauge{p}")
+        for tag, txt in (('LEVEL','0'), ('PARENT','MASTER'), ('TYPE','GAUGE'), ('BG_CLR','BG')):
+            ET.SubElement(frm, tag).text = txt
+        elm = ET.SubElement(frm, 'ELM')
+        pages.append({'LBL_DATA':ET.SubElement(elm, 'LBL_DATA'),
+                      'IND_BLT':ET.SubElement(elm, 'IND_BLT'),
+                      'IND_BAR':ET.SubElement(elm, 'IND_BAR'),
+                      'cnt':0})
+    for i in range(num_chs):
+        pg = pages[i % num_pages]
+        x0 = str(10 + (pg['cnt'] % 6)*165); y0 = str(10 + (pg['cnt']//6 % 10)*55)
+        pg['cnt'] += 1
+        lbl = ET.SubElement(pg['LBL_DATA'], 'LBL', NAME=f"DAT{i}")
+        for tag, txt in (('X0',x0), ('Y0',y0), ('FILL','FG'), ('FONT','SZ_DEFLT'), ('DATA_CH',f"CH{i}"),
+                         ('SIGDIG','1'), ('PAD','True'), ('CLR_BG','BG'), ('WARN_EN','True'),
+                         ('LIM_DNGRLO','10'), ('LIM_WARNLO','50'), ('LIM_WARNHI','300'), ('LIM_DNGRHI','400')):
+            ET.SubElement(lbl, tag).text = txt
+        if i % 4 == 0:
+            bar = ET.SubElement(pg['IND_BAR'], 'LBL', NAME=f"BAR{i}")
+            for tag, txt in (('X0',x0), ('Y0',y0), ('WIDTH','150'), ('HEIGHT','10'), ('FILL','FG_accent'),
+                             ('OUTLN','FG_accent'), ('DATA_CH',f"CH{i}"), ('ORDR','BG'), ('SCALE_LO','0'),
+                             ('SCALE_HI','410'), ('WARN_EN','True'), ('LIM_DNGRLO','10'), ('LIM_WARNLO','50'),
+                             ('LIM_WARNHI','300'), ('LIM_DNGRHI','400')):
+                ET.SubElement(bar, tag).text = txt
+        if i % 8 == 0:
+            blt = ET.SubElement(pg['IND_BLT'], 'LBL', NAME=f"BLT{i}")
+            for tag, txt in (('X0',x0), ('Y0',y0), ('SIZE','20'), ('LIM_LO','100'), ('LIM_HI','200'),
+                             ('DATA_CH',f"CH{i}"), ('CLR_LO','BG'), ('CLR_HI','FG_accent'), ('OUTLN','FG')):
+                ET.SubElement(blt, tag).text = txt
+
+    return ET.ElementTree(root)
+
+def bench_gen_frames(CAN_ref, num_frames):
+    """function generates synthetic CAN messages for all of the configured PIDs, round robin
+
+    :param CAN_ref: CAN core instance with the configured channels
+    :type CAN_ref: `CAN_core`
+    :param num_frames: number of messages to generate
+    :type num_frames: `int`
+    :returns: list of messages
+    :rtype: `list` of `can.Message`
+    """
+    PIDs = sorted(p for p in CAN_ref.CANchs_PIDindx if p is not None)
+    msgs = []
+    for i in range(num_frames):
+        data = [(i*7 + b*13) & 0xFF for b in range(8)]
+        msgs.append(can.Message(arbitration_id=PIDs[i % len(PIDs)], is_extended_id=False,
+                                data=data, timestamp=time.time()))
+    return msgs
+
+#----------------------------------bench master window----------------------------------
+class bench_dash_control(dash_control):
+    def usrBtns_init(self):
+        """no user buttons when benchmarking"""
+
+class bench_master():
+    def __init__(self, tk_root, use_display):
+        """minimal stand-in for the main window, holding the same config/control attributes
+        that the parse and update functions reference
+
+        :param tk_root: tk root (or Tcl interpreter if there is no display)
+        :param use_display: a display is available and pages can be built
+        :type use_display: `bool`
+        """
+        self.tk_root = tk_root
+        self.errors = []
+        self.dash_settings = dash_config()
+        self.dash_CAN = CAN_core(self)
+        self.dash_theme = dash_theme_user()
+        self.dash_pages_user = {}
+        self.dash_pages_menu = {}
+        if use_display == True:
+            self.prnt_frame = tk.Frame(tk_root)
+            self.prnt_frame.pack(fill="both", expand=True)
+            self.dash_ctl = bench_dash_control(self)
+
+    def upd_errors(self, err_msgs):
+        """function stores any errors"""
+        for e in err_msgs: self.errors.append(e)
+
+    def bind(self, *args, **kwargs):
+        """function passes key binds to the tk root"""
+        return self.tk_root.bind(*args, **kwargs)
+
+    def after(self, *args, **kwargs):
+        """function passes scheduled calls to the tk root"""
+        return self.tk_root.after(*args, **kwargs)
+
+    def after_idle(self, *args, **kwargs):
+        """function passes idle calls to the tk root"""
+        return self.tk_root.after_idle(*args, **kwargs)
+
+#----------------------------------measurement helpers----------------------------------
+def pct(vals, p):
+    """function gets the p-th percentile of the passed values
+
+    :param vals: sorted values
+    :type vals: `list` of numbers
+    :param p: percentile
+    :type p: `int` 0-100
+    """
+    if not vals: return 0
+    return vals[min(len(vals)-1, int(len(vals)*p/100))]
+
+def time_per_call(func, num):
+    """function times the passed function over a number of calls
+
+    :returns: sorted per-call times in ns
+    :rtype: `list` of `int`
+    """
+    times = []
+    pc = time.perf_counter_ns
+    for _ in range(num):
+        t0 = pc(); func(); times.append(pc() - t0)
+    times.sort()
+    return times
+
+def summarize(times_ns):
+    """function summarizes per-call times
+
+    :returns: dict of p50, p99, and calls/s from the mean
+    :rtype: `dictionary`
+    """
+    mean = sum(times_ns)/len(times_ns)
+    return {'p50_us':pct(times_ns, 50)/1000, 'p99_us':pct(times_ns, 99)/1000, 'per_s':1e9/mean if mean else 0}
+
+#----------------------------------benchmarks----------------------------------
+def bench_parse(master, cfg_tree, use_display):
+    """function loads the synthetic config through the streaming config load (iterparseXML). The config is
+    written to a temp config directory.
+
+    :returns: parse time in ms
+    :rtype: `float`
+    """
+    if use_display == False:            #pages are tk frames, so without a display the pages are left out
+        cfg_tree = copy.deepcopy(cfg_tree)
+        cfg_tree.getroot().find('FRAMES').clear()
+    with tempfile.TemporaryDirectory() as cfg_dir:
+        cfg_file = os.path.join(cfg_dir, 'PyDash_Config.xml')
+        cfg_tree.write(cfg_file)
+        t0 = time.perf_counter()
+        iterparseXML(master, cfg_file)
+        return (time.perf_counter() - t0)*1000
+
+def bench_parse_stream(tk_root, cfg_tree, use_display):
+    """function compares reading the config file into an element tree (`ET.parse`) vs the single
+    pass streaming reader, for time and peak memory (tracemalloc, in a separate run so it doesn't skew the
+    times). Each reader is timed `bench_read_reps` times and the fastest is reported, so a one-off first call
+    cost doesn't decide the comparison. With a display the full streaming load, creating the config classes,
+    is timed too.
+
+    :returns: times in ms and peak memory in KB
+    :rtype: `dict`
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as cfg_dir:
+        cfg_file = os.path.join(cfg_dir, 'PyDash_Config.xml')
+        cfg_tree.write(cfg_file)
+        for name, func in (('tree', ET.parse), ('stream', iterreadXML)):
+            times = []
+            for _ in range(bench_read_reps):
+                t0 = time.perf_counter()
+                func(cfg_file)
+                times.append(time.perf_counter() - t0)
+            res[name+'_read_ms'] = min(times)*1000
+            tracemalloc.start()
+            read = func(cfg_file)
+            res[name+'_read_peak_KB'] = tracemalloc.get_traced_memory()[1]/1024
+            tracemalloc.stop()
+            del read
+        if use_display == True:
+            master = bench_master(tk_root, use_display)
+            t0 = time.perf_counter()
+            iterparseXML(master, cfg_file)
+            res['stream_load_ms'] = (time.perf_counter() - t0)*1000
+            for pg in master.dash_pages_user.values(): pg.destroy()
+            master.prnt_frame.destroy()
+    return res
+
+def bench_cfg_load(tk_root, cfg_tree, use_display):
+    """function measures the boot config load, first cold (XML parse and error check, then the cache is
+    written) and then from the compiled config cache. The config is written to a temp config directory.
+    The cache is only written for a config without errors, so if the second load didn't come from the
+    cache, no cached time is reported and `cache_miss` holds the reason instead.
+
+    :returns: load times in ms, and whether the second load was from the cache
+    :rtype: `dict`
+    """
+    if use_display == False:            #pages are tk frames, so without a display the pages are left out
+        cfg_tree = copy.deepcopy(cfg_tree)
+        cfg_tree.getroot().find('FRAMES').clear()
+    res = {}
+    with tempfile.TemporaryDirectory() as cfg_dir:
+        cfg_file = os.path.join(cfg_dir, 'PyDash_Config.xml')
+        cache_file = os.path.join(cfg_dir, 'PyDash_Config.cache')
+        img_dir = os.path.join(cfg_dir, 'images')
+        cfg_tree.write(cfg_file)
+        for run in ('cold', 'cached'):
+            master = bench_master(tk_root, use_display)
+            from_cache = dashCFG_load(master, cfg_file, cache_file, img_dir)
+            if run == 'cold':
+                res['cold_ms'] = master.cfg_load_ms
+                cold_errs = master.errors
+            else:
+                res['from_cache'] = from_cache
+                if from_cache == True: res['cached_ms'] = master.cfg_load_ms
+                elif cold_errs:             #not a cached boot time, so only report why
+                    res['cache_miss'] = f"{len(cold_errs)} config errors, first: {cold_errs[0].sys} {cold_errs[0].mod} {cold_errs[0].msg}"
+                else: res['cache_miss'] = 'cache not written or not read'
+            if use_display == True:
+                for pg in master.dash_pages_user.values(): pg.destroy()
+                master.prnt_frame.destroy()
+    return res
+
+def bench_decode(CAN_ref, msgs, num):
+    """function measures the signal decode cost per channel"""
+    chs = [v for v in CAN_ref.CANchs.values() if v.PID is not None]
+    for v in chs: v.val_rawCAN = msgs[0].data
+    indx = [0]
+    def call():
+        v = chs[indx[0] % len(chs)]; indx[0] += 1
+        v.calc_dec()
+    return summarize(time_per_call(call, num))
+
+def bench_RXfunc(CAN_ref, msgs):
+    """function measures CAN_msgRX_func per frame, draining the ingest queue between batches"""
+    indx = [0]
+    RXfunc = CAN_ref.CAN_msgRX_func
+    def call():
+        RXfunc(msgs[indx[0]]); indx[0] += 1
+    times = []
+    for start in range(0, len(msgs), 256):
+        times.extend(time_per_call(call, min(256, len(msgs)-start)))
+        CAN_ref.RX_ingest.pop_all()     #keep the queue from filling - drain cost is measured separately
+    times.sort()
+    return summarize(times)
+
+def bench_bus(CAN_ref, msgs):
+    """function measures end to end frames/s from a virtual bus sender through the notifier and RX function"""
+    rx_bus = can.interface.Bus(channel=bench_bus_chnl, interface='virtual')
+    tx_bus = can.interface.Bus(channel=bench_bus_chnl, interface='virtual')
+    cnt = [0]
+    RXfunc = CAN_ref.CAN_msgRX_func
+    def listener(msg):
+        RXfunc(msg); cnt[0] += 1
+    notifier = can.Notifier(rx_bus, [listener])
+    t0 = time.perf_counter()
+    for i, m in enumerate(msgs):
+        tx_bus.send(m)
+        if i % 256 == 0: CAN_ref.RX_ingest.pop_all()
+    while cnt[0] < len(msgs) and time.perf_counter() - t0 < 30:
+        CAN_ref.RX_ingest.pop_all(); time.sleep(0.001)
+    t_total = time.perf_counter() - t0
+    notifier.stop(); rx_bus.shutdown(); tx_bus.shutdown()
+    CAN_ref.RX_ingest.pop_all()
+    return {'frames':cnt[0], 'per_s':cnt[0]/t_total}
+
+class bench_sock_bus(can.BusABC):
+    """Stand-in for a socketcan bus on machines without SocketCAN (or a vcan interface). Frames go
+    through a local datagram socket pair, so the RX side has a real file descriptor for the Tk file
+    handler, like a socketcan bus. The send time is packed with each frame to measure RX latency."""
+    frm_fmt = struct.Struct('<dI?B8s')      #send time, ID, extended ID, dlc, data
+
+    def __init__(self, **kwargs):
+        self.rx_sock, self.tx_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.rx_sock.setblocking(False)
+        super().__init__(channel='bench_sock', **kwargs)
+
+    def send(self, msg, timeout=None):
+        self.tx_sock.send(self.frm_fmt.pack(time.perf_counter(), msg.arbitration_id, msg.is_extended_id,
+                                            msg.dlc, bytes(msg.data)))
+
+    def _recv_internal(self, timeout):
+        try: frm = self.rx_sock.recv(self.frm_fmt.size)
+        except BlockingIOError:
+            if timeout == 0 or not select.select([self.rx_sock], [], [], timeout)[0]: return None, False
+            frm = self.rx_sock.recv(self.frm_fmt.size)
+        t_send, PID, is_ext, dlc, data = self.frm_fmt.unpack(frm)
+        return can.Message(timestamp=t_send, arbitration_id=PID, is_extended_id=is_ext, dlc=dlc, data=data[:dlc]), False
+
+    def fileno(self):
+        return self.rx_sock.fileno()
+
+    def shutdown(self):
+        super().shutdown()
+        self.rx_sock.close(); self.tx_sock.close()
+
+def bench_RXmode(CAN_ref, tk_root, msgs, mode):
+    """function measures one CAN RX mode ('notifier' or 'filehandler') over a socket stand-in bus.
+    Frames are sent in bursts at a fixed rate from a sender thread while the Tk loop runs a refresh
+    tick that drains the ingest queue, like the dash. Measures the RX latency (send to RX function),
+    the refresh tick jitter, and the time the Tk thread was busy.
+
+    :returns: dict of results, or None if the mode isn't supported here
+    :rtype: `dictionary`
+    """
+    bus = bench_sock_bus()
+    CAN_ref.CANbus = bus
+    RXfunc = CAN_ref.CAN_msgRX_func
+    lat_us = []
+    def listener(msg):
+        RXfunc(msg); lat_us.append((time.perf_counter() - msg.timestamp)*1e6)
+    if mode == 'filehandler':
+        if CAN_ref.CAN_set_RXfilehandler(tk_root, listener) == False:
+            bus.shutdown(); return None
+    else: CAN_ref.CAN_set_RXlistener(listener)
+
+    def sender():
+        period = bench_RXmode_burst/bench_RXmode_fps
+        t_next = time.perf_counter()
+        for i in range(0, len(msgs), bench_RXmode_burst):
+            for m in msgs[i:i+bench_RXmode_burst]: bus.send(m)
+            t_next += period
+            delay = t_next - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+    tx_thread = threading.Thread(target=sender, daemon=True)
+
+    tick_s = bench_RXmode_tick_ms/1000
+    jitter_us = []
+    t_tick = [0, None]                  #last tick time, pending tick id
+    def tick():
+        t_now = time.perf_counter()
+        jitter_us.append(abs(t_now - t_tick[0] - tick_s)*1e6)
+        t_tick[0] = t_now
+        CAN_ref.CAN_ingest_drain()
+        t_tick[1] = tk_root.after(bench_RXmode_tick_ms, tick)
+
+    t_cpu0 = time.thread_time()
+    t0 = time.perf_counter()
+    t_tick[0] = t0
+    t_tick[1] = tk_root.after(bench_RXmode_tick_ms, tick)
+    tx_thread.start()
+    while (len(lat_us) < len(msgs) or tx_thread.is_alive()) and time.perf_counter() - t0 < 30:
+        tk_root.tk.dooneevent(0)        #runs the Tk event loop (mainloop exits without a window)
+    t_total = time.perf_counter() - t0
+    t_cpu = time.thread_time() - t_cpu0
+
+    CAN_ref.CAN_RX_stop()
+    tx_thread.join(); bus.shutdown()
+    CAN_ref.CANbus = None
+    tk_root.after_cancel(t_tick[1])
+    CAN_ref.RX_ingest.pop_all()
+    lat_us.sort(); jitter_us.sort()
+    return {'frames':len(lat_us), 'per_s':len(lat_us)/t_total,
+            'lat_p50_us':pct(lat_us, 50), 'lat_p99_us':pct(lat_us, 99),
+            'tick_jitter_p50_us':pct(jitter_us, 50), 'tick_jitter_p99_us':pct(jitter_us, 99),
+            'tk_thread_busy_pct':t_cpu/t_total*100}
+
+def bench_drain(CAN_ref, msgs, num):
+    """function measures the ingest drain (apply values to tk vars) cost for one display refresh worth of frames"""
+    batch = msgs[:256]
+    times = []
+    pc = time.perf_counter_ns
+    for _ in range(num):
+        for m in batch: CAN_ref.CAN_msgRX_func(m)
+        t0 = pc(); CAN_ref.CAN_ingest_drain(); times.append(pc() - t0)
+    times.sort()
+    return summarize(times)
+
+def bench_elements(master, num):
+    """function measures update_state cost per element type on built pages, for values that change the
+    display and for jitter below the displayed resolution (which should be skipped)"""
+    ctl = master.dash_ctl
+    results = {}
+    pg_names = list(master.dash_pages_user)
+    t0 = time.perf_counter()
+    ctl.dash_buildPages()
+    ctl.page_ele_CANref_init()
+    ctl.goto_page_user(pg_names[0])                             #first page is built when shown
+    master.tk_root.update_idletasks()
+    results['first_page_ms'] = (time.perf_counter() - t0)*1000  #pages prepared to the first page drawn
+    first_pg = master.dash_pages_user[pg_names[0]]
+    for ele_type, eles in (('LBL_DAT', first_pg.Lbl_dat), ('IND_BAR', first_pg.Ind_bar), ('IND_BLT', first_pg.Ind_blt)):
+        if not eles: continue
+        ele = next(iter(eles.values()))
+        var = ele.CAN_dec_ref
+        vals = [0.0, 45.5, 120.3, 350.7, 410.0]
+        indx = [0]
+        def call():
+            var.set(vals[indx[0] % len(vals)]); indx[0] += 1    #triggers the element trace
+            ctl.render_frame()                                  #and redraw it
+        results[ele_type] = summarize(time_per_call(call, num))
+        ele.cnt_upd = ele.cnt_skip = 0
+        vals_jit = [45.5, 45.5001, 45.5002, 45.5001]                  #changes below the displayed resolution
+        def call_jit():
+            var.set(vals_jit[indx[0] % len(vals_jit)]); indx[0] += 1
+            ctl.render_frame()
+        results[ele_type+'_jitter'] = summarize(time_per_call(call_jit, num))
+        results[ele_type+'_jitter']['skip_pct'] = 100*ele.cnt_skip/max(1, ele.cnt_upd + ele.cnt_skip)
+
+    #--frame render, with several values per channel between frames coalesced to one redraw per element
+    page_vars = [e.CAN_dec_ref for eles in (first_pg.Lbl_dat, first_pg.Ind_bar, first_pg.Ind_blt) for e in eles.values()]
+    times = []
+    redrawn = 0
+    pc = time.perf_counter_ns
+    for i in range(max(10, num//10)):
+        for k in range(bench_render_writes):
+            for var in page_vars: var.set(vals[i % len(vals)] + k)
+        t0 = pc(); redrawn += ctl.render_frame(); times.append(pc() - t0)
+    times.sort()
+    results['render_frame'] = summarize(times)
+    results['render_frame']['eles_per_frame'] = redrawn/len(times)
+
+    #--page switch, including the sync of the new page to the current values. Cold switches tear the page
+    #  down first so it has to be built, warm switches go back and forth between two built pages
+    times_cold = []
+    times_warm = []
+    for i in range(max(10, num//100)):
+        pg = master.dash_pages_user[pg_names[(i+1) % len(pg_names)]]
+        if pg is not ctl.active_page_ref:
+            if pg.built == True: ctl.page_unbuild(pg)
+            t0 = pc(); ctl.goto_page_user(pg.name); times_cold.append(pc() - t0)
+        master.tk_root.update()
+        if len(pg_names) > 1:
+            ctl.goto_page_user(pg_names[i % len(pg_names)])
+            master.tk_root.update()
+            t0 = pc(); ctl.goto_page_user(pg.name); times_warm.append(pc() - t0)
+            master.tk_root.update()
+    if times_cold: results['page_switch_cold'] = summarize(sorted(times_cold))
+    if times_warm: results['page_switch_warm'] = summarize(sorted(times_warm))
+    master.tk_root.update()
+    return results
+
+def run_bench(quick):
+    """function runs all benchmarks for all config sizes
+
+    :param quick: run fewer iterations
+    :type quick: `bool`
+    :returns: dict of results, in format {size_name:{bench_name:result}}
+    :rtype: `dictionary`
+    """
+    try:
+        tk_root = tk.Tk()
+        use_display = True
+    except tk.TclError:                 #no display - a Tcl interpreter is enough for the CAN tk variables
+        tk_root = tk.Tcl()
+        tk._default_root = tk_root
+        use_display = False
+
+    num = 2000 if quick else 20000
+    results = {'display':use_display}
+    for num_chs, num_pages in bench_sizes:
+        master = bench_master(tk_root, use_display)
+        cfg_tree = bench_gen_config(num_chs, num_pages)
+        size_res = {}
+        size_res['parse_ms'] = bench_parse(master, cfg_tree, use_display)
+        size_res['parse_stream'] = bench_parse_stream(tk_root, cfg_tree, use_display)
+        size_res['cfg_load'] = bench_cfg_load(tk_root, cfg_tree, use_display)
+        CAN_ref = master.dash_CAN
+        msgs = bench_gen_frames(CAN_ref, num)
+        size_res['decode'] = bench_decode(CAN_ref, msgs, num)
+        size_res['RX_func'] = bench_RXfunc(CAN_ref, msgs)
+        size_res['bus_e2e'] = bench_bus(CAN_ref, msgs)
+        for mode in ('notifier', 'filehandler'):
+            mode_res = bench_RXmode(CAN_ref, tk_root, msgs, mode)
+            if mode_res is not None: size_res['RX_'+mode] = mode_res
+        size_res['drain'] = bench_drain(CAN_ref, msgs, max(10, num//100))
+        if use_display == True: size_res['elements'] = bench_elements(master, max(100, num//10))
+        results[f"{num_chs}ch_{num_pages}pg"] = size_res
+        if use_display == True:
+            for pg in master.dash_pages_user.values(): pg.destroy()
+            master.prnt_frame.destroy()
+    if use_display == True: tk_root.destroy()
+    return results
+
+#----------------------------------reporting----------------------------------
+def flatten(res, prefix=''):
+    """function flattens nested results into {'a.b.c':value}"""
+    flat = {}
+    for k, v in res.items():
+        if isinstance(v, dict): flat.update(flatten(v, prefix+k+'.'))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool): flat[prefix+k] = v
+    return flat
+
+def compare(new_res, old_res):
+    """function prints the change of each result vs a previous run, flagging regressions. A result the
+    previous run had but this run doesn't, like a cached config load time when the cache wasn't used, is
+    also flagged.
+
+    :returns: number of regressions found
+    :rtype: `int`
+    """
+    new_flat = flatten(new_res); old_flat = flatten(old_res)
+    regressions = 0
+    for k in old_flat:
+        if k not in new_flat:
+            regressions += 1
+            print(f"{k:45s} {old_flat[k]:14.2f} -> {'-':>14s}           MISSING")
+    for k, v in new_flat.items():
+        if k not in old_flat or old_flat[k] == 0: continue
+        chg = (v - old_flat[k])/old_flat[k]*100
+        higher_better = k.endswith('per_s')         #rates are better higher, times are better lower
+        worse = (chg < -bench_regress_pct) if higher_better else (chg > bench_regress_pct)
+        if worse: regressions += 1
+        print(f"{k:45s} {old_flat[k]:14.2f} -> {v:14.2f}  {chg:+7.1f}%{'  REGRESSION' if worse else ''}")
+    return regressions
+
+def git_commit():
+    """function gets the current git commit of the repository, if available"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=pathlib.Path(__file__).parent).stdout.strip()
+    except OSError: return 'unknown'
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='PyDash CAN ingest and render benchmarks')
+    arg_parser.add_argument('--quick', action='store_true', help='run fewer iterations')
+    arg_parser.add_argument('--out', default=str(pathlib.Path(__file__).parent / 'bench_results.json'),
+                            help='results JSON file to write - Default development/bench_results.json')
+    arg_parser.add_argument('--compare', default=None, help='previous results JSON file to compare against')
+    args = arg_parser.parse_args()
+
+    results = run_bench(args.quick)
+    report = {'commit':git_commit(), 'python':platform.python_version(), 'machine':platform.machine(),
+              'time':time.strftime('%Y-%m-%d %H:%M:%S'), 'results':results}
+    for k, v in flatten(results).items(): print(f"{k:45s} {v:14.2f}")
+    if results['display'] == False: print('no display - element update benchmarks skipped (use xvfb-run)')
+    for size, size_res in results.items():
+        if isinstance(size_res, dict) and 'cache_miss' in size_res.get('cfg_load', {}):
+            print(f"{size}: config cache NOT used, cached boot time not measured - {size_res['cfg_load']['cache_miss']}")
+    with open(args.out, 'w') as f: json.dump(report, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f: old_report = json.load(f)
+        print(f"\ncompare {old_report.get('commit')} -> {report['commit']}")
+        if compare(results, old_report['results']) > 0: py_sys.exit(1)